@@ -8,18 +8,50 @@ from pathlib import Path
 from datetime import timedelta
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
+from core.db import database_from_env
+
 # ----------------------------
 # Base dir
 # ----------------------------
 BASE_DIR = Path(__file__).resolve().parent.parent
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+
+def env_bool(name, default=False):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_list(name, default=''):
+    return [item.strip() for item in os.getenv(name, default).split(',') if item.strip()]
+
+
 # ----------------------------
 # Security
 # ----------------------------
-SECRET_KEY = 'django-insecure--n29mkc9i4npfabu*@-9ac+@%15^0q!1v#&&5g&b9%rx)e*148'
-DEBUG = True
-ALLOWED_HOSTS = ["*"]  # dev/testing uchun, production da aniq domenlarni yozish kerak
+# Bir xil image dev va prod'da: qiymatlar environment'dan olinadi (Dockerfile'da DJANGO_DEBUG=0)
+DEBUG = env_bool('DJANGO_DEBUG', True)
+
+# production'da dev kalit va '*' bilan ishga tushmaslik kerak
+if not DEBUG:
+    missing = [name for name in ('DJANGO_SECRET_KEY', 'DJANGO_ALLOWED_HOSTS') if not os.getenv(name)]
+    if missing:
+        raise ImproperlyConfigured(f"DJANGO_DEBUG=0 bo'lsa {', '.join(missing)} berilishi kerak")
+
+SECRET_KEY = os.getenv(
+    'DJANGO_SECRET_KEY',
+    'django-insecure--n29mkc9i4npfabu*@-9ac+@%15^0q!1v#&&5g&b9%rx)e*148'
+)
+ALLOWED_HOSTS = env_list('DJANGO_ALLOWED_HOSTS', '*')  # production da aniq domenlarni yozish kerak
+
+# nginx orqasida: X-Forwarded-Proto bo'yicha https aniqlanadi
+if env_bool('DJANGO_BEHIND_PROXY'):
+    SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+    USE_X_FORWARDED_HOST = True
 
 
 # Installed Apps
@@ -50,7 +82,9 @@ INSTALLED_APPS = [
 # ----------------------------
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',  # static fayllar (collectstatic)
     'corsheaders.middleware.CorsMiddleware',
+    'main_video.metrics.QueryMetricsMiddleware',  # SQL so'rovlar soni / latency
 
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,13 +117,84 @@ TEMPLATES = [
 WSGI_APPLICATION = 'core.wsgi.application'
 
 # ----------------------------
-# Database (SQLite)
+# Database
 # ----------------------------
+# DATABASE_URL (postgres://... yoki sqlite:///...), bo'lmasa db.sqlite1. Batafsil: core/db.py
 DATABASES = {
+    'default': database_from_env(BASE_DIR, 'db.sqlite1'),
+}
+
+# ----------------------------
+# Cache
+# ----------------------------
+# Katalog (category_main, course_main, categories) va quiz savollari pool'i uchun cache.
+# CATALOG_CACHE_BACKEND: none (default, cache'siz) | locmem | file | redis ("redis" paketi kerak)
+# none bo'lsa quiz pool'i ham cache'lanmaydi - har safar DB'dan o'qiladi.
+# locmem har bir worker process uchun alohida - bump_version() boshqa workerlarni
+# tozalamaydi, shuning uchun WEB_CONCURRENCY > 1 bilan ishlatilmaydi (main_video.E001).
+# Bir nechta worker: redis (yoki hamma workerlar bitta hostda bo'lsa file).
+CATALOG_CACHE_BACKENDS = {
+    'none': ('django.core.cache.backends.dummy.DummyCache', ''),
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'catalog'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, 'cache', 'catalog')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+_catalog_backend, _catalog_location = CATALOG_CACHE_BACKENDS[os.environ.get('CATALOG_CACHE_BACKEND', 'none')]
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite1',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': _catalog_backend,
+        'LOCATION': os.environ.get('CATALOG_CACHE_LOCATION', _catalog_location),
+        'TIMEOUT': int(os.environ.get('CATALOG_CACHE_TIMEOUT', 300)),
+        'KEY_PREFIX': 'catalog',
+    },
+}
+
+# ----------------------------
+# Logging
+# ----------------------------
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '%(asctime)s %(levelname)s %(name)s: %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'loggers': {
+        'main_video': {'handlers': ['console'], 'level': os.environ.get('APP_LOG_LEVEL', 'INFO')},
+    },
+}
+
+# ----------------------------
+# Request metrics (main_video/metrics.py)
+# ----------------------------
+REQUEST_METRICS_HEADERS = env_bool('REQUEST_METRICS_HEADERS', DEBUG)  # X-Query-Count, Server-Timing
+REQUEST_METRICS_LOG = env_bool('REQUEST_METRICS_LOG', not DEBUG)  # har bir request - JSON log qatori
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # /metrics (Prometheus); bo'sh bo'lsa faqat DEBUG'da
+
+# Endpoint bo'yicha SQL so'rovlar chegarasi ("ViewSet.action": soni).
+# JWT autentifikatsiyasidagi user so'rovi ham hisobga kiradi.
+# Oshsa warning log; QUERY_BUDGET_STRICT=1 da exception (testlar/benchmark yiqiladi).
+# Raqamlar default CATALOG_CACHE_BACKEND=none (DummyCache) bilan o'lchangan: katalog va
+# quiz savollar pool'i (main_video/quiz_pool.py) har safar DB'dan o'qiladi.
+QUERY_BUDGET_STRICT = env_bool('QUERY_BUDGET_STRICT', False)
+QUERY_BUDGETS = {
+    'CategoryMainViewSet.list': 3,
+    'CategoryViewSet.list': 9,
+    'CourseMainViewSet.list': 6,  # ?search= bo'lsa indeks so'rovi (+1)
+    'CourseViewSet.retrieve': 8,
+    'SectionOneViewSet.retrieve': 15,  # birinchi ochilishda QuizSession yoziladi (+progress_version)
+    'SectionOneViewSet.full_info': 16,
+    'SectionOneViewSet.videos': 5,
+    'VideoViewSet.mark_as_watched': 26,
+    'CourseProgressViewSet.list': 5,
+    'SectionProgressViewSet.list': 3,
+    'UserViewSet.list': 2,
 }
 
 # ----------------------------
@@ -186,15 +291,52 @@ SWAGGER_SETTINGS = {
 # ----------------------------
 # CSRF Trusted Origins (ngrok + frontend)
 # ----------------------------
-CSRF_TRUSTED_ORIGINS = [
-    "https://courtney-pitiful-floggingly.ngrok-free.dev",
+CSRF_TRUSTED_ORIGINS = env_list(
+    'DJANGO_CSRF_TRUSTED_ORIGINS',
+    "https://courtney-pitiful-floggingly.ngrok-free.dev,"
     "http://localhost:3000",  # frontend localhost bo‘lsa
-]
+)
 
 import os
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_ROOT = os.getenv('DJANGO_MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+# /media/ ni Django o'zi berishi (prod'da nginx beradi, videolar /stream/ orqali)
+SERVE_MEDIA = env_bool('DJANGO_SERVE_MEDIA', DEBUG)
+
+# /api/videos/<id>/stream/ faylni kim yuboradi:
+#   ''                  - Django (Range bilan, gunicorn'da sendfile)
+#   'x-accel-redirect'  - nginx (location VIDEO_SENDFILE_PREFIX internal; alias MEDIA_ROOT)
+#   'x-sendfile'        - apache mod_xsendfile
+VIDEO_SENDFILE = os.getenv('VIDEO_SENDFILE', '')
+VIDEO_SENDFILE_PREFIX = os.getenv('VIDEO_SENDFILE_PREFIX', '/protected-media/')
+# Stream URL'laridagi ?token= (main_video.streaming.stream_token) amal qilish muddati, sekund.
+# Access JWT URL'ga qo'yilmaydi: token faqat bitta video/kurs uchun.
+STREAM_TOKEN_MAX_AGE = int(os.getenv('STREAM_TOKEN_MAX_AGE', 4 * 3600))
+
+# Chunked (resumable) upload: /api/uploads/
+CHUNKED_UPLOAD_DIR = os.getenv('CHUNKED_UPLOAD_DIR', os.path.join(BASE_DIR, 'upload_tmp'))
+CHUNKED_UPLOAD_MAX_SIZE = int(os.getenv('CHUNKED_UPLOAD_MAX_SIZE', 4 * 1024 ** 3))
+
+# HLS transcoding (python manage.py transcode_videos --loop)
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+FFPROBE_BINARY = os.getenv('FFPROBE_BINARY', 'ffprobe')
+# processing'da shundan ko'p turgan transcode (worker o'lgan) boshqa worker tomonidan qayta olinadi.
+# Eng uzun videoning transcode vaqtidan katta bo'lishi kerak.
+TRANSCODE_LEASE_SECONDS = int(os.getenv('TRANSCODE_LEASE_SECONDS', 3 * 3600))
 
 STATIC_URL = '/static/'
-STATIC_ROOT = os.path.join(BASE_DIR, 'static')
\ No newline at end of file
+STATIC_ROOT = os.getenv('DJANGO_STATIC_ROOT', os.path.join(BASE_DIR, 'static'))
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        # prod'da hash'langan + siqilgan fayllar (uzoq muddat cache qilinadi)
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
\ No newline at end of file
@@ -1,3 +1,5 @@
+import re
+
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenRefreshView
@@ -5,8 +7,10 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from django.conf import settings
-from django.conf.urls.static import static
-from django.urls import path, include
+from django.urls import re_path
+from django.views.static import serve
+
+from main_video.metrics import metrics_view
 # ====================
 # Swagger / Redoc konfiguratsiyasi
 # ====================
@@ -32,6 +36,9 @@ urlpatterns = [
     # JWT token refresh
     path('refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
+    # Prometheus metrikalari (METRICS_TOKEN)
+    path('metrics', metrics_view, name='metrics'),
+
     # Admin panel
     path('admin/', admin.site.urls),
 
@@ -41,5 +48,8 @@ urlpatterns = [
 
 
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+if settings.SERVE_MEDIA:
+    # static() faqat DEBUG da ishlaydi; prod'da media'ni nginx beradi
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve, {'document_root': settings.MEDIA_ROOT}),
+    ]
\ No newline at end of file
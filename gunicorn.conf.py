@@ -0,0 +1,68 @@
+"""
+gunicorn sozlamalari (Dockerfile: gunicorn -c gunicorn.conf.py).
+
+Hammasi environment orqali o'zgartiriladi:
+  PORT                   - 8000
+  WEB_CONCURRENCY        - worker process'lar soni (default: 2 * CPU + 1)
+  CATALOG_CACHE_BACKEND  - bir nechta workerda locmem emas (core/settings.py)
+  GUNICORN_THREADS       - har bir worker'dagi thread'lar (gthread), default 4
+  GUNICORN_WORKER_CLASS  - gthread (WSGI) yoki uvicorn_worker.UvicornWorker (ASGI)
+  GUNICORN_TIMEOUT       - sekund, default 120 (katta upload/stream uchun)
+  GUNICORN_KEEPALIVE     - sekund, default 5 (nginx upstream keepalive'dan kichik bo'lmasin)
+
+Ishga tushishdan oldin ``manage.py check`` alohida process'da bajariladi:
+xato bo'lsa (masalan ko'p workerda locmem cache) server ko'tarilmaydi.
+
+Graceful reload: ``kill -HUP <master pid>`` - yangi workerlar ko'tariladi,
+eskilari joriy so'rovlarni tugatib (graceful_timeout) yopiladi.
+"""
+import multiprocessing
+import os
+import subprocess
+import sys
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+# Django system check'lari (main_video.E001) worker sonini shu yerdan biladi
+os.environ["WEB_CONCURRENCY"] = str(workers)
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+if worker_class.endswith("UvicornWorker"):
+    wsgi_app = "core.asgi:application"
+else:
+    wsgi_app = "core.wsgi:application"
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# xotira sizib chiqsa ham workerlar vaqti-vaqti bilan yangilanadi
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+# HUP bilan reload ishlashi uchun app master'da yuklanmaydi
+preload_app = False
+
+# X-Forwarded-* faqat proxy'dan qabul qilinadi
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    # master'da Django yuklanmaydi (preload_app=False), check alohida process'da
+    manage = os.path.join(os.path.dirname(os.path.abspath(__file__)), "manage.py")
+    subprocess.run([sys.executable, manage, "check"], check=True)
+
+
+def post_worker_init(worker):
+    # qidiruv indeksi bor-yo'qligi birinchi request'dan oldin aniqlanadi (query budget'ga kirmaydi)
+    from django.db import connection
+    from main_video import search
+
+    search.is_available(connection)
+    connection.close()
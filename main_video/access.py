@@ -0,0 +1,122 @@
+from main_video.models import Video, VideoProgress
+
+
+STAFF_ROLES = ('admin', 'teacher')
+
+
+class VideoAccessResolver:
+    """
+    Section / kurs videolari uchun access'ni bitta joyda hisoblaydi.
+
+    Har bir section uchun 2 ta query: tartiblangan video id'lar va userning
+    shu videolardagi progress'i. Keyin har bir videoning ``has_access``
+    qiymati xotirada hisoblanadi (``Video.check_video_access`` qoidasi bilan).
+
+    ``progress`` berilsa (masalan UserProgressSnapshot'dan), progress uchun
+    alohida query qilinmaydi.
+    """
+
+    def __init__(self, user, progress=None):
+        self.user = user
+        self.is_staff = getattr(user, 'role', None) in STAFF_ROLES
+        self._section_videos = {}  # section_id -> [(video_id, order), ...]
+        self._progress = progress if progress is not None else {}  # video_id -> (is_completed, completed_at)
+        self._progress_preloaded = progress is not None
+        self._access = {}  # video_id -> bool
+
+    # ---------- LOADING ----------
+    def load_sections(self, section_ids):
+        """Berilgan sectionlarni (hali yuklanmagan bo'lsa) yuklash"""
+        missing = {sid for sid in section_ids if sid not in self._section_videos}
+        if missing:
+            self._load(Video.objects.filter(section_id__in=missing), missing)
+        return self
+
+    def load_course(self, course):
+        """Kursdagi barcha sectionlar videolarini bitta query bilan yuklash"""
+        course_id = getattr(course, 'pk', course)
+        self._load(Video.objects.filter(section__course_id=course_id), set())
+        return self
+
+    def _load(self, videos, section_ids):
+        rows = videos.order_by('section_id', 'order', 'id').values_list('id', 'section_id', 'order')
+
+        loaded = {sid: [] for sid in section_ids}
+        for video_id, section_id, order in rows:
+            loaded.setdefault(section_id, []).append((video_id, order))
+        loaded = {sid: items for sid, items in loaded.items() if sid not in self._section_videos}
+        if not loaded:
+            return
+
+        video_ids = [video_id for items in loaded.values() for video_id, _ in items]
+        if video_ids and not self._progress_preloaded and getattr(self.user, 'is_authenticated', False):
+            progress_rows = VideoProgress.objects.filter(
+                user=self.user,
+                video_id__in=video_ids
+            ).values_list('video_id', 'is_completed', 'completed_at')
+            for video_id, is_completed, completed_at in progress_rows:
+                self._progress[video_id] = (is_completed, completed_at)
+
+        self._section_videos.update(loaded)
+        for items in loaded.values():
+            self._compute(items)
+
+    def _compute(self, items):
+        """check_video_access qoidasi: birinchi video ochiq, qolganlari avvalgisi ko'rilgan bo'lsa"""
+        previous_id = None
+        previous_order = None
+        last_lower_id = None  # order'i joriy videodan kichik bo'lgan oxirgi video
+
+        for idx, (video_id, order) in enumerate(items):
+            if previous_order is not None and previous_order < order:
+                last_lower_id = previous_id
+
+            if self.is_staff or idx == 0:
+                self._access[video_id] = True
+            elif last_lower_id is None:
+                self._access[video_id] = False
+            else:
+                self._access[video_id] = self.is_completed(last_lower_id)
+
+            previous_id, previous_order = video_id, order
+
+    # ---------- QUERY ----------
+    def has_access(self, video):
+        video_id = getattr(video, 'pk', video)
+        if video_id not in self._access:
+            section_id = video.section_id if isinstance(video, Video) else (
+                Video.objects.filter(pk=video_id).values_list('section_id', flat=True).first()
+            )
+            if section_id is None:
+                return False
+            self.load_sections([section_id])
+        return self._access.get(video_id, False)
+
+    def is_completed(self, video_id):
+        progress = self._progress.get(video_id)
+        return bool(progress and progress[0])
+
+    def progress(self, video_id):
+        """VideosSerializer.get_user_progress formatidagi dict"""
+        is_completed, completed_at = self._progress.get(video_id, (False, None))
+        return {
+            'is_completed': is_completed,
+            'completed_at': completed_at
+        }
+
+    def section_video_ids(self, section_id):
+        self.load_sections([section_id])
+        return [video_id for video_id, _ in self._section_videos[section_id]]
+
+    def accessible_count(self, section_id):
+        return sum(1 for video_id in self.section_video_ids(section_id) if self._access.get(video_id))
+
+    def mark_completed(self, video):
+        """Video ko'rilgandan keyin keyingi videolarning access'ini qayta hisoblash"""
+        video_id = getattr(video, 'pk', video)
+        _, completed_at = self._progress.get(video_id, (False, None))
+        self._progress[video_id] = (True, completed_at)
+        for items in self._section_videos.values():
+            if any(vid == video_id for vid, _ in items):
+                self._compute(items)
+
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import *
+from .progress import set_section_completed
 
 
 admin.site.register(Certificate)# Users admin
@@ -90,6 +91,13 @@ class VideoAdmin(admin.ModelAdmin):
     search_fields = ('title', 'section__title')
     ordering = ('section', 'order')
 
+@admin.register(VideoTranscode)
+class VideoTranscodeAdmin(admin.ModelAdmin):
+    list_display = ("id", 'video', 'status', 'duration', 'finished_at')
+    list_filter = ('status',)
+    search_fields = ('video__title',)
+    readonly_fields = ('source_name', 'playlist', 'renditions', 'duration', 'error', 'started_at', 'finished_at')
+
 # ----------------------------
 # Missiya admin
 # ----------------------------
@@ -135,6 +143,16 @@ class SectionProgressAdmin(admin.ModelAdmin):
         return obj.section.title
     get_section.short_description = 'Section'
 
+    def save_model(self, request, obj, form, change):
+        # is_completed: kurs counteri va sertifikat set_section_completed orqali
+        completed = obj.is_completed
+        if 'is_completed' in form.changed_data:
+            obj.is_completed = form.initial.get('is_completed', False)
+        super().save_model(request, obj, form, change)
+        if obj.is_completed != completed:
+            set_section_completed(obj.user, obj.section, completed)
+            obj.refresh_from_db()
+
 # ----------------------------
 # VideoProgress admin
 # ----------------------------
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class MainVideoConfig(AppConfig):
     name = 'main_video'
+
+    def ready(self):
+        from main_video import checks  # noqa: F401
+        # signal receiverlarni ro'yxatdan o'tkazish
+        from main_video import catalog_cache, conditional, quiz_pool, ratings, search, transcoding  # noqa: F401
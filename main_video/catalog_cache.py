@@ -0,0 +1,122 @@
+import hashlib
+import time
+
+from django.core.cache import caches
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.response import Response
+
+from main_video.models import Category, Course, Section, Users, Video, VideoRating
+from main_video.snapshot import get_progress_snapshot
+
+
+CACHE_ALIAS = 'catalog'
+VERSION_KEY = 'version'
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+# =========================
+# VERSION
+# =========================
+def get_version():
+    cache = _cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # restartdan keyin (file/redis) eski yozuvlar bilan to'qnashmasligi uchun vaqtdan boshlanadi
+        cache.add(VERSION_KEY, int(time.time()), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """Katalog o'zgardi: barcha eski yozuvlar endi o'qilmaydi"""
+    cache = _cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, int(time.time()), None)
+
+
+def make_key(name, request):
+    # img/video URL'lari absolute bo'lgani uchun host ham kalitga kiradi
+    params = '&'.join(f'{k}={v}' for k, values in sorted(request.query_params.lists()) for v in values)
+    raw = f'{request.build_absolute_uri("/")}|{params}'
+    return f'{name}:{get_version()}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def get_or_build(name, request, builder):
+    cache = _cache()
+    key = make_key(name, request)
+    data = cache.get(key)
+    if data is None:
+        data = builder()
+        cache.set(key, data)
+    return data
+
+
+# =========================
+# INVALIDATION
+# =========================
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=Section)
+@receiver(post_save, sender=Video)
+@receiver(post_delete, sender=Video)
+@receiver(post_save, sender=VideoRating)
+@receiver(post_delete, sender=VideoRating)
+def invalidate_catalog(sender, **kwargs):
+    bump_version()
+
+
+@receiver(m2m_changed, sender=Course.teacher.through)
+def invalidate_catalog_teachers(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version()
+
+
+@receiver(post_save, sender=Users)
+def invalidate_catalog_teacher_names(sender, instance, **kwargs):
+    if instance.role == 'teacher':
+        bump_version()
+
+
+# =========================
+# VIEWSET MIXIN
+# =========================
+class CatalogCacheMixin:
+    """
+    list() javobining hamma userlar uchun bir xil qismi catalog cache'dan
+    olinadi, userga tegishli maydonlar esa merge_user_fields() da qo'shiladi.
+
+    Cache to'ldirilayotganda serializer context'ida ``catalog_shared=True``
+    bo'ladi va per-user SerializerMethodField'lar default qiymat qaytaradi.
+    """
+    catalog_cache_name = None
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['catalog_shared'] = getattr(self, 'catalog_shared', False)
+        return context
+
+    def list(self, request, *args, **kwargs):
+        def build():
+            self.catalog_shared = True
+            try:
+                return super(CatalogCacheMixin, self).list(request, *args, **kwargs).data
+            finally:
+                self.catalog_shared = False
+
+        data = get_or_build(self.catalog_cache_name, request, build)
+        return Response(self.merge_user_fields(data, request))
+
+    def merge_user_fields(self, data, request):
+        return data
+
+    def get_snapshot(self, request):
+        return get_progress_snapshot({'request': request})
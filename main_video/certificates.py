@@ -0,0 +1,44 @@
+import logging
+
+from django.db.models import Count
+from django.utils import timezone
+
+from main_video.conditional import bump_progress_version
+from main_video.models import Certificate, Section, SectionProgress
+
+
+logger = logging.getLogger(__name__)
+
+
+def issue_certificates(course, user_ids=None):
+    """
+    Kursdagi barcha sectionlarni tugatgan userlarga sertifikat berish.
+
+    user_ids berilmasa butun kurs bo'yicha ishlaydi. Sertifikatlar bitta
+    bulk_create(ignore_conflicts=True) bilan yoziladi. Yaratilganlar soni qaytariladi.
+    """
+    total_sections = Section.objects.filter(course=course).count()
+    if not total_sections:
+        return 0
+
+    completed = SectionProgress.objects.filter(section__course=course, is_completed=True)
+    if user_ids is not None:
+        completed = completed.filter(user_id__in=user_ids)
+    eligible = set(
+        completed.values('user_id').annotate(n=Count('id')).filter(n=total_sections).values_list('user_id', flat=True)
+    )
+    if not eligible:
+        return 0
+
+    existing = set(Certificate.objects.filter(course=course, user_id__in=eligible).values_list('user_id', flat=True))
+    now = timezone.now()
+    certificates = [
+        Certificate(user_id=user_id, course=course, category_id=course.category_id, completed_at=now)
+        for user_id in eligible - existing
+    ]
+    Certificate.objects.bulk_create(certificates, ignore_conflicts=True)
+    bump_progress_version(*(certificate.user_id for certificate in certificates))
+
+    for certificate in certificates:
+        logger.info("Sertifikat avtomatik yaratildi: user=%s course=%s", certificate.user_id, course.id)
+    return len(certificates)
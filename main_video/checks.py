@@ -0,0 +1,27 @@
+import os
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+def web_workers():
+    """gunicorn worker soni (gunicorn.conf.py WEB_CONCURRENCY ni o'rnatadi), runserver'da 1"""
+    try:
+        return int(os.getenv('WEB_CONCURRENCY') or 1)
+    except ValueError:
+        return 1
+
+
+@register(Tags.caches)
+def check_catalog_cache(app_configs, **kwargs):
+    """locmem katalog cache'ida bump_version() faqat yozgan worker'ni tozalaydi"""
+    backend = settings.CACHES.get('catalog', {}).get('BACKEND', '')
+    workers = web_workers()
+    if backend.endswith('LocMemCache') and workers > 1:
+        return [Error(
+            f"'catalog' cache locmem, lekin worker'lar soni {workers}: boshqa workerlar eskirgan "
+            f"katalog va quiz savollarini qaytaradi.",
+            hint="CATALOG_CACHE_BACKEND=redis (yoki file), yoki cache'siz: CATALOG_CACHE_BACKEND=none.",
+            id='main_video.E001',
+        )]
+    return []
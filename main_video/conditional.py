@@ -0,0 +1,236 @@
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import Count, F, IntegerField, Max, Value
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from main_video.models import (
+    Certificate, Course, CourseProgress, Missiya, Question, Quiz, QuizResult, QuizSession, Section,
+    SectionProgress, Users, Video, VideoProgress, VideoRating, VideoTranscode
+)
+from main_video.streaming import stream_token_window
+
+
+# =========================
+# USER PROGRESS VERSION
+# =========================
+_batch = threading.local()
+
+
+def bump_progress_version(*user_ids):
+    """
+    Userga tegishli ma'lumot (progress, rating, quiz, sertifikat) o'zgardi: eski ETag'lar yaroqsiz.
+    batched_progress_bumps() ichida bo'lsa blok oxirida bitta UPDATE bilan yoziladi.
+    """
+    if not user_ids:
+        return
+    pending = getattr(_batch, 'user_ids', None)
+    if pending is not None:
+        pending.update(user_ids)
+        return
+    Users.objects.filter(pk__in=user_ids).update(
+        progress_version=F('progress_version') + 1,
+        progress_updated_at=timezone.now(),
+    )
+
+
+@contextmanager
+def batched_progress_bumps():
+    """
+    Blok ichidagi bump_progress_version chaqiruvlari oxirida bitta UPDATE
+    (har bir user bir marta). transaction.atomic() ichida ishlatiladi: bump
+    o'zi invalid qiladigan ma'lumot bilan birga commit bo'ladi. Xato bo'lsa
+    hech narsa yozilmaydi. Ichma-ich bloklarda tashqisi yozadi.
+    """
+    if getattr(_batch, 'user_ids', None) is not None:
+        yield
+        return
+    _batch.user_ids = set()
+    try:
+        yield
+        user_ids = _batch.user_ids
+    finally:
+        _batch.user_ids = None
+    bump_progress_version(*user_ids)
+
+
+@receiver(post_save, sender=VideoProgress)
+@receiver(post_delete, sender=VideoProgress)
+@receiver(post_save, sender=SectionProgress)
+@receiver(post_delete, sender=SectionProgress)
+@receiver(post_save, sender=CourseProgress)
+@receiver(post_delete, sender=CourseProgress)
+@receiver(post_save, sender=VideoRating)
+@receiver(post_delete, sender=VideoRating)
+@receiver(post_save, sender=QuizResult)
+@receiver(post_delete, sender=QuizResult)
+@receiver(post_save, sender=QuizSession)
+@receiver(post_delete, sender=QuizSession)
+@receiver(post_save, sender=Certificate)
+@receiver(post_delete, sender=Certificate)
+def bump_on_user_data_change(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        bump_progress_version(instance.user_id)
+
+
+# =========================
+# updated_at'siz O'ZGARISHLAR
+# =========================
+# Bu ma'lumotlar javobga kiradi, lekin o'z updated_at'i yo'q -
+# o'zgarganda ota yozuvning updated_at'i yangilanadi.
+def _touch(queryset):
+    queryset.update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Course.teacher.through)
+def touch_course_teachers(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        _touch(Course.objects.filter(pk=instance.pk))
+    elif action == 'pre_clear':
+        _touch(Course.objects.filter(teacher=instance))
+    else:
+        _touch(Course.objects.filter(pk__in=pk_set or ()))
+
+
+@receiver(post_save, sender=Users)
+def touch_teacher_courses(sender, instance, update_fields=None, **kwargs):
+    """Teacher ismi kurs javoblarida chiqadi (login'dagi last_login hisobga olinmaydi)"""
+    if instance.role == 'teacher' and not (update_fields and set(update_fields) <= {'last_login'}):
+        _touch(Course.objects.filter(teacher=instance))
+
+
+@receiver(post_save, sender=Missiya)
+@receiver(post_delete, sender=Missiya)
+def touch_missiya_section(sender, instance, **kwargs):
+    _touch(Section.objects.filter(pk=instance.section_id))
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def touch_question_quiz(sender, instance, **kwargs):
+    _touch(Quiz.objects.filter(pk=instance.quiz_id))
+
+
+# =========================
+# VALIDATORLAR
+# =========================
+def tree_state(querysets):
+    """
+    Har bir queryset uchun (max(updated_at), count) - hammasi bitta UNION ALL
+    query'da. count o'chirilgan yozuvlarni ham sezadi.
+    """
+    parts = [
+        queryset.order_by()
+        .annotate(part=Value(i, output_field=IntegerField())).values('part')
+        .annotate(last=Max('updated_at'), total=Count('pk'))
+        .values_list('part', 'last', 'total')
+        for i, queryset in enumerate(querysets)
+    ]
+    rows = parts[0].union(*parts[1:], all=True) if len(parts) > 1 else parts[0]
+    return [row[1:] for row in sorted(rows)]
+
+
+def course_tree(pk=None):
+    """Kurs -> section -> video (+ HLS holati) jadvallari, pk berilsa bitta kurs"""
+    querysets = [Course.objects.all(), Section.objects.all(), Video.objects.all(), VideoTranscode.objects.all()]
+    if pk is None:
+        return querysets
+    courses, sections, videos, transcodes = querysets
+    return [
+        courses.filter(pk=pk),
+        sections.filter(course_id=pk),
+        videos.filter(section__course_id=pk),
+        transcodes.filter(video__section__course_id=pk),
+    ]
+
+
+def section_tree(pk=None):
+    """Section, uning kursi, videolari (+ HLS holati) va quizi, pk berilsa bitta section"""
+    querysets = [
+        Section.objects.all(), Course.objects.all(), Video.objects.all(), VideoTranscode.objects.all(),
+        Quiz.objects.all(),
+    ]
+    if pk is None:
+        return querysets
+    sections, courses, videos, transcodes, quizzes = querysets
+    return [
+        sections.filter(pk=pk),
+        courses.filter(section=pk),
+        videos.filter(section_id=pk),
+        transcodes.filter(video__section_id=pk),
+        quizzes.filter(section_id=pk),
+    ]
+
+
+class ConditionalGetMixin:
+    """
+    list/retrieve (va conditional_response orqali boshqa GET action'lar)
+    uchun ETag / Last-Modified. Validatorlar serializer ishlamasdan oldin
+    hisoblanadi: katalog daraxtidagi updated_at maksimumlari + userning
+    progress_version'i. O'zgarmagan daraxt uchun 304 qaytadi.
+
+    Viewset get_conditional_querysets() da javobga kiradigan jadvallarni beradi.
+    Javobda stream token'lar bo'lsa ``stream_tokens = True``: validatorlar
+    token oynasi bilan almashadi va 304 eskirgan tokenni qaytarmaydi.
+    """
+    stream_tokens = False
+
+    def get_conditional_querysets(self):
+        raise NotImplementedError
+
+    def get_validators(self, request):
+        state = tree_state(self.get_conditional_querysets())
+        user = request.user
+        version = getattr(user, 'progress_version', 0)
+        raw = f'{user.pk}|{version}|{request.get_full_path()}|{state}'
+        moments = [last for last, _ in state if last is not None]
+        if self.stream_tokens:
+            window = stream_token_window()
+            raw += f'|{window}'
+            moments.append(datetime.fromtimestamp(window, tz=dt_timezone.utc))
+        etag = f'"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+        if getattr(user, 'progress_updated_at', None):
+            moments.append(user.progress_updated_at)
+        return etag, max(moments) if moments else None
+
+    def conditional_response(self, request, build):
+        """build() faqat mijozdagi nusxa eskirgan bo'lsa chaqiriladi"""
+        if request.method not in ('GET', 'HEAD'):
+            return build()
+
+        try:
+            etag, last_modified = self.get_validators(request)
+        except (TypeError, ValueError):
+            # noto'g'ri pk ('abc') - oddiy javob (404)
+            return build()
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = build()
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        # javob userga tegishli: umumiy proxy'lar saqlamasin, mijoz har safar tekshirsin
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        )
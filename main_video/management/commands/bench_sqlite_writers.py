@@ -0,0 +1,135 @@
+import os
+import sqlite3
+import tempfile
+import time
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+
+from core.db import SQLITE_JOURNAL_MODE, sqlite_options
+
+
+SCHEMA = """
+CREATE TABLE video (id INTEGER PRIMARY KEY, section_id INTEGER NOT NULL);
+CREATE TABLE video_progress (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    video_id INTEGER NOT NULL,
+    is_completed BOOL NOT NULL,
+    UNIQUE (user_id, video_id)
+);
+CREATE TABLE section_progress (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    section_id INTEGER NOT NULL,
+    completed_videos INTEGER NOT NULL DEFAULT 0,
+    score_percent REAL NOT NULL DEFAULT 0,
+    UNIQUE (user_id, section_id)
+);
+"""
+
+VIDEOS_PER_SECTION = 20
+
+
+def _connect(path, mode):
+    """'default' - Django'ning odatiy sqlite sozlamasi, 'tuned' - core.db.sqlite_options()"""
+    if mode == "default":
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+        return conn, "BEGIN"
+
+    options = sqlite_options()
+    conn = sqlite3.connect(path, timeout=options["timeout"], isolation_level=None)
+    for pragma in options["init_command"].split(";"):
+        conn.execute(pragma)
+    return conn, f"BEGIN {options['transaction_mode']}"
+
+
+def _worker(args):
+    """mark_as_watched'dagi yozish ketma-ketligi: o'qish -> insert -> counter update"""
+    path, mode, user_id, writes = args
+    conn, begin = _connect(path, mode)
+    latencies, errors = [], 0
+    for i in range(writes):
+        video_id = i + 1
+        section_id = (video_id - 1) // VIDEOS_PER_SECTION + 1
+        started = time.perf_counter()
+        try:
+            conn.execute(begin)
+            exists = conn.execute(
+                "SELECT 1 FROM video_progress WHERE user_id=? AND video_id=?", (user_id, video_id)
+            ).fetchone()
+            if not exists:
+                conn.execute(
+                    "INSERT INTO video_progress (user_id, video_id, is_completed) VALUES (?, ?, 1)",
+                    (user_id, video_id),
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO section_progress (user_id, section_id) VALUES (?, ?)",
+                    (user_id, section_id),
+                )
+                conn.execute(
+                    "UPDATE section_progress SET completed_videos = completed_videos + 1 "
+                    "WHERE user_id=? AND section_id=?",
+                    (user_id, section_id),
+                )
+                total = conn.execute("SELECT COUNT(*) FROM video WHERE section_id=?", (section_id,)).fetchone()[0]
+                conn.execute(
+                    "UPDATE section_progress SET score_percent = completed_videos * 100.0 / ? "
+                    "WHERE user_id=? AND section_id=?",
+                    (total, user_id, section_id),
+                )
+            conn.execute("COMMIT")
+            latencies.append(time.perf_counter() - started)
+        except sqlite3.OperationalError:
+            errors += 1
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+    conn.close()
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "SQLite'da parallel yozuvchilar: odatiy sozlama va core.db tuning'i "
+        "(WAL, busy_timeout, BEGIN IMMEDIATE) throughput'ini solishtiradi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8, help="parallel process'lar (userlar) soni")
+        parser.add_argument("--writes", type=int, default=200, help="har bir worker uchun yozuvlar soni")
+        parser.add_argument("--mode", choices=["default", "tuned", "both"], default="both")
+
+    def handle(self, *args, **options):
+        modes = ["default", "tuned"] if options["mode"] == "both" else [options["mode"]]
+        workers, writes = options["workers"], options["writes"]
+
+        self.stdout.write(f"{workers} worker x {writes} yozuv (vaqtinchalik baza)")
+        self.stdout.write(f"{'mode':<8} {'commit':>7} {'xato':>6} {'sekund':>8} {'commit/s':>9} {'p95 ms':>8}")
+        for mode in modes:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "bench.sqlite3")
+                self._prepare(path, writes, mode)
+                started = time.perf_counter()
+                with Pool(workers) as pool:
+                    results = pool.map(_worker, [(path, mode, user_id, writes) for user_id in range(1, workers + 1)])
+                elapsed = time.perf_counter() - started
+
+            latencies = sorted(lat for lats, _ in results for lat in lats)
+            errors = sum(err for _, err in results)
+            p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0
+            self.stdout.write(
+                f"{mode:<8} {len(latencies):>7} {errors:>6} {elapsed:>8.2f} "
+                f"{len(latencies) / elapsed:>9.1f} {p95:>8.1f}"
+            )
+
+    def _prepare(self, path, writes, mode):
+        conn = sqlite3.connect(path)
+        if mode == "tuned":
+            conn.execute(SQLITE_JOURNAL_MODE)  # prod'da 0012_sqlite_wal migratsiyasi
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            "INSERT INTO video (id, section_id) VALUES (?, ?)",
+            [(i, (i - 1) // VIDEOS_PER_SECTION + 1) for i in range(1, writes + 1)],
+        )
+        conn.commit()
+        conn.close()
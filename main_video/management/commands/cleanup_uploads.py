@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from main_video.uploads import cleanup_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Uzoq vaqt davom ettirilmagan chunked uploadlarni (yozuv + .part fayl) o'chiradi."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=24, help="shuncha soatdan beri yangilanmaganlar o'chiriladi")
+
+    def handle(self, *args, **options):
+        count = cleanup_stale_uploads(options["hours"])
+        self.stdout.write(f"O'chirildi: {count} ta upload")
@@ -0,0 +1,211 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from main_video.catalog_cache import bump_version
+from main_video.models import (
+    Category, Course, CourseProgress, Question, Quiz, QuizResult, Section, SectionProgress, Users, Video,
+    VideoProgress
+)
+from main_video.progress import rebuild_progress_counters
+from main_video.search import rebuild as rebuild_search_index
+
+
+BATCH = 2000
+WORDS = (
+    "huquq jinoyat protsessual tergov kriminalistika ma'muriy konstitutsiya tezkor qidiruv "
+    "jamoat xavfsizlik yo'l harakati profilaktika fuqaro himoya dalil ekspertiza axborot "
+    "kiberxavfsizlik psixologiya etika taktika"
+).split()
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark uchun sintetik ma'lumotlar: kategoriya -> kurs -> section -> video/quiz, "
+        "userlar va ularning progress qatorlari. Hamma yozuvlar --prefix bilan belgilanadi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--categories", type=int, default=5)
+        parser.add_argument("--courses", type=int, default=4, help="har bir kategoriyada")
+        parser.add_argument("--sections", type=int, default=8, help="har bir kursda")
+        parser.add_argument("--videos", type=int, default=10, help="har bir sectionda")
+        parser.add_argument("--questions", type=int, default=20, help="har bir section quizida")
+        parser.add_argument("--students", type=int, default=500)
+        parser.add_argument("--teachers", type=int, default=20)
+        parser.add_argument("--enrollments", type=int, default=3, help="har bir student nechta kursni boshlagan")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--prefix", default="bench", help="kategoriya nomi va hemis_id prefiksi")
+        parser.add_argument("--clear", action="store_true", help="avval shu prefiksli ma'lumotlarni o'chirish")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.prefix = options["prefix"]
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            if options["clear"]:
+                self.clear()
+            elif Category.objects.filter(title__startswith=f"{self.prefix} ").exists():
+                raise CommandError(f"'{self.prefix}' prefiksli ma'lumotlar bor: --clear yoki boshqa --prefix bering")
+
+            teachers, students = self.create_users(options["teachers"], options["students"])
+            courses = self.create_catalog(options, teachers)
+            self.create_progress(students, courses, options["enrollments"])
+            # bulk_create signal yubormaydi
+            rebuild_search_index()
+        bump_version()
+
+        elapsed = time.perf_counter() - started
+        for model in (Category, Course, Section, Video, Question, Users, VideoProgress, SectionProgress,
+                      CourseProgress, QuizResult):
+            self.stdout.write(f"{model.__name__:<16} {model.objects.count():>9}")
+        self.stdout.write(self.style.SUCCESS(f"Tayyor: {elapsed:.1f} s"))
+
+    def clear(self):
+        deleted, _ = Category.objects.filter(title__startswith=f"{self.prefix} ").delete()
+        users, _ = Users.objects.filter(hemis_id__startswith=f"{self.prefix}-").delete()
+        self.stdout.write(f"O'chirildi: {deleted + users} ta yozuv")
+
+    # =========================
+    # USERS
+    # =========================
+    def create_users(self, teachers, students):
+        users = [
+            Users(hemis_id=f"{self.prefix}-t{i}", username=f"{self.prefix}-t{i}", role='teacher',
+                  first_name=_text(self.rng, 1), last_name=_text(self.rng, 1), password='!')
+            for i in range(teachers)
+        ] + [
+            Users(hemis_id=f"{self.prefix}-s{i}", username=f"{self.prefix}-s{i}", role='student',
+                  first_name=_text(self.rng, 1), last_name=_text(self.rng, 1), password='!',
+                  group=f"{self.rng.randint(100, 130)}-guruh", kurs=str(self.rng.randint(1, 4)))
+            for i in range(students)
+        ]
+        Users.objects.bulk_create(users, batch_size=BATCH)
+        created = Users.objects.filter(hemis_id__startswith=f"{self.prefix}-")
+        return (
+            list(created.filter(role='teacher').values_list('id', flat=True)),
+            list(created.filter(role='student').values_list('id', flat=True)),
+        )
+
+    # =========================
+    # KATALOG
+    # =========================
+    def create_catalog(self, options, teachers):
+        Category.objects.bulk_create([
+            Category(title=f"{self.prefix} {_text(self.rng, 2)} {i}") for i in range(options["categories"])
+        ])
+        category_ids = list(Category.objects.filter(title__startswith=f"{self.prefix} ").values_list('id', flat=True))
+
+        Course.objects.bulk_create([
+            Course(title=f"{_text(self.rng, 3)} {i}", category_id=category_id, author=_text(self.rng, 2),
+                   small_description=_text(self.rng, 12))
+            for category_id in category_ids for i in range(options["courses"])
+        ], batch_size=BATCH)
+        course_ids = list(Course.objects.filter(category_id__in=category_ids).values_list('id', flat=True))
+
+        if teachers:
+            through = Course.teacher.through
+            through.objects.bulk_create([
+                through(course_id=course_id, users_id=teacher_id)
+                for course_id in course_ids
+                for teacher_id in self.rng.sample(teachers, min(2, len(teachers)))
+            ], batch_size=BATCH)
+
+        Section.objects.bulk_create([
+            Section(title=f"{order}-mavzu. {_text(self.rng, 3)}", course_id=course_id,
+                    small_description=_text(self.rng, 10), order=order, is_blocked=order > 1)
+            for course_id in course_ids for order in range(1, options["sections"] + 1)
+        ], batch_size=BATCH)
+        sections = list(
+            Section.objects.filter(course_id__in=course_ids).order_by('course_id', 'order').values_list('id', 'course_id')
+        )
+
+        # bulk_create signal'larsiz: transcode navbatiga tushmaydi
+        Video.objects.bulk_create([
+            Video(title=f"{order}-dars. {_text(self.rng, 3)}", section_id=section_id, order=order,
+                  video_file=f"videos/{self.prefix}.mp4", small_description=_text(self.rng, 8),
+                  is_blocked=order > 1)
+            for section_id, _ in sections for order in range(1, options["videos"] + 1)
+        ], batch_size=BATCH)
+
+        if options["questions"]:
+            Quiz.objects.bulk_create([
+                Quiz(section_id=section_id, is_blocked=False, questions_count=min(10, options["questions"]))
+                for section_id, _ in sections
+            ], batch_size=BATCH)
+            quiz_ids = Quiz.objects.filter(section__course_id__in=course_ids).values_list('id', flat=True)
+            Question.objects.bulk_create([
+                Question(quiz_id=quiz_id, question=f"{_text(self.rng, 8)}?",
+                         option1=_text(self.rng, 2), option2=_text(self.rng, 2),
+                         option3=_text(self.rng, 2), option4=_text(self.rng, 2),
+                         correct_answer=str(self.rng.randint(1, 4)))
+                for quiz_id in quiz_ids for _ in range(options["questions"])
+            ], batch_size=BATCH)
+
+        courses = {}
+        for section_id, course_id in sections:
+            courses.setdefault(course_id, {'sections': []})['sections'].append(section_id)
+        videos = {}
+        for video_id, section_id in Video.objects.filter(section__course_id__in=course_ids) \
+                .order_by('section_id', 'order').values_list('id', 'section_id'):
+            videos.setdefault(section_id, []).append(video_id)
+        for course in courses.values():
+            course['videos'] = [videos.get(section_id, []) for section_id in course['sections']]
+        return courses
+
+    # =========================
+    # PROGRESS
+    # =========================
+    def create_progress(self, students, courses, enrollments):
+        """Har bir student bir nechta kursni boshidan ketma-ket ko'rgan (oxirgi section chala)"""
+        now = timezone.now()
+        quizzes = dict(Quiz.objects.filter(section_id__in=[s for c in courses.values() for s in c['sections']])
+                       .values_list('section_id', 'id'))
+        video_rows, section_rows, course_rows, quiz_rows = [], [], [], []
+
+        for user_id in students:
+            for course_id in self.rng.sample(list(courses), min(enrollments, len(courses))):
+                course = courses[course_id]
+                total = sum(len(v) for v in course['videos'])
+                watched = self.rng.randint(0, total)
+                course_rows.append(CourseProgress(user_id=user_id, course_id=course_id))
+
+                for section_id, video_ids in zip(course['sections'], course['videos']):
+                    if watched <= 0:
+                        break
+                    done = video_ids[:watched]
+                    watched -= len(done)
+                    completed = len(done) == len(video_ids)
+                    video_rows += [
+                        VideoProgress(user_id=user_id, video_id=video_id, is_completed=True, completed_at=now)
+                        for video_id in done
+                    ]
+                    section_rows.append(SectionProgress(
+                        user_id=user_id, section_id=section_id, is_completed=completed,
+                        completed_at=now if completed else None
+                    ))
+                    if completed and section_id in quizzes:
+                        quiz_rows.append(QuizResult(
+                            user_id=user_id, quiz_id=quizzes[section_id], total_questions=10,
+                            correct_answers=8, percent=80, is_passed=True, started_at=now, finished_at=now
+                        ))
+
+            if len(video_rows) >= BATCH:
+                VideoProgress.objects.bulk_create(video_rows, batch_size=BATCH)
+                video_rows = []
+
+        VideoProgress.objects.bulk_create(video_rows, batch_size=BATCH)
+        SectionProgress.objects.bulk_create(section_rows, batch_size=BATCH)
+        CourseProgress.objects.bulk_create(course_rows, batch_size=BATCH)
+        QuizResult.objects.bulk_create(quiz_rows, batch_size=BATCH)
+
+        # counterlar (completed_videos, score_percent, completed_sections, progress_percent)
+        rebuild_progress_counters(course_ids=list(courses))
@@ -0,0 +1,131 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management.base import BaseCommand
+
+
+def _student_row(i):
+    return {
+        "student_id_number": f"S{i:07d}",
+        "group_name": f"{100 + i % 20}-guruh",
+        "first_name": f"Talaba{i}",
+        "second_name": f"Familiya{i}",
+        "third_name": "",
+        "course": str(1 + i % 4),
+        "avg_mark": f"{3 + (i % 20) / 10:.2f}",
+        "image": json.dumps({"base_url": "http://hemis.local/static", "path": f"/img/s{i}.jpg"}),
+    }
+
+
+def _teacher_row(i):
+    return {
+        "employee_id_number": f"T{i:06d}",
+        "department_name": f"{1 + i % 5}-kafedra",
+        "first_name": f"Oqituvchi{i}",
+        "second_name": f"Familiya{i}",
+        "third_name": "",
+        "employee_img": "",
+    }
+
+
+def make_server(port=8765, students=1000, teachers=100, fail_rate=0.0, delay=0.0, failures=None, log=None):
+    """
+    Soxta HEMIS serveri (ishga tushirilmagan). port=0 - bo'sh port.
+
+    ``failures`` - {(path, page): [status, ...]}: shu sahifaga keyingi so'rovlar
+    navbat bilan shu statuslarni oladi (testlarda xato kiritish uchun).
+    ``server.requests`` - [(path, page, status), ...], ``server.max_active`` -
+    bir vaqtda ishlangan sahifa so'rovlarining eng ko'p soni.
+    """
+    datasets = {
+        "/api/hemis/students": (students, _student_row),
+        "/api/hemis/teacher": (teachers, _teacher_row),
+    }
+    failures = {key: list(statuses) for key, statuses in (failures or {}).items()}
+    lock = threading.Lock()
+    active = [0]
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if urlparse(self.path).path == "/api/auth/login":
+                self._send(200, {"token": "stub-token"})
+            else:
+                self._send(404, {"detail": "not found"})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path not in datasets:
+                return self._send(404, {"detail": "not found"})
+            if self.headers.get("Authorization") != "Bearer stub-token":
+                return self._send(401, {"detail": "unauthorized"})
+
+            query = parse_qs(url.query)
+            page = int(query.get("currPage", ["1"])[0])
+            size = int(query.get("size", ["200"])[0])
+            with lock:
+                active[0] += 1
+                server.max_active = max(server.max_active, active[0])
+                queued = failures.get((url.path, page))
+                status = queued.pop(0) if queued else 200
+            try:
+                if delay:
+                    time.sleep(delay)
+                if status == 200 and fail_rate and random.random() < fail_rate:
+                    status = 503
+                server.requests.append((url.path, page, status))
+                if status != 200:
+                    return self._send(status, {"detail": "stub: vaqtinchalik xato"})
+
+                total, make_row = datasets[url.path]
+                start = (page - 1) * size
+                rows = [make_row(i) for i in range(start, min(start + size, total))]
+                self._send(200, {"total": total, "rows": rows})
+            finally:
+                with lock:
+                    active[0] -= 1
+
+        def log_message(self, format, *args):
+            if log:
+                log(f"{self.address_string()} {format % args}")
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    server.requests = []
+    server.max_active = 0
+    return server
+
+
+class Command(BaseCommand):
+    help = "import_hemis_users ni offline sinash uchun soxta HEMIS API (login, students, teacher)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--students", type=int, default=1000, help="studentlar soni")
+        parser.add_argument("--teachers", type=int, default=100, help="o'qituvchilar soni")
+        parser.add_argument("--fail-rate", type=float, default=0.0, help="sahifa so'rovlarining qancha qismi 503 qaytaradi (0..1)")
+        parser.add_argument("--delay", type=float, default=0.0, help="har bir sahifa uchun kechikish (sekund)")
+
+    def handle(self, *args, **options):
+        server = make_server(
+            options["port"], options["students"], options["teachers"],
+            fail_rate=options["fail_rate"], delay=options["delay"], log=self.stdout.write,
+        )
+        self.stdout.write(f"Stub HEMIS: http://127.0.0.1:{server.server_address[1]}/api (Ctrl+C - to'xtatish)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
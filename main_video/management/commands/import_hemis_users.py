@@ -1,10 +1,26 @@
+import hashlib
 import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from decimal import Decimal, InvalidOperation
-from typing import Any, Dict, Iterable, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
+import django
 import requests
+import urllib3
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from main_video import search
+from main_video.catalog_cache import bump_version
+from main_video.models import Course
 
 
 # ====== HEMIS CONFIG (env shart emas) ======
@@ -19,6 +35,20 @@ TIMEOUT = 300
 PAGE_SIZE_STUDENTS = 200
 PAGE_SIZE_TEACHERS = 200
 
+CONCURRENCY = 4  # bir vaqtda olinadigan sahifalar soni
+RETRIES = 3
+BACKOFF_BASE = 1.0  # sekund: 1, 2, 4, ...
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# bulk rejimda yangilanadigan fieldlar (username = hemis_id)
+BULK_UPDATE_FIELDS = [
+    "username", "role", "group", "first_name", "last_name", "third_name", "kurs", "avg_mark", "imgage", "hemis_hash",
+    "is_active",
+]
+# --delta: shu fieldlar o'zgarmagan bo'lsa user yozilmaydi
+HASH_FIELDS = ["role", "group", "first_name", "last_name", "third_name", "kurs", "avg_mark", "img_url"]
+DEACTIVATE_BATCH = 500
+
 GREEN = "\033[92m"
 RED = "\033[91m"
 RESET = "\033[0m"
@@ -68,6 +98,75 @@ def _fio(first: str, second: str, third: str) -> str:
     return fio.strip() or "NO_NAME"
 
 
+def _student_fields(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "hemis_id": (row.get("student_id_number") or "").strip(),
+        "role": "student",
+        "group": (row.get("group_name") or "").strip(),
+        "first_name": (row.get("first_name") or "").strip(),
+        "last_name": (row.get("second_name") or "").strip(),
+        "third_name": (row.get("third_name") or "").strip(),
+        "kurs": (row.get("course") or "").strip(),
+        "avg_mark": _safe_decimal(row.get("avg_mark")),
+        "img_url": _build_img_url(_json_loads_maybe(row.get("image"))),
+    }
+
+
+def _teacher_fields(row: Dict[str, Any]) -> Dict[str, Any]:
+    raw = row.get("employee_id_number")
+    return {
+        "hemis_id": raw.strip() if isinstance(raw, str) else "",
+        "role": "teacher",
+        "group": (row.get("department_name") or "").strip(),
+        "first_name": (row.get("first_name") or "").strip(),
+        "last_name": (row.get("second_name") or "").strip(),
+        "third_name": (row.get("third_name") or "").strip(),
+        "kurs": None,
+        "avg_mark": None,
+        "img_url": _build_img_url(_json_loads_maybe(row.get("employee_img"))),
+    }
+
+
+def _record_hash(fields: Dict[str, Any]) -> str:
+    """HEMIS yozuvining mazmuni bo'yicha hash (Users.hemis_hash)"""
+    values = [fields.get(name) for name in HASH_FIELDS]
+    raw = json.dumps([str(v) if isinstance(v, Decimal) else v for v in values], ensure_ascii=False)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _apply_fields(user, *, hemis_id, role, group, first_name, last_name, third_name, kurs, avg_mark, img_url) -> None:
+    # MUST: unique username
+    user.username = hemis_id
+    # HEMIS'da bor: --deactivate-missing bilan o'chirilgan bo'lsa qayta ochiladi
+    user.is_active = True
+
+    # only your model fields:
+    user.role = role
+    user.group = (group[:30] if group else None)
+    user.first_name = first_name or None
+    user.last_name = last_name or None
+    user.third_name = third_name or None
+
+    if role == "student":
+        user.kurs = kurs or None
+        user.avg_mark = avg_mark if avg_mark is not None else Decimal("0")
+
+    # imgage URL saqlanadi (model: URLField/CharField bo‘lishi shart)
+    if img_url:
+        user.imgage = img_url
+
+    user.hemis_hash = _record_hash({
+        "role": role,
+        "group": group,
+        "first_name": first_name,
+        "last_name": last_name,
+        "third_name": third_name,
+        "kurs": kurs,
+        "avg_mark": avg_mark,
+        "img_url": img_url,
+    })
+
+
 class Command(BaseCommand):
     help = "Import HEMIS Students/Teachers into local Users. Prints ✅ / ❌ per record."
 
@@ -75,44 +174,99 @@ class Command(BaseCommand):
         parser.add_argument("--only", choices=["students", "teachers", "both"], default="both")
         parser.add_argument("--reset-passwords", action="store_true", help="existing userlarda ham passwordni set qiladi")
         parser.add_argument("--dry-run", action="store_true", help="DBga yozmaydi, faqat log")
+        parser.add_argument("--bulk", action="store_true", help="har bir sahifani bulk_create/bulk_update bilan yozadi")
+        parser.add_argument("--base-url", default=BASE_URL, help="HEMIS API manzili (masalan hemis_stub_server uchun)")
+        parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="parallel olinadigan sahifalar soni")
+        parser.add_argument("--retries", type=int, default=RETRIES, help="har bir so'rov uchun qayta urinishlar soni")
+        parser.add_argument("--timeout", type=int, default=TIMEOUT, help="HTTP timeout (sekund)")
+        parser.add_argument(
+            "--password-workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="bulk rejimda password hash uchun process soni (1 = process pool ishlatilmaydi)",
+        )
+        parser.add_argument("--delta", action="store_true", help="hemis_hash o'zgarmagan userlarni yozmaydi, HEMIS'da yo'qlarini ko'rsatadi")
+        parser.add_argument(
+            "--deactivate-missing",
+            action="store_true",
+            help="HEMIS'da endi yo'q student/teacherlarni is_active=False qiladi (xatosiz to'liq importdan keyin; HEMIS'ga qaytsa yana aktiv bo'ladi)",
+        )
 
     # ---------- HTTP ----------
     def _api_login(self, session: requests.Session) -> str:
-        url = f"{BASE_URL}/auth/login"
-        r = session.post(url, params={"login": LOGIN, "password": PASSWORD}, headers={"accept": "*/*"}, timeout=TIMEOUT)
+        url = f"{self.base_url}/auth/login"
+        r = session.post(url, params={"login": LOGIN, "password": PASSWORD}, headers={"accept": "*/*"}, timeout=self.timeout)
         r.raise_for_status()
         token = r.json().get("token")
         if not token:
             raise RuntimeError("HEMIS login: token qaytmadi")
         return token
 
+    def _session(self) -> requests.Session:
+        """Har bir thread uchun alohida Session (requests.Session thread-safe emas)"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def _get_json(self, url: str, headers: Dict[str, str], params: Dict[str, Any]) -> Dict[str, Any]:
+        """GET + JSON, tarmoq xatolari va 429/5xx uchun exponential backoff bilan qayta urinadi"""
+        for attempt in range(self.retries + 1):
+            try:
+                r = self._session().get(url, headers=headers, params=params, timeout=self.timeout, stream=True)
+                with r:
+                    r.raise_for_status()
+                    # body to'liq matn sifatida yig'ilmaydi, socketdan to'g'ridan-to'g'ri decode qilinadi
+                    r.raw.decode_content = True
+                    return json.load(r.raw)
+            except (requests.RequestException, urllib3.exceptions.HTTPError, ValueError) as e:
+                response = getattr(e, "response", None)
+                retryable = response is None or response.status_code in RETRY_STATUSES
+                if not retryable or attempt >= self.retries:
+                    raise
+                delay = BACKOFF_BASE * (2 ** attempt)
+                print(f"{RED}↻{RESET} page={params.get('currPage')} qayta urinish {attempt + 1}/{self.retries} ({e}), {delay:.1f}s")
+                time.sleep(delay)
+
     def _fetch_pages(self, session: requests.Session, url: str, headers: Dict[str, str], page_size: int) -> Iterable[Dict[str, Any]]:
-        curr = 1
-        total = None
-        while True:
-            r = session.get(
-                url,
-                headers=headers,
-                params={"currPage": curr, "size": page_size, "descending": "false", "order_by_": "id"},
-                timeout=TIMEOUT,
-            )
-            r.raise_for_status()
-            payload = r.json()
-
-            if total is None:
-                total = int(payload.get("total") or 0)
-
-            rows = payload.get("rows") or []
-            if not rows:
-                break
-
-            for row in rows:
-                if isinstance(row, dict):
-                    yield row
-
-            if curr * page_size >= total:
-                break
-            curr += 1
+        for rows in self._iter_pages(session, url, headers, page_size):
+            yield from rows
+
+    def _iter_pages(self, session: requests.Session, url: str, headers: Dict[str, str], page_size: int) -> Iterable[List[Dict[str, Any]]]:
+        """
+        1-sahifa ketma-ket olinadi (total uchun), qolganlari --concurrency ta
+        thread bilan parallel olinadi, lekin tartib bo'yicha yield qilinadi.
+        Oldindan olingan sahifalar soni --concurrency dan oshmaydi.
+        """
+        def params(page: int) -> Dict[str, Any]:
+            return {"currPage": page, "size": page_size, "descending": "false", "order_by_": "id"}
+
+        payload = self._get_json(url, headers, params(1))
+        total = int(payload.get("total") or 0)
+        rows = payload.get("rows") or []
+        if not rows:
+            return
+        yield [row for row in rows if isinstance(row, dict)]
+
+        last_page = math.ceil(total / page_size)
+        if last_page <= 1:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            pending = deque()
+            next_page = 2
+            while pending or next_page <= last_page:
+                while next_page <= last_page and len(pending) < self.concurrency:
+                    pending.append(pool.submit(self._get_json, url, headers, params(next_page)))
+                    next_page += 1
+
+                rows = pending.popleft().result().get("rows") or []
+                if not rows:
+                    for future in pending:
+                        future.cancel()
+                    return
+                yield [row for row in rows if isinstance(row, dict)]
 
     # ---------- CORE UPSERT ----------
     def _upsert(
@@ -141,23 +295,18 @@ class Command(BaseCommand):
         if created:
             user = User(hemis_id=hemis_id)
 
-        # MUST: unique username
-        user.username = hemis_id
-
-        # only your model fields:
-        user.role = role
-        user.group = (group[:30] if group else None)
-        user.first_name = first_name or None
-        user.last_name = last_name or None
-        user.third_name = third_name or None
-
-        if role == "student":
-            user.kurs = kurs or None
-            user.avg_mark = avg_mark if avg_mark is not None else Decimal("0")
-
-        # imgage URL saqlanadi (model: URLField/CharField bo‘lishi shart)
-        if img_url:
-            user.imgage = img_url
+        _apply_fields(
+            user,
+            hemis_id=hemis_id,
+            role=role,
+            group=group,
+            first_name=first_name,
+            last_name=last_name,
+            third_name=third_name,
+            kurs=kurs,
+            avg_mark=avg_mark,
+            img_url=img_url,
+        )
 
         if created or reset_passwords:
             user.set_password(hemis_id)
@@ -167,110 +316,220 @@ class Command(BaseCommand):
 
         return created
 
+    # ---------- ROW-BY-ROW ----------
+    def _import_record(self, User, kind: str, fields: Dict[str, Any], fio: str, *, reset_passwords: bool, dry_run: bool) -> None:
+        hemis_id = fields["hemis_id"]
+        try:
+            created = self._upsert(User=User, **fields, reset_passwords=reset_passwords, dry_run=dry_run)
+            self._report(kind, created, fio, hemis_id)
+        except Exception as e:
+            self.counts["errors"] += 1
+            print(f"{RED}✗{RESET} [{kind}][ERROR] {fio} | hemis_id={hemis_id} | {e}")
+
+    def _report(self, kind: str, created: bool, fio: str, hemis_id: str) -> None:
+        if created:
+            self.counts["created"] += 1
+            print(f"{GREEN}✓{RESET} [{kind}][CREATED] {fio} | hemis_id={hemis_id}")
+        else:
+            self.counts["updated"] += 1
+            print(f"{GREEN}✓{RESET} [{kind}][UPDATED] {fio} | hemis_id={hemis_id}")
+
+    def _parse_rows(self, kind: str, rows: List[Dict[str, Any]], fields_fn) -> List[tuple]:
+        records = []
+        for row in rows:
+            fio = _fio(row.get("first_name"), row.get("second_name"), row.get("third_name"))
+            try:
+                fields = fields_fn(row)
+            except Exception as e:
+                self.counts["errors"] += 1
+                print(f"{RED}✗{RESET} [{kind}][ERROR] {fio} | {e}")
+                continue
+
+            if not fields["hemis_id"]:
+                self.counts["skipped"] += 1
+                print(f"{RED}✗{RESET} [{kind}] SKIP(no hemis_id) {fio}")
+                continue
+            records.append((fields, fio))
+        return records
+
+    # ---------- DELTA ----------
+    def _changed_records(self, User, records: List[tuple], *, reset_passwords: bool) -> List[tuple]:
+        """Sahifadagi hemis_hash'i o'zgarmagan yozuvlarni tashlab yuborish (bitta query)"""
+        if reset_passwords:
+            return records
+        stored = dict(User.objects.filter(hemis_id__in=[f["hemis_id"] for f, _ in records]).values_list("hemis_id", "hemis_hash"))
+        changed = []
+        for fields, fio in records:
+            if stored.get(fields["hemis_id"]) == _record_hash(fields):
+                self.counts["unchanged"] += 1
+            else:
+                changed.append((fields, fio))
+        return changed
+
+    def _missing_upstream(self, User, role: str, seen: set) -> List[str]:
+        active = User.objects.filter(role=role, is_active=True).values_list("hemis_id", flat=True)
+        return sorted(set(active) - seen)
+
+    def _deactivate(self, User, hemis_ids: List[str]) -> int:
+        deactivated = 0
+        for i in range(0, len(hemis_ids), DEACTIVATE_BATCH):
+            chunk = hemis_ids[i:i + DEACTIVATE_BATCH]
+            # hash tozalanadi: HEMIS'ga qaytsa --delta yozuvni o'zgarmagan deb tashlab ketmaydi
+            deactivated += User.objects.filter(hemis_id__in=chunk, is_active=True).update(is_active=False, hemis_hash="")
+        return deactivated
+
+    # ---------- BULK ----------
+    def _hash_passwords(self, raw_passwords: List[str], pool: Optional[ProcessPoolExecutor]) -> List[str]:
+        if pool is None or len(raw_passwords) < 2:
+            return [make_password(raw) for raw in raw_passwords]
+        chunksize = max(1, len(raw_passwords) // (self.password_workers * 4))
+        return list(pool.map(make_password, raw_passwords, chunksize=chunksize))
+
+    def _import_page_bulk(self, User, kind: str, records: List[tuple], *, reset_passwords: bool, dry_run: bool, pool) -> None:
+        """
+        Bitta sahifa: mavjud userlar bitta query bilan olinadi, keyin
+        bulk_create + bulk_update bitta transaction ichida.
+        Xato bo'lsa sahifa row-by-row rejimda qayta yoziladi.
+        """
+        existing = {u.hemis_id: u for u in User.objects.filter(hemis_id__in=[f["hemis_id"] for f, _ in records])}
+
+        to_create, to_update, results = [], [], []
+        page_users = {}
+        changed_teachers = set()
+        for fields, fio in records:
+            hemis_id = fields["hemis_id"]
+            user = page_users.get(hemis_id) or existing.get(hemis_id)
+            # sahifada takrorlangan hemis_id ikkinchi marta UPDATED hisoblanadi (row-by-row rejimdagidek)
+            created = user is None
+            if created:
+                user = User(hemis_id=hemis_id)
+                to_create.append(user)
+            elif hemis_id not in page_users:
+                to_update.append(user)
+            page_users[hemis_id] = user
+            old_role, old_hash = user.role, user.hemis_hash
+            _apply_fields(user, **fields)
+            if not created and "teacher" in (old_role, user.role) and user.hemis_hash != old_hash:
+                changed_teachers.add(user.pk)
+            results.append((created, fio, hemis_id))
+
+        if not dry_run:
+            need_password = to_create + (to_update if reset_passwords else [])
+            for user, password in zip(need_password, self._hash_passwords([u.hemis_id for u in need_password], pool)):
+                user.password = password
+
+            update_fields = BULK_UPDATE_FIELDS + (["password"] if reset_passwords else [])
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create(to_create, batch_size=len(records))
+                    User.objects.bulk_update(to_update, update_fields, batch_size=len(records))
+            except Exception as e:
+                print(f"{RED}✗{RESET} [{kind}][BULK] sahifa yozilmadi ({e}), row-by-row rejimga o'tildi")
+                for fields, fio in records:
+                    self._import_record(User, kind, fields, fio, reset_passwords=reset_passwords, dry_run=dry_run)
+                return
+            self._teachers_changed(changed_teachers)
+
+        for created, fio, hemis_id in results:
+            self._report(kind, created, fio, hemis_id)
+
+    def _teachers_changed(self, teacher_ids) -> None:
+        """
+        bulk_update post_save yubormaydi: teacher ismi chiqadigan kurslar uchun
+        Users post_save receiver'lari qiladigan ishni bitta to'plamda bajaramiz -
+        Course.updated_at (ETag), katalog cache versiyasi va qidiruv indeksi.
+        """
+        if not teacher_ids:
+            return
+        course_ids = list(Course.objects.filter(teacher__in=teacher_ids).values_list("id", flat=True).distinct())
+        if not course_ids:
+            return
+        Course.objects.filter(pk__in=course_ids).update(updated_at=timezone.now())
+        bump_version()
+        search.index("course", course_ids)
+
     def handle(self, *args, **options):
         only = options["only"]
         reset_passwords = options["reset_passwords"]
         dry_run = options["dry_run"]
+        bulk = options["bulk"]
+        delta = options["delta"]
+        deactivate_missing = options["deactivate_missing"]
+
+        self.base_url = options["base_url"].rstrip("/")
+        self.concurrency = max(1, options["concurrency"])
+        self.retries = max(0, options["retries"])
+        self.timeout = options["timeout"]
+        self._local = threading.local()
 
         User = get_user_model()
-        session = requests.Session()
+        session = self._session()
         token = self._api_login(session)
         headers = {"accept": "*/*", "Authorization": f"Bearer {token}"}
 
-        created_count = 0
-        updated_count = 0
-        error_count = 0
-        skipped_count = 0
+        self.counts = {"created": 0, "updated": 0, "unchanged": 0, "skipped": 0, "errors": 0}
+        seen = {kind: set() for kind in ("student", "teacher")}
 
-        # ---------- STUDENTS ----------
+        sources = []
         if only in ("students", "both"):
-            url = f"{BASE_URL}{STUDENTS_ENDPOINT}"
-            for row in self._fetch_pages(session, url, headers, PAGE_SIZE_STUDENTS):
-                hemis_id = (row.get("student_id_number") or "").strip()
-                fio = _fio(row.get("first_name"), row.get("second_name"), row.get("third_name"))
-
-                if not hemis_id:
-                    skipped_count += 1
-                    print(f"{RED}✗{RESET} [student] SKIP(no hemis_id) {fio}")
-                    continue
-
-                try:
-                    img_obj = _json_loads_maybe(row.get("image"))
-                    img_url = _build_img_url(img_obj)
-
-                    created = self._upsert(
-                        User=User,
-                        hemis_id=hemis_id,
-                        role="student",
-                        group=(row.get("group_name") or "").strip(),
-                        first_name=(row.get("first_name") or "").strip(),
-                        last_name=(row.get("second_name") or "").strip(),
-                        third_name=(row.get("third_name") or "").strip(),
-                        kurs=(row.get("course") or "").strip(),
-                        avg_mark=_safe_decimal(row.get("avg_mark")),
-                        img_url=img_url,
-                        reset_passwords=reset_passwords,
-                        dry_run=dry_run,
-                    )
-
-                    if created:
-                        created_count += 1
-                        print(f"{GREEN}✓{RESET} [student][CREATED] {fio} | hemis_id={hemis_id}")
-                    else:
-                        updated_count += 1
-                        print(f"{GREEN}✓{RESET} [student][UPDATED] {fio} | hemis_id={hemis_id}")
-
-                except Exception as e:
-                    error_count += 1
-                    print(f"{RED}✗{RESET} [student][ERROR] {fio} | hemis_id={hemis_id} | {e}")
-
-        # ---------- TEACHERS ----------
+            sources.append(("student", f"{self.base_url}{STUDENTS_ENDPOINT}", PAGE_SIZE_STUDENTS, _student_fields))
         if only in ("teachers", "both"):
-            url = f"{BASE_URL}{TEACHERS_ENDPOINT}"
-            for row in self._fetch_pages(session, url, headers, PAGE_SIZE_TEACHERS):
-                raw = row.get("employee_id_number")
-                hemis_id = raw.strip() if isinstance(raw, str) else ""
-                fio = _fio(row.get("first_name"), row.get("second_name"), row.get("third_name"))
-
-                if not hemis_id:
-                    skipped_count += 1
-                    print(f"{RED}✗{RESET} [teacher] SKIP(no hemis_id) {fio}")
-                    continue
-
-                try:
-                    img_obj = _json_loads_maybe(row.get("employee_img"))
-                    img_url = _build_img_url(img_obj)
-
-                    created = self._upsert(
-                        User=User,
-                        hemis_id=hemis_id,
-                        role="teacher",
-                        group=(row.get("department_name") or "").strip(),
-                        first_name=(row.get("first_name") or "").strip(),
-                        last_name=(row.get("second_name") or "").strip(),
-                        third_name=(row.get("third_name") or "").strip(),
-                        kurs=None,
-                        avg_mark=None,
-                        img_url=img_url,
-                        reset_passwords=reset_passwords,
-                        dry_run=dry_run,
-                    )
-
-                    if created:
-                        created_count += 1
-                        print(f"{GREEN}✓{RESET} [teacher][CREATED] {fio} | hemis_id={hemis_id}")
+            sources.append(("teacher", f"{self.base_url}{TEACHERS_ENDPOINT}", PAGE_SIZE_TEACHERS, _teacher_fields))
+
+        # PBKDF2 hash CPU'ni band qiladi — bulk rejimda process pool'ga beriladi
+        pool = None
+        self.password_workers = options["password_workers"]
+        if bulk and not dry_run and self.password_workers > 1:
+            pool = ProcessPoolExecutor(max_workers=options["password_workers"], initializer=django.setup)
+
+        try:
+            for kind, url, page_size, fields_fn in sources:
+                for rows in self._iter_pages(session, url, headers, page_size):
+                    records = self._parse_rows(kind, rows, fields_fn)
+                    seen[kind].update(fields["hemis_id"] for fields, _ in records)
+                    if delta and records:
+                        records = self._changed_records(User, records, reset_passwords=reset_passwords)
+                    if not records:
+                        continue
+                    if bulk:
+                        self._import_page_bulk(
+                            User, kind, records, reset_passwords=reset_passwords, dry_run=dry_run, pool=pool
+                        )
                     else:
-                        updated_count += 1
-                        print(f"{GREEN}✓{RESET} [teacher][UPDATED] {fio} | hemis_id={hemis_id}")
-
-                except Exception as e:
-                    error_count += 1
-                    print(f"{RED}✗{RESET} [teacher][ERROR] {fio} | hemis_id={hemis_id} | {e}")
+                        for fields, fio in records:
+                            self._import_record(
+                                User, kind, fields, fio, reset_passwords=reset_passwords, dry_run=dry_run
+                            )
+        finally:
+            if pool is not None:
+                pool.shutdown()
 
         print("\n==== SUMMARY ====")
-        print(f"Created: {created_count}")
-        print(f"Updated: {updated_count}")
-        print(f"Skipped: {skipped_count}")
-        print(f"Errors:  {error_count}")
+        print(f"Created: {self.counts['created']}")
+        print(f"Updated: {self.counts['updated']}")
+        if delta:
+            print(f"Unchanged: {self.counts['unchanged']}")
+        print(f"Skipped: {self.counts['skipped']}")
+        print(f"Errors:  {self.counts['errors']}")
+        if delta or deactivate_missing:
+            self._report_missing(User, [kind for kind, *_ in sources], seen, deactivate=deactivate_missing and not dry_run)
         if dry_run:
             print("DRY-RUN: DBga yozilmadi.")
+
+    def _report_missing(self, User, kinds: List[str], seen: Dict[str, set], *, deactivate: bool) -> None:
+        """HEMIS'da endi yo'q, lekin bazada aktiv userlar (faqat to'liq import qilingan rollar uchun)"""
+        if self.counts["errors"]:
+            print(f"{RED}✗{RESET} Importda xatolar bor: HEMIS'da yo'q userlar tekshirilmadi.")
+            return
+
+        for kind in kinds:
+            if not seen[kind]:
+                # bo'sh javob: hamma userni o'chirib yubormaslik uchun
+                print(f"{RED}✗{RESET} [{kind}] HEMIS'dan birorta ham yozuv kelmadi, tekshirilmadi.")
+                continue
+            missing = self._missing_upstream(User, kind, seen[kind])
+            print(f"[{kind}] HEMIS'da yo'q aktiv userlar: {len(missing)}")
+            for hemis_id in missing:
+                print(f"  - {hemis_id}")
+            if deactivate and missing:
+                print(f"[{kind}] Deactivated: {self._deactivate(User, missing)}")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main_video.certificates import issue_certificates
+from main_video.models import Course
+
+
+class Command(BaseCommand):
+    help = "Barcha sectionlarni tugatgan userlarga sertifikat beradi (kurs bo'yicha bulk)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--course", type=int, help="faqat shu kurs uchun (id), berilmasa barcha kurslar")
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options["course"]:
+            courses = courses.filter(id=options["course"])
+            if not courses.exists():
+                raise CommandError(f"Course topilmadi: {options['course']}")
+
+        total = 0
+        for course in courses:
+            created = issue_certificates(course)
+            total += created
+            if created:
+                self.stdout.write(f"{course.title}: {created} ta sertifikat")
+        self.stdout.write(f"Jami: {total} ta sertifikat yaratildi")
@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from main_video.progress import rebuild_progress_counters
+
+
+class Command(BaseCommand):
+    help = "SectionProgress.completed_videos va CourseProgress.completed_sections counterlarini VideoProgress'dan qayta hisoblaydi."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="faqat shu hemis_id li user uchun")
+        parser.add_argument("--course", type=int, help="faqat shu kurs uchun (id)")
+        parser.add_argument("--dry-run", action="store_true", help="DBga yozmaydi, faqat nechta qator o'zgarishini ko'rsatadi")
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options["user"]:
+            user_ids = list(get_user_model().objects.filter(hemis_id=options["user"]).values_list("id", flat=True))
+            if not user_ids:
+                raise CommandError(f"User topilmadi: {options['user']}")
+        course_ids = [options["course"]] if options["course"] else None
+
+        with transaction.atomic():
+            sections, courses = rebuild_progress_counters(user_ids=user_ids, course_ids=course_ids)
+            if options["dry_run"]:
+                transaction.set_rollback(True)
+
+        self.stdout.write(f"SectionProgress: {sections} ta qator yangilandi")
+        self.stdout.write(f"CourseProgress:  {courses} ta qator yangilandi")
+        if options["dry_run"]:
+            self.stdout.write("DRY-RUN: DBga yozilmadi.")
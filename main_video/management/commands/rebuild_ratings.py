@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from main_video.ratings import rebuild_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = "Video, Course va Category dagi rating_sum / rating_count ni VideoRating jadvalidan qayta hisoblaydi."
+
+    def handle(self, *args, **options):
+        updated = rebuild_rating_aggregates()
+        self.stdout.write(f"{updated} ta qator yangilandi")
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from main_video.search import rebuild
+
+
+class Command(BaseCommand):
+    help = "Kurs va sectionlar qidiruv indeksini (FTS5 / tsvector) noldan quradi. bulk_create / loaddata dan keyin kerak."
+
+    def handle(self, *args, **options):
+        counts = rebuild()
+        for kind, total in counts.items():
+            self.stdout.write(f"{kind}: {total} ta hujjat")
@@ -0,0 +1,217 @@
+import json
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from main_video.metrics import get_budget, query_budget
+from main_video.models import CourseProgress, Section, SectionProgress, Users, Video, VideoProgress
+
+
+# benchmark nomi -> metrics / QUERY_BUDGETS dagi endpoint nomi
+BENCHMARKS = {
+    'categories': 'CategoryViewSet.list',
+    'course_main': 'CourseMainViewSet.list',
+    'section_one': 'SectionOneViewSet.retrieve',
+    'full_info': 'SectionOneViewSet.full_info',
+    'mark_as_watched': 'VideoViewSet.mark_as_watched',
+    'quiz_submit': 'SectionOneViewSet.submit_quiz',
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR
+        ).stdout.strip()
+    except OSError:
+        return ''
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Asosiy endpointlar uchun latency va SQL so'rovlar soni (generate_dataset ma'lumotlarida). "
+        "Har bir iteratsiya rollback qilinadi, natija JSON'ga yoziladi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=30)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument("--prefix", default="bench", help="generate_dataset --prefix")
+        parser.add_argument("--user", help="benchmark qilinadigan userning hemis_id si")
+        parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="faqat shu benchmarklar")
+        parser.add_argument("--cold-cache", action="store_true", help="har iteratsiyadan oldin katalog cache tozalanadi")
+        parser.add_argument("--output", default="benchmark.json")
+        parser.add_argument("--compare", help="oldingi natija JSON fayli bilan solishtirish")
+        parser.add_argument("--strict", action="store_true", help="QUERY_BUDGETS oshsa xato bilan chiqish")
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.pick_targets(options["prefix"], options["user"])
+
+        setup_test_environment()  # APIClient uchun ALLOWED_HOSTS'ga 'testserver'
+        try:
+            self.client = APIClient()
+            # haqiqiy JWT: autentifikatsiya query'si ham o'lchovga kiradi
+            self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+            results = {name: self.run(name) for name in options["only"] or BENCHMARKS}
+        finally:
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'commit': _git_commit(),
+                'created_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'iterations': options["iterations"],
+                'cold_cache': options["cold_cache"],
+                'user': self.user.hemis_id,
+                'section': self.section.pk,
+                'video': self.video.pk,
+            },
+            'results': results,
+        }
+        with open(options["output"], 'w') as f:
+            json.dump(report, f, indent=2)
+
+        self.print_table(results, self.load_previous(options["compare"]))
+        self.stdout.write(f"Natija: {options['output']}")
+
+        over = [name for name, result in results.items() if result['over_budget']]
+        if options["strict"] and over:
+            raise CommandError(f"Query budget oshdi: {', '.join(over)}")
+
+    # =========================
+    # TARGETLAR
+    # =========================
+    def pick_targets(self, prefix, hemis_id):
+        """Kursni chala o'tgan student, uning joriy sectioni va keyingi ko'rilmagan videosi"""
+        if hemis_id:
+            self.user = Users.objects.filter(hemis_id=hemis_id).first()
+            if self.user is None:
+                raise CommandError(f"User topilmadi: {hemis_id}")
+            progress = CourseProgress.objects.filter(user=self.user, is_completed=False).first()
+        else:
+            progress = CourseProgress.objects.filter(
+                user__hemis_id__startswith=f"{prefix}-s", is_completed=False, progress_percent__gt=0
+            ).select_related('user').order_by('id').first()
+            if progress is None:
+                raise CommandError("Ma'lumot yo'q: avval `python manage.py generate_dataset` ni ishga tushiring")
+            self.user = progress.user
+        if progress is None:
+            raise CommandError("Userda tugallanmagan kurs yo'q")
+
+        completed = SectionProgress.objects.filter(user=self.user, is_completed=True).values('section_id')
+        self.section = Section.objects.filter(course_id=progress.course_id).exclude(pk__in=completed) \
+            .order_by('order').first()
+        watched = VideoProgress.objects.filter(user=self.user, is_completed=True).values('video_id')
+        self.video = Video.objects.filter(section=self.section).exclude(pk__in=watched).order_by('order').first()
+        if self.section is None or self.video is None:
+            raise CommandError("Joriy section yoki ko'rilmagan video topilmadi")
+
+    # =========================
+    # SO'ROVLAR
+    # =========================
+    def request_for(self, name):
+        """(method, url, data) - kerak bo'lsa holat tayyorlanadi (rollback qilinadigan transaction ichida)"""
+        if name == 'categories':
+            return 'get', '/api/categories/', None
+        if name == 'course_main':
+            return 'get', '/api/course_main/', None
+        if name == 'section_one':
+            return 'get', f'/api/section_one/{self.section.pk}/', None
+        if name == 'full_info':
+            return 'get', f'/api/section_one/{self.section.pk}/full_info/', None
+        if name == 'mark_as_watched':
+            return 'post', f'/api/videos/{self.video.pk}/mark_as_watched/', None
+
+        # quiz_submit: sectiondagi hamma video ko'rilgan, quiz ochilgan (session savollari)
+        watched = set(VideoProgress.objects.filter(user=self.user, video__section=self.section)
+                      .values_list('video_id', flat=True))
+        VideoProgress.objects.bulk_create([
+            VideoProgress(user=self.user, video_id=video_id, is_completed=True, completed_at=timezone.now())
+            for video_id in Video.objects.filter(section=self.section).values_list('id', flat=True)
+            if video_id not in watched
+        ])
+        questions = self.client.get(f'/api/section_one/{self.section.pk}/quiz/').json().get('questions') or []
+        answers = [{'question_id': q['id'], 'answer': '1'} for q in questions]
+        return 'post', f'/api/section_one/{self.section.pk}/submit_quiz/', {'answers': answers}
+
+    def run(self, name):
+        options = self.options
+        latencies, queries, db_times, statuses = [], [], [], set()
+
+        for i in range(options["warmup"] + options["iterations"]):
+            if options["cold_cache"]:
+                caches['catalog'].clear()
+            with transaction.atomic():
+                method, url, data = self.request_for(name)
+                with query_budget() as metrics:
+                    started = time.perf_counter()
+                    if method == 'get':
+                        response = self.client.get(url)
+                    else:
+                        response = self.client.post(url, data, format='json')
+                    elapsed = time.perf_counter() - started
+                transaction.set_rollback(True)
+
+            statuses.add(response.status_code)
+            if i >= options["warmup"]:
+                latencies.append(elapsed * 1000)
+                queries.append(metrics.queries)
+                db_times.append(metrics.db_time * 1000)
+
+        endpoint = BENCHMARKS[name]
+        budget = get_budget(endpoint)
+        return {
+            'endpoint': endpoint,
+            'status': sorted(statuses),
+            'latency_ms': {
+                'min': round(min(latencies), 2),
+                'p50': round(statistics.median(latencies), 2),
+                'p95': round(_percentile(latencies, 95), 2),
+                'max': round(max(latencies), 2),
+                'mean': round(statistics.mean(latencies), 2),
+            },
+            'queries': max(queries),
+            'db_ms_p50': round(statistics.median(db_times), 2),
+            'budget': budget,
+            'over_budget': budget is not None and max(queries) > budget,
+        }
+
+    # =========================
+    # NATIJA
+    # =========================
+    def load_previous(self, path):
+        if not path:
+            return {}
+        with open(path) as f:
+            return json.load(f).get('results', {})
+
+    def print_table(self, results, previous):
+        self.stdout.write(f"{'benchmark':<16} {'status':<8} {'p50 ms':>8} {'p95 ms':>8} {'db ms':>7} {'query':>6} {'budget':>7}")
+        for name, result in results.items():
+            latency = result['latency_ms']
+            line = (
+                f"{name:<16} {','.join(map(str, result['status'])):<8} {latency['p50']:>8.2f} {latency['p95']:>8.2f} "
+                f"{result['db_ms_p50']:>7.2f} {result['queries']:>6} {result['budget'] if result['budget'] is not None else '-':>7}"
+            )
+            old = previous.get(name)
+            if old:
+                line += f"   (oldin p50 {old['latency_ms']['p50']:.2f} ms, {old['queries']} query)"
+            if result['over_budget']:
+                line = self.style.WARNING(line)
+            self.stdout.write(line)
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main_video.models import Video, VideoTranscode
+from main_video.transcoding import claim_next, transcode
+
+
+class Command(BaseCommand):
+    help = "Yuklangan videolarni HLS (bir nechta bitrate) ga o'giradi. --loop bilan worker sifatida ishlaydi."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--video", type=int, help="faqat shu video (id) ni qayta transcode qilish")
+        parser.add_argument("--loop", action="store_true", help="navbatni doimiy kuzatish")
+        parser.add_argument("--interval", type=int, default=10, help="--loop da navbat bo'sh bo'lsa kutish (sekund)")
+        parser.add_argument("--retry-failed", action="store_true", help="failed bo'lganlarni qayta navbatga qo'yish")
+        parser.add_argument("--enqueue-missing", action="store_true", help="transcode yozuvi yo'q videolarni navbatga qo'yish")
+
+    def handle(self, *args, **options):
+        if options["video"]:
+            video = Video.objects.filter(id=options["video"]).first()
+            if video is None:
+                raise CommandError(f"Video topilmadi: {options['video']}")
+            VideoTranscode.objects.update_or_create(
+                video=video,
+                defaults={"status": "pending", "source_name": video.video_file.name, "error": ""}
+            )
+
+        if options["retry_failed"]:
+            count = VideoTranscode.objects.filter(status="failed").update(status="pending", error="")
+            self.stdout.write(f"Qayta navbatga qo'yildi: {count}")
+
+        if options["enqueue_missing"]:
+            missing = Video.objects.filter(transcode__isnull=True).exclude(video_file="")
+            created = VideoTranscode.objects.bulk_create(
+                [VideoTranscode(video=video, source_name=video.video_file.name) for video in missing],
+                ignore_conflicts=True
+            )
+            self.stdout.write(f"Navbatga qo'shildi: {len(created)}")
+
+        done = failed = 0
+        while True:
+            item = claim_next()
+            if item is None:
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+                continue
+
+            self.stdout.write(f"Transcode: video={item.video_id} ...")
+            if transcode(item):
+                done += 1
+                self.stdout.write("  tayyor")
+            else:
+                failed += 1
+                item.refresh_from_db(fields=["status", "error"])
+                self.stdout.write(f"  {item.status}: {item.error[-300:]}")
+
+        self.stdout.write(f"Jami: {done} ta tayyor, {failed} ta xato")
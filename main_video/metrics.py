@@ -0,0 +1,229 @@
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+
+logger = logging.getLogger(__name__)
+
+# Prometheus histogram chegaralari (sekund)
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestMetrics:
+    """Bitta request davomida barcha DB ulanishlaridagi so'rovlar soni va vaqti"""
+
+    def __init__(self):
+        self.endpoint = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.total_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+# =========================
+# BUDGET
+# =========================
+def get_budget(endpoint):
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(endpoint)
+
+
+def check_budget(endpoint, queries, strict=None):
+    """
+    Budget oshib ketsa: strict rejimda QueryBudgetExceeded, aks holda warning log.
+    Budget oshganmi - qaytaradi.
+    """
+    budget = get_budget(endpoint)
+    if budget is None or queries <= budget:
+        return False
+    message = f"{endpoint}: {queries} ta SQL so'rov (budget {budget})"
+    if strict if strict is not None else getattr(settings, 'QUERY_BUDGET_STRICT', False):
+        raise QueryBudgetExceeded(message)
+    logger.warning("Query budget oshdi: %s", message)
+    return True
+
+
+@contextmanager
+def query_budget(endpoint=None, limit=None):
+    """
+    Testlar va benchmark uchun::
+
+        with query_budget('SectionOneViewSet.full_info') as metrics:
+            client.get(url)
+
+    ``limit`` berilmasa settings.QUERY_BUDGETS dagi qiymat olinadi.
+    Oshib ketsa har doim QueryBudgetExceeded.
+    """
+    metrics = RequestMetrics()
+    metrics.endpoint = endpoint
+    limit = limit if limit is not None else get_budget(endpoint)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+        yield metrics
+    if limit is not None and metrics.queries > limit:
+        raise QueryBudgetExceeded(f"{endpoint or 'blok'}: {metrics.queries} ta SQL so'rov (budget {limit})")
+
+
+# =========================
+# PROMETHEUS REGISTRY
+# =========================
+class Registry:
+    """
+    Process ichidagi agregatlar. Gunicorn'da har bir worker o'z hisobini
+    yuritadi - scrape qaysi worker'ga tushsa o'shaniki qaytadi.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}  # (endpoint, method, status) -> soni
+        self.endpoints = {}  # endpoint -> [soni, latency, queries, db_time, budget oshgan, bucket'lar]
+
+    def observe(self, request, response, metrics, over_budget):
+        key = (metrics.endpoint, request.method, response.status_code)
+        with self.lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+            stats = self.endpoints.setdefault(metrics.endpoint, [0, 0.0, 0, 0.0, 0, [0] * len(LATENCY_BUCKETS)])
+            stats[0] += 1
+            stats[1] += metrics.total_time
+            stats[2] += metrics.queries
+            stats[3] += metrics.db_time
+            stats[4] += int(over_budget)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if metrics.total_time <= bound:
+                    stats[5][i] += 1
+
+    def render(self):
+        with self.lock:
+            requests = dict(self.requests)
+            endpoints = {name: list(stats) for name, stats in self.endpoints.items()}
+
+        lines = [
+            '# HELP iiv_http_requests_total HTTP requestlar soni',
+            '# TYPE iiv_http_requests_total counter',
+        ]
+        for (endpoint, method, status), count in sorted(requests.items()):
+            lines.append(f'iiv_http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+        lines += [
+            '# HELP iiv_http_request_duration_seconds Request davomiyligi',
+            '# TYPE iiv_http_request_duration_seconds histogram',
+        ]
+        for endpoint, (count, latency, _, _, _, buckets) in sorted(endpoints.items()):
+            for bound, value in zip(LATENCY_BUCKETS, buckets):
+                lines.append(f'iiv_http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {value}')
+            lines.append(f'iiv_http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {count}')
+            lines.append(f'iiv_http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {latency:.6f}')
+            lines.append(f'iiv_http_request_duration_seconds_count{{endpoint="{endpoint}"}} {count}')
+
+        for name, index, kind, help_text in [
+            ('iiv_db_queries_total', 2, 'counter', "SQL so'rovlar soni"),
+            ('iiv_db_duration_seconds_total', 3, 'counter', "SQL so'rovlarga ketgan vaqt"),
+            ('iiv_query_budget_exceeded_total', 4, 'counter', 'Query budget oshgan requestlar'),
+        ]:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            for endpoint, stats in sorted(endpoints.items()):
+                value = f'{stats[index]:.6f}' if isinstance(stats[index], float) else stats[index]
+                lines.append(f'{name}{{endpoint="{endpoint}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+# =========================
+# MIDDLEWARE
+# =========================
+def endpoint_name(request, view_func):
+    """DRF view'lari uchun ``SectionOneViewSet.full_info``, qolganlari - url nomi"""
+    cls = getattr(view_func, 'cls', None)
+    if cls is not None:
+        actions = getattr(view_func, 'actions', None) or {}
+        action = actions.get(request.method.lower(), request.method.lower())
+        return f'{cls.__name__}.{action}'
+    match = request.resolver_match
+    if match is not None and match.view_name:
+        return match.view_name
+    return getattr(view_func, '__name__', 'unknown')
+
+
+class QueryMetricsMiddleware:
+    """
+    Har bir request uchun SQL so'rovlar soni, DB vaqti va umumiy latency.
+
+    * REQUEST_METRICS_HEADERS (DEBUG'da yoqilgan): ``X-Endpoint``,
+      ``X-Query-Count``, ``X-DB-Time-ms``, ``Server-Timing`` headerlari;
+    * REQUEST_METRICS_LOG (prod'da yoqilgan): har bir request bitta JSON log qatori;
+    * ``/metrics`` - Prometheus text format (METRICS_TOKEN bilan);
+    * QUERY_BUDGETS - endpoint bo'yicha SQL so'rovlar chegarasi.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = request.metrics = RequestMetrics()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+            response = self.get_response(request)
+        metrics.total_time = time.perf_counter() - started
+
+        if metrics.endpoint is None:  # view'gacha yetmagan (404, static)
+            return response
+
+        over_budget = check_budget(metrics.endpoint, metrics.queries)
+        registry.observe(request, response, metrics, over_budget)
+        response.metrics = metrics
+
+        if getattr(settings, 'REQUEST_METRICS_HEADERS', settings.DEBUG):
+            response['X-Endpoint'] = metrics.endpoint
+            response['X-Query-Count'] = str(metrics.queries)
+            response['X-DB-Time-ms'] = f'{metrics.db_time * 1000:.1f}'
+            response['Server-Timing'] = (
+                f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries", '
+                f'total;dur={metrics.total_time * 1000:.1f}'
+            )
+        if getattr(settings, 'REQUEST_METRICS_LOG', False):
+            logger.info(json.dumps({
+                'endpoint': metrics.endpoint,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': metrics.queries,
+                'db_ms': round(metrics.db_time * 1000, 1),
+                'total_ms': round(metrics.total_time * 1000, 1),
+                'over_budget': over_budget,
+            }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics.endpoint = endpoint_name(request, view_func)
+
+
+def metrics_view(request):
+    """Prometheus scrape: ``Authorization: Bearer <METRICS_TOKEN>``, token bo'lmasa faqat DEBUG'da"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        if request.headers.get('Authorization', '') != f'Bearer {token}':
+            raise Http404
+    elif not settings.DEBUG:
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:37
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    SectionProgress = apps.get_model('main_video', 'SectionProgress')
+    CourseProgress = apps.get_model('main_video', 'CourseProgress')
+    VideoProgress = apps.get_model('main_video', 'VideoProgress')
+
+    completed_videos = {
+        (row['user_id'], row['video__section_id']): row['n']
+        for row in VideoProgress.objects.filter(is_completed=True).values('user_id', 'video__section_id').annotate(n=Count('id'))
+    }
+    sections = []
+    for sp in SectionProgress.objects.all():
+        sp.completed_videos = completed_videos.get((sp.user_id, sp.section_id), 0)
+        sections.append(sp)
+    SectionProgress.objects.bulk_update(sections, ['completed_videos'], batch_size=1000)
+
+    completed_sections = {
+        (row['user_id'], row['section__course_id']): row['n']
+        for row in SectionProgress.objects.filter(is_completed=True).values('user_id', 'section__course_id').annotate(n=Count('id'))
+    }
+    courses = []
+    for cp in CourseProgress.objects.all():
+        cp.completed_sections = completed_sections.get((cp.user_id, cp.course_id), 0)
+        courses.append(cp)
+    CourseProgress.objects.bulk_update(courses, ['completed_sections'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_video', '0002_alter_users_imgage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courseprogress',
+            name='completed_sections',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sectionprogress',
+            name='completed_videos',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:38
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_aggregates(apps, schema_editor):
+    VideoRating = apps.get_model('main_video', 'VideoRating')
+    for model_name, lookup in (
+        ('Video', 'video_id'),
+        ('Course', 'video__section__course_id'),
+        ('Category', 'video__section__course__category_id'),
+    ):
+        model = apps.get_model('main_video', model_name)
+        for row in VideoRating.objects.values(lookup).annotate(total=Sum('rating'), n=Count('id')):
+            model.objects.filter(pk=row[lookup]).update(rating_sum=row['total'], rating_count=row['n'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_video', '0003_progress_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_video', '0004_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='users',
+            name='hemis_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+    ]
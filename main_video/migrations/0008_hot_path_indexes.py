@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:53
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def dedupe_course_progress(apps, schema_editor):
+    """Bir (user, course) uchun bir nechta CourseProgress bo'lsa eng ilgarilagani qoladi"""
+    CourseProgress = apps.get_model('main_video', 'CourseProgress')
+    duplicates = (
+        CourseProgress.objects.values('user_id', 'course_id')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+    )
+    for row in duplicates:
+        rows = CourseProgress.objects.filter(user_id=row['user_id'], course_id=row['course_id']).order_by(
+            '-is_completed', '-completed_sections', '-progress_percent', 'id'
+        )
+        keep = rows.first()
+        rows.exclude(pk=keep.pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_video', '0007_chunked_upload'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['video', '-created_at'], name='comment_video_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizresult',
+            index=models.Index(fields=['user', 'quiz'], name='quizresult_user_quiz_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='section',
+            index=models.Index(fields=['course', 'order'], name='section_course_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vazifa_bajarish',
+            index=models.Index(fields=['missiya', 'user', 'is_approved'], name='vazifa_missiya_user_appr_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['section', 'order'], name='video_section_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videoprogress',
+            index=models.Index(fields=['user', 'video', 'is_completed'], name='vprogress_user_video_done_idx'),
+        ),
+        migrations.RunPython(dedupe_course_progress, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='courseprogress',
+            constraint=models.UniqueConstraint(fields=('user', 'course'), name='uniq_courseprogress_user_course'),
+        ),
+    ]
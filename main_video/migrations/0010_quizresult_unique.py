@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:09
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def dedupe_quiz_results(apps, schema_editor):
+    """Bir (user, quiz) uchun bir nechta QuizResult bo'lsa eng yaxshisi qoladi"""
+    QuizResult = apps.get_model('main_video', 'QuizResult')
+    duplicates = (
+        QuizResult.objects.values('user_id', 'quiz_id')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+    )
+    for row in duplicates:
+        rows = QuizResult.objects.filter(user_id=row['user_id'], quiz_id=row['quiz_id']).order_by(
+            '-is_passed', '-percent', 'id'
+        )
+        keep = rows.first()
+        rows.exclude(pk=keep.pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_video', '0009_users_progress_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_quiz_results, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='quizresult',
+            name='quizresult_user_quiz_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='quizresult',
+            constraint=models.UniqueConstraint(fields=('user', 'quiz'), name='uniq_quizresult_user_quiz'),
+        ),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:40
+
+import logging
+import re
+
+from django.db import migrations, transaction
+from django.db.utils import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# main_video.search'ning shu migratsiya paytidagi nusxasi: modul keyin
+# o'zgarsa ham migratsiya tarixi o'zgarmaydi
+TABLES = {
+    'course': 'main_video_course_search',
+    'section': 'main_video_section_search',
+}
+BATCH_SIZE = 1000
+
+_APOSTROPHES = re.compile(r"['‘’ʻʼ`]")
+
+
+def normalize(text):
+    return _APOSTROPHES.sub('', (text or '').lower())
+
+
+def course_documents(apps):
+    Course = apps.get_model('main_video', 'Course')
+    teachers = {}
+    for course_id, *names in Course.teacher.through.objects.values_list(
+        'course_id', 'users__first_name', 'users__last_name', 'users__username', 'users__hemis_id'
+    ):
+        teachers.setdefault(course_id, []).extend(names)
+    return [
+        (pk, title, ' '.join(filter(None, [description, author, *teachers.get(pk, [])])))
+        for pk, title, description, author in Course.objects.values_list(
+            'id', 'title', 'small_description', 'author'
+        )
+    ]
+
+
+def section_documents(apps):
+    Section = apps.get_model('main_video', 'Section')
+    return [
+        (pk, title, ' '.join(filter(None, rest)))
+        for pk, title, *rest in Section.objects.values_list(
+            'id', 'title', 'small_description', 'course__title', 'course__category__title'
+        )
+    ]
+
+
+BUILDERS = {
+    'course': course_documents,
+    'section': section_documents,
+}
+
+
+def create_tables(cursor, vendor):
+    for table in TABLES.values():
+        if vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+                f"title, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+        else:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (object_id integer PRIMARY KEY, document tsvector NOT NULL)"
+            )
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {table}_gin ON {table} USING GIN (document)")
+
+
+def write(cursor, vendor, table, documents):
+    rows = [(pk, normalize(title), normalize(body)) for pk, title, body in documents]
+    if vendor == 'sqlite':
+        cursor.executemany(f"INSERT INTO {table} (rowid, title, body) VALUES (%s, %s, %s)", rows)
+    else:
+        cursor.executemany(
+            f"INSERT INTO {table} (object_id, document) VALUES (%s, "
+            f"setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B'))",
+            rows
+        )
+
+
+def create_search_index(apps, schema_editor):
+    """FTS5 / tsvector jadvallari; DB qo'llamasa qidiruv icontains'da qoladi"""
+    connection = schema_editor.connection
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            create_tables(cursor, connection.vendor)
+            for kind, table in TABLES.items():
+                cursor.execute(f"DELETE FROM {table}")
+                documents = BUILDERS[kind](apps)
+                for start in range(0, len(documents), BATCH_SIZE):
+                    write(cursor, connection.vendor, table, documents[start:start + BATCH_SIZE])
+    except DatabaseError as e:
+        # masalan FTS5'siz yig'ilgan SQLite: qidiruv icontains bilan ishlaydi
+        logger.warning(
+            "Qidiruv indeksi yaratilmadi (%s). DB qo'llasa keyin: python manage.py rebuild_search_index", e
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for table in TABLES.values():
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_video', '0010_quizresult_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:10
+
+from django.db import migrations
+
+
+def enable_wal(apps, schema_editor):
+    """WAL DB faylida saqlanadi: har ulanishda emas, bir marta (core/db.py)"""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL')
+
+
+class Migration(migrations.Migration):
+    # journal_mode transaction ichida o'zgarmaydi
+    atomic = False
+
+    dependencies = [
+        ('main_video', '0011_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(enable_wal, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -30,6 +32,11 @@ class Users(AbstractUser):
         ('admin', 'Admin'),
     ]
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='student')
+    # import_hemis_users --delta: oxirgi import qilingan HEMIS yozuvining hash'i
+    hemis_hash = models.CharField(max_length=40, blank=True, default='', editable=False)
+    # progress/rating/quiz o'zgarganda oshadi (main_video.conditional: ETag / Last-Modified)
+    progress_version = models.PositiveIntegerField(default=0, editable=False)
+    progress_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     USERNAME_FIELD = 'hemis_id'
     REQUIRED_FIELDS = ['username']
@@ -41,7 +48,22 @@ class Users(AbstractUser):
 # =========================
 # CATEGORY & COURSE MODELLARI
 # =========================
-class Category(models.Model):
+class RatingAggregate(models.Model):
+    """VideoRating'lar yig'indisi va soni (main_video.ratings orqali yangilanadi)"""
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def average_rating(self):
+        if not self.rating_count:
+            return 0
+        return round(self.rating_sum / self.rating_count, 2)
+
+
+class Category(RatingAggregate):
     title = models.CharField(max_length=255)
     img = models.ImageField(upload_to="category/", null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -55,7 +77,7 @@ class Category(models.Model):
         return self.title
 
 
-class Course(models.Model):
+class Course(RatingAggregate):
     title = models.CharField(max_length=255)
     teacher = models.ManyToManyField(
         Users,
@@ -80,9 +102,15 @@ class CourseProgress(models.Model):
     user = models.ForeignKey(Users, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     progress_percent = models.PositiveSmallIntegerField(default=0)
+    completed_sections = models.PositiveIntegerField(default=0)  # is_completed=True bo'lgan sectionlar soni
     is_completed = models.BooleanField(default=False)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'course'], name='uniq_courseprogress_user_course'),
+        ]
+
 
 # =========================
 # SECTION, MISSIYA, VAZIFA MODELLARI
@@ -98,6 +126,9 @@ class Section(models.Model):
 
     class Meta:
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['course', 'order'], name='section_course_order_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if self.order is None:
@@ -115,6 +146,7 @@ class SectionProgress(models.Model):
     is_completed = models.BooleanField(default=False)
     completed_at = models.DateTimeField(null=True, blank=True)
     score_percent = models.FloatField(default=0)
+    completed_videos = models.PositiveIntegerField(default=0)  # ko'rilgan videolar soni
 
     class Meta:
         unique_together = ('user', 'section')
@@ -136,11 +168,16 @@ class Vazifa_bajarish(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['missiya', 'user', 'is_approved'], name='vazifa_missiya_user_appr_idx'),
+        ]
+
 
 # =========================
 # VIDEO MODELLARI
 # =========================
-class Video(models.Model):
+class Video(RatingAggregate):
     title = models.CharField(max_length=255)
     video_file = models.FileField(upload_to='videos/')
     section = models.ForeignKey(Section, on_delete=models.CASCADE)
@@ -150,6 +187,11 @@ class Video(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['section', 'order'], name='video_section_order_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -160,20 +202,33 @@ class Video(models.Model):
         if user.role in ['admin', 'teacher']:
             return True
 
-        section_videos = Video.objects.filter(section=self.section).order_by('order')
-        if not section_videos.exists():
-            return False
+        # bitta video uchun ham section resolver'i ishlatiladi (2 ta query)
+        from main_video.access import VideoAccessResolver
+        return VideoAccessResolver(user).has_access(self)
 
-        first_video = section_videos.first()
-        if self.id == first_video.id:
-            return True  # birinchi video har doim ochiq
 
-        # avvalgi videoni tekshirish
-        previous_video = section_videos.filter(order__lt=self.order).order_by('-order').first()
-        if not previous_video:
-            return False
+class VideoTranscode(models.Model):
+    """Video faylidan yasalgan HLS renditionlar (main_video.transcoding)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    video = models.OneToOneField(Video, on_delete=models.CASCADE, related_name='transcode')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    source_name = models.CharField(max_length=255, blank=True)  # qaysi video_file'dan yasalgan
+    playlist = models.CharField(max_length=255, blank=True)  # MEDIA_ROOT ga nisbatan master.m3u8
+    renditions = models.JSONField(default=list, blank=True)  # [{'name', 'height', 'bitrate', 'playlist'}, ...]
+    duration = models.FloatField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
-        return VideoProgress.objects.filter(user=user, video=previous_video, is_completed=True).exists()
+    def __str__(self):
+        return f"{self.video} ({self.status})"
 
 
 class VideoProgress(models.Model):
@@ -184,6 +239,10 @@ class VideoProgress(models.Model):
 
     class Meta:
         unique_together = ('user', 'video')
+        indexes = [
+            # access/progress so'rovlari jadvalga murojaat qilmasdan indexdan o'qiydi
+            models.Index(fields=['user', 'video', 'is_completed'], name='vprogress_user_video_done_idx'),
+        ]
 
 
 class VideoRating(models.Model):
@@ -204,6 +263,11 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['video', '-created_at'], name='comment_video_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.hemis_id} - {self.comment}"
 
@@ -232,22 +296,26 @@ class QuizSessionManager(models.Manager):
         return self.filter(user=user, quiz=quiz, is_submitted=False).order_by('-created_at').first()
 
     def get_or_create_active(self, user, quiz):
+        from main_video.quiz_pool import get_question_pool
+
         session = self.get_active(user, quiz)
 
-        # Quizdagi jami savollar
-        all_ids = list(quiz.questions.values_list('id', flat=True))
+        # Quizdagi jami savollar (cache'dan, Question o'zgarsa tozalanadi)
+        all_ids = get_question_pool(quiz.id)
         k = min(int(quiz.questions_count or 0), len(all_ids))
 
         if session:
             # Agar admin questions_count ni o‘zgartirgan bo‘lsa yoki savollar o‘chgani bo‘lsa — yangilaymiz
-            valid_ids = [qid for qid in session.question_ids if qid in all_ids]
+            pool = set(all_ids)
+            valid_ids = [qid for qid in session.question_ids if qid in pool]
             if len(valid_ids) != k:
                 session.question_ids = random.sample(all_ids, k) if k else []
-                session.save(update_fields=['question_ids', 'updated_at'])
-            else:
-                # hammasi joyida
+            elif valid_ids != session.question_ids:
                 session.question_ids = valid_ids
-                session.save(update_fields=['question_ids', 'updated_at'])
+            else:
+                # hammasi joyida - yozish shart emas
+                return session
+            session.save(update_fields=['question_ids', 'updated_at'])
             return session
 
         # Session yo‘q bo‘lsa — yaratamiz
@@ -302,6 +370,11 @@ class QuizResult(models.Model):
     finished_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # bitta (user, quiz) - bitta natija (takroriy topshirish uni yangilaydi)
+            models.UniqueConstraint(fields=['user', 'quiz'], name='uniq_quizresult_user_quiz'),
+        ]
 
     def __str__(self):
         return f"{self.user.hemis_id} - {self.quiz.section.title} - {self.percent}%"
@@ -346,4 +419,29 @@ class Certificate(models.Model):
     @property
     def teacher_names(self):
         teachers = self.course.teacher.all()
-        return ", ".join([f"{teacher.first_name} {teacher.last_name}" for teacher in teachers])
\ No newline at end of file
+        return ", ".join([f"{teacher.first_name} {teacher.last_name}" for teacher in teachers])
+
+# =========================
+# CHUNKED UPLOAD
+# =========================
+class ChunkedUpload(models.Model):
+    """Bo'lib yuklanayotgan fayl (main_video.uploads). Tugagach create'da upload_id bilan ishlatiladi"""
+    TARGET_CHOICES = [
+        ('video', 'Video.video_file'),
+        ('vazifa', 'Vazifa_bajarish.file'),
+    ]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(Users, on_delete=models.CASCADE, related_name='chunked_uploads')
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def is_complete(self):
+        return self.offset == self.size
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
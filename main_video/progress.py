@@ -0,0 +1,362 @@
+import math
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from main_video.catalog_cache import bump_version
+from main_video.certificates import issue_certificates
+from main_video.conditional import batched_progress_bumps, bump_progress_version
+from main_video.models import CourseProgress, Section, SectionProgress, Vazifa_bajarish, Video, VideoProgress
+
+
+def _percent(done, total):
+    return (done / total) * 100 if total else 0
+
+
+# =========================
+# SECTION / COURSE COUNTERLARI
+# =========================
+def _bump_section(user, section, delta):
+    """SectionProgress.completed_videos ni delta ga o'zgartirish va score_percent ni yangilash"""
+    section_progress, _ = SectionProgress.objects.get_or_create(user=user, section=section)
+    if delta:
+        SectionProgress.objects.filter(pk=section_progress.pk).update(
+            completed_videos=Greatest(F('completed_videos') + delta, 0)
+        )
+        section_progress.refresh_from_db(fields=['completed_videos'])
+
+    total_videos = Video.objects.filter(section=section).count()
+    score_percent = _percent(section_progress.completed_videos, total_videos)
+    if score_percent != section_progress.score_percent:
+        section_progress.score_percent = score_percent
+        SectionProgress.objects.filter(pk=section_progress.pk).update(score_percent=score_percent)
+    return section_progress
+
+
+def _get_course_progress(user, course_id):
+    """CourseProgress ni olish, yo'q bo'lsa counter bilan birga yaratish"""
+    course_progress = CourseProgress.objects.filter(user=user, course_id=course_id).first()
+    if course_progress is None:
+        completed_sections = SectionProgress.objects.filter(
+            user=user,
+            section__course_id=course_id,
+            is_completed=True
+        ).count()
+        try:
+            with transaction.atomic():
+                course_progress = CourseProgress.objects.create(
+                    user=user,
+                    course_id=course_id,
+                    completed_sections=completed_sections
+                )
+        except IntegrityError:
+            # parallel request yaratib ulgurdi (uniq_courseprogress_user_course)
+            return CourseProgress.objects.get(user=user, course_id=course_id), False
+        _refresh_course_percent(course_progress)
+        return course_progress, True
+    return course_progress, False
+
+
+def _bump_course(user, course_id, delta):
+    course_progress, created = _get_course_progress(user, course_id)
+    if delta and not created:
+        CourseProgress.objects.filter(pk=course_progress.pk).update(
+            completed_sections=Greatest(F('completed_sections') + delta, 0)
+        )
+        course_progress.refresh_from_db(fields=['completed_sections'])
+        _refresh_course_percent(course_progress)
+    return course_progress
+
+
+def _refresh_course_percent(course_progress):
+    total_sections = Section.objects.filter(course_id=course_progress.course_id).count()
+    progress_percent = math.floor(_percent(course_progress.completed_sections, total_sections))
+    is_completed = progress_percent >= 100
+
+    if (progress_percent, is_completed) == (course_progress.progress_percent, course_progress.is_completed):
+        return
+    course_progress.progress_percent = progress_percent
+    course_progress.is_completed = is_completed
+    course_progress.completed_at = timezone.now() if is_completed else None
+    course_progress.save(update_fields=['progress_percent', 'is_completed', 'completed_at'])
+
+
+# =========================
+# VIDEO
+# =========================
+def mark_video_watched(user, video):
+    """Videoni ko'rilgan deb belgilash. (section_progress, course_progress) qaytaradi"""
+    now = timezone.now()
+    with transaction.atomic(), batched_progress_bumps():
+        video_progress, created = VideoProgress.objects.get_or_create(
+            user=user,
+            video=video,
+            defaults={'is_completed': True, 'completed_at': now}
+        )
+        delta = 1 if created else VideoProgress.objects.filter(
+            pk=video_progress.pk,
+            is_completed=False
+        ).update(is_completed=True, completed_at=now)
+        if delta and not created:
+            # .update() signal yubormaydi
+            bump_progress_version(user.pk)
+
+        section_progress = _bump_section(user, video.section, delta)
+        course_progress, _ = _get_course_progress(user, video.section.course_id)
+    return section_progress, course_progress
+
+
+def mark_video_unwatched(user, video):
+    """Videoni ko'rilmagan deb belgilash (VideoProgress o'chiriladi)"""
+    with transaction.atomic(), batched_progress_bumps():
+        progress = VideoProgress.objects.filter(user=user, video=video)
+        delta = -progress.filter(is_completed=True).count()
+        progress.delete()
+
+        section_progress = _bump_section(user, video.section, delta)
+        course_progress, _ = _get_course_progress(user, video.section.course_id)
+    return section_progress, course_progress
+
+
+# =========================
+# SECTION
+# =========================
+def set_section_completed(user, section, completed=True):
+    """
+    SectionProgress.is_completed ni o'zgartirish.
+
+    Faqat qiymat haqiqatan o'zgarganda yoziladi va kursdagi
+    completed_sections counteri +1/-1 qilinadi. Kurs to'liq tugatilsa
+    sertifikat shu yerda beriladi.
+    """
+    with transaction.atomic():
+        SectionProgress.objects.get_or_create(user=user, section=section)
+        section_progress = SectionProgress.objects.select_for_update().get(user=user, section=section)
+        if section_progress.is_completed == completed:
+            return section_progress
+
+        section_progress.is_completed = completed
+        if completed and not section_progress.completed_at:
+            section_progress.completed_at = timezone.now()
+        section_progress.save(update_fields=['is_completed', 'completed_at'])
+
+        course_progress = _bump_course(user, section.course_id, 1 if completed else -1)
+        if completed and course_progress.is_completed:
+            issue_certificates(section.course, user_ids=[user.id])
+    return section_progress
+
+
+def unlock_next_section(section, now=None):
+    """
+    Keyingi section va uning birinchi videosini ochish. Faqat hali bloklangan
+    bo'lsa yoziladi: bir vaqtda tugatayotgan studentlar umumiy qatorni
+    qayta-qayta yozmaydi va katalog cache'i bir marta tozalanadi.
+    """
+    now = now or timezone.now()
+    next_section = Section.objects.filter(
+        course_id=section.course_id, order__gt=section.order
+    ).order_by('order').values_list('id', flat=True).first()
+    if next_section is None:
+        return
+
+    changed = Section.objects.filter(pk=next_section, is_blocked=True).update(is_blocked=False, updated_at=now)
+    first_video = Video.objects.filter(section_id=next_section).order_by('order').values_list('id', flat=True).first()
+    if first_video is not None:
+        changed += Video.objects.filter(pk=first_video, is_blocked=True).update(is_blocked=False, updated_at=now)
+    if changed:
+        # .update() signal yubormaydi
+        transaction.on_commit(bump_version)
+
+
+# =========================
+# VAZIFA
+# =========================
+VAZIFA_PASS_PERCENT = 80
+
+
+def recompute_vazifa_progress(pairs):
+    """
+    (user_id, section_id) juftlari uchun vazifa bo'yicha SectionProgress.
+
+    score_percent = tasdiqlangan missiyalar / sectionda javob yuborilgan
+    missiyalar (>= 80% - section tugatilgan). Juftlar soniga bog'liq bo'lmagan
+    miqdordagi query'lar: hisoblash set-based, yozish bulk_update bilan.
+    {(user_id, section_id): SectionProgress} qaytaradi.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+    user_ids = {user_id for user_id, _ in pairs}
+    section_ids = {section_id for _, section_id in pairs}
+
+    submissions = Vazifa_bajarish.objects.filter(missiya__section_id__in=section_ids)
+    totals = dict(
+        submissions.values('missiya__section_id').annotate(n=Count('missiya', distinct=True))
+        .values_list('missiya__section_id', 'n')
+    )
+    approved = {
+        (row['user_id'], row['missiya__section_id']): row['n']
+        for row in submissions.filter(user_id__in=user_ids, is_approved=True)
+        .values('user_id', 'missiya__section_id').annotate(n=Count('missiya', distinct=True))
+    }
+    pairs = {pair for pair in pairs if totals.get(pair[1])}
+    if not pairs:
+        return {}
+
+    with transaction.atomic(), batched_progress_bumps():
+        existing = {
+            (sp.user_id, sp.section_id): sp
+            for sp in SectionProgress.objects.filter(user_id__in=user_ids, section_id__in=section_ids)
+        }
+        SectionProgress.objects.bulk_create(
+            [SectionProgress(user_id=user_id, section_id=section_id) for user_id, section_id in pairs - set(existing)],
+            ignore_conflicts=True
+        )
+        if not pairs <= set(existing):
+            existing = {
+                (sp.user_id, sp.section_id): sp
+                for sp in SectionProgress.objects.filter(user_id__in=user_ids, section_id__in=section_ids)
+            }
+
+        now = timezone.now()
+        changed, transitions = [], []
+        for pair in pairs:
+            section_progress = existing[pair]
+            percent = _percent(approved.get(pair, 0), totals[pair[1]])
+            completed = percent >= VAZIFA_PASS_PERCENT
+            if (percent, completed) == (section_progress.score_percent, section_progress.is_completed):
+                continue
+            if completed != section_progress.is_completed:
+                section_progress.is_completed = completed
+                if completed and not section_progress.completed_at:
+                    section_progress.completed_at = now
+                transitions.append(pair)
+            section_progress.score_percent = percent
+            changed.append(section_progress)
+        SectionProgress.objects.bulk_update(changed, ['score_percent', 'is_completed', 'completed_at'])
+
+        if transitions:
+            _apply_section_transitions([existing[pair] for pair in transitions], now)
+        bump_progress_version(*{section_progress.user_id for section_progress in changed})
+
+    return {pair: existing[pair] for pair in pairs}
+
+
+def _apply_section_transitions(section_progresses, now):
+    """
+    is_completed o'zgargan SectionProgress'lar uchun kurs counterlari,
+    sertifikatlar va keyingi sectionni ochish - set_section_completed ning
+    ko'p qatorli varianti.
+    """
+    sections = Section.objects.select_related('course').in_bulk({sp.section_id for sp in section_progresses})
+    user_ids = {sp.user_id for sp in section_progresses}
+    course_ids = {section.course_id for section in sections.values()}
+
+    CourseProgress.objects.bulk_create(
+        [CourseProgress(user_id=sp.user_id, course_id=sections[sp.section_id].course_id) for sp in section_progresses],
+        ignore_conflicts=True
+    )
+    _recount_courses(
+        CourseProgress.objects.filter(user_id__in=user_ids, course_id__in=course_ids),
+        SectionProgress.objects.filter(user_id__in=user_ids, section__course_id__in=course_ids),
+        Section.objects.filter(course_id__in=course_ids),
+    )
+
+    completed = [sp for sp in section_progresses if sp.is_completed]
+    course_users = {}
+    for sp in completed:
+        course_users.setdefault(sections[sp.section_id].course, set()).add(sp.user_id)
+    for course, users in course_users.items():
+        issue_certificates(course, user_ids=users)
+    for section_id in {sp.section_id for sp in completed}:
+        unlock_next_section(sections[section_id], now)
+
+
+# =========================
+# REPAIR
+# =========================
+def _recount_courses(course_progress, section_progress, sections, batch_size=1000):
+    """course_progress qatorlarining completed_sections / progress_percent ini qayta hisoblash"""
+    completed_sections = {
+        (row['user_id'], row['section__course_id']): row['n']
+        for row in section_progress.filter(is_completed=True).values('user_id', 'section__course_id').annotate(n=Count('id'))
+    }
+    total_sections = dict(sections.values('course_id').annotate(n=Count('id')).values_list('course_id', 'n'))
+
+    changed_courses = []
+    for cp in course_progress.iterator(chunk_size=batch_size):
+        count = completed_sections.get((cp.user_id, cp.course_id), 0)
+        progress_percent = math.floor(_percent(count, total_sections.get(cp.course_id, 0)))
+        is_completed = progress_percent >= 100
+        if (cp.completed_sections, cp.progress_percent, cp.is_completed) != (count, progress_percent, is_completed):
+            cp.completed_sections = count
+            cp.progress_percent = progress_percent
+            if is_completed != cp.is_completed:
+                cp.completed_at = timezone.now() if is_completed else None
+            cp.is_completed = is_completed
+            changed_courses.append(cp)
+    CourseProgress.objects.bulk_update(
+        changed_courses,
+        ['completed_sections', 'progress_percent', 'is_completed', 'completed_at'],
+        batch_size=batch_size
+    )
+    return changed_courses
+
+
+def rebuild_progress_counters(user_ids=None, course_ids=None, batch_size=1000):
+    """
+    completed_videos / completed_sections counterlarini VideoProgress va
+    SectionProgress'dan qaytadan hisoblash. O'zgargan qatorlar sonini qaytaradi.
+    """
+    video_progress = VideoProgress.objects.filter(is_completed=True)
+    section_progress = SectionProgress.objects.all()
+    course_progress = CourseProgress.objects.all()
+    if user_ids is not None:
+        video_progress = video_progress.filter(user_id__in=user_ids)
+        section_progress = section_progress.filter(user_id__in=user_ids)
+        course_progress = course_progress.filter(user_id__in=user_ids)
+    if course_ids is not None:
+        video_progress = video_progress.filter(video__section__course_id__in=course_ids)
+        section_progress = section_progress.filter(section__course_id__in=course_ids)
+        course_progress = course_progress.filter(course_id__in=course_ids)
+
+    completed_videos = {
+        (row['user_id'], row['video__section_id']): row['n']
+        for row in video_progress.values('user_id', 'video__section_id').annotate(n=Count('id'))
+    }
+    total_videos = dict(Video.objects.values('section_id').annotate(n=Count('id')).values_list('section_id', 'n'))
+
+    # section counterlari (+ VideoProgress bor, lekin SectionProgress yo'q qatorlar)
+    existing = set()
+    changed_sections = []
+    for sp in section_progress.iterator(chunk_size=batch_size):
+        existing.add((sp.user_id, sp.section_id))
+        count = completed_videos.get((sp.user_id, sp.section_id), 0)
+        if sp.completed_videos != count:
+            sp.completed_videos = count
+            sp.score_percent = _percent(count, total_videos.get(sp.section_id, 0))
+            changed_sections.append(sp)
+    SectionProgress.objects.bulk_update(changed_sections, ['completed_videos', 'score_percent'], batch_size=batch_size)
+
+    missing = [
+        SectionProgress(
+            user_id=user_id,
+            section_id=section_id,
+            completed_videos=count,
+            score_percent=_percent(count, total_videos.get(section_id, 0))
+        )
+        for (user_id, section_id), count in completed_videos.items()
+        if (user_id, section_id) not in existing
+    ]
+    SectionProgress.objects.bulk_create(missing, batch_size=batch_size, ignore_conflicts=True)
+
+    # course counterlari
+    total_sections = Section.objects.all()
+    if course_ids is not None:
+        total_sections = total_sections.filter(course_id__in=course_ids)
+    changed_courses = _recount_courses(course_progress, section_progress, total_sections, batch_size)
+    bump_progress_version(*{row.user_id for row in changed_sections + missing + changed_courses})
+
+    return len(changed_sections) + len(missing), len(changed_courses)
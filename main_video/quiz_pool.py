@@ -0,0 +1,49 @@
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from main_video.models import Question
+
+
+# katalog bilan bir xil cache: redis/file bo'lsa workerlar orasida umumiy.
+# Default CATALOG_CACHE_BACKEND=none (DummyCache) da pool cache'lanmaydi.
+CACHE_ALIAS = 'catalog'
+
+
+def _key(quiz_id):
+    return f'quiz_pool:{quiz_id}'
+
+
+def get_question_pool(quiz_id):
+    """Quizdagi barcha savol id'lari (id bo'yicha tartiblangan), cache'dan"""
+    cache = caches[CACHE_ALIAS]
+    pool = cache.get(_key(quiz_id))
+    if pool is None:
+        pool = list(Question.objects.filter(quiz_id=quiz_id).order_by('id').values_list('id', flat=True))
+        cache.set(_key(quiz_id), pool)
+    return pool
+
+
+def invalidate_question_pool(quiz_id):
+    caches[CACHE_ALIAS].delete(_key(quiz_id))
+
+
+@receiver(pre_save, sender=Question)
+def remember_old_quiz(sender, instance, **kwargs):
+    """Savol boshqa quizga ko'chirilsa eski quiz pool'i ham tozalanadi"""
+    if instance.pk and not kwargs.get('raw'):
+        instance._old_quiz_id = Question.objects.filter(pk=instance.pk).values_list('quiz_id', flat=True).first()
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_on_question_change(sender, instance, **kwargs):
+    """Commit'dan keyin: aks holda parallel request eski pool'ni qayta cache'lab qo'yishi mumkin"""
+    quiz_ids = {instance.quiz_id, getattr(instance, '_old_quiz_id', None)} - {None}
+
+    def invalidate():
+        for quiz_id in quiz_ids:
+            invalidate_question_pool(quiz_id)
+
+    transaction.on_commit(invalidate)
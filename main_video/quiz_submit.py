@@ -0,0 +1,105 @@
+from django.db import transaction
+from django.utils import timezone
+
+from main_video.conditional import batched_progress_bumps
+from main_video.models import QuizResult, QuizSession, Video, VideoProgress
+from main_video.progress import set_section_completed, unlock_next_section
+
+
+class QuizSubmitError(Exception):
+    """Quizni topshirib bo'lmaydi (sessiya yo'q yoki javoblar sessiyaga mos emas)"""
+
+
+def unwatched_videos(user, section, include_last=True):
+    """
+    Quizdan oldin ko'rilishi kerak bo'lgan, lekin ko'rilmagan videolar (order
+    bo'yicha). Ikkita query: sectiondagi videolar va userning progressi.
+    """
+    videos = list(Video.objects.filter(section=section).order_by('order').only('id', 'title', 'order'))
+    if not include_last:
+        videos = videos[:-1]
+    watched = set(
+        VideoProgress.objects.filter(user=user, video__section=section, is_completed=True)
+        .values_list('video_id', flat=True)
+    )
+    return [video for video in videos if video.id not in watched]
+
+
+def submit_quiz(user, quiz, answers):
+    """
+    Quizni topshirish: ``answers`` - {question_id: javob}.
+
+    Hammasi bitta transaction'da va har bir yozuv bir marta: sessiya yopiladi,
+    QuizResult yoziladi, o'tgan bo'lsa SectionProgress va keyingi section /
+    uning birinchi videosi ochiladi. Sessiya shartli UPDATE bilan "egallanadi",
+    shuning uchun bir xil javob ikki marta (yoki parallel) yuborilsa ikkinchisi
+    hech narsa yozmaydi va birinchi natijani qaytaradi. (result, created) qaytaradi.
+    """
+    session = QuizSession.objects.get_active(user, quiz)
+    if session is None:
+        return _replay(user, quiz, answers), False
+
+    now = timezone.now()
+    with transaction.atomic(), batched_progress_bumps():
+        # birinchi yozuv - row lock shu yerda olinadi (SQLite'da BEGIN IMMEDIATE)
+        claimed = QuizSession.objects.filter(pk=session.pk, is_submitted=False).update(
+            is_submitted=True, submitted_at=now, updated_at=now
+        )
+        if claimed:
+            result = _grade(user, quiz, session, answers, now)
+    if not claimed:
+        # parallel request bu sessiyani topshirib bo'ldi
+        return _replay(user, quiz, answers), False
+    return result, True
+
+
+def _grade(user, quiz, session, answers, now):
+    session.refresh_from_db(fields=['question_ids', 'created_at'])
+    question_ids = session.question_ids or []
+    if not question_ids:
+        raise QuizSubmitError("Quiz savollari topilmadi. Quizni qayta ochib kiring.")
+    if any(qid not in question_ids for qid in answers):
+        raise QuizSubmitError("Yuborilgan javoblar orasida sessionga kirmaydigan savollar bor")
+
+    correct = dict(quiz.questions.filter(id__in=question_ids).values_list('id', 'correct_answer'))
+    # pool boshqa worker cache'idan eskirgan bo'lishi mumkin: o'chirilgan savollar hisoblanmaydi
+    question_ids = [qid for qid in question_ids if qid in correct]
+    if not question_ids:
+        raise QuizSubmitError("Quiz savollari topilmadi. Quizni qayta ochib kiring.")
+    correct_answers = sum(
+        1 for qid in question_ids
+        if answers.get(qid) is not None and str(correct[qid]) == str(answers[qid])
+    )
+    percent = (correct_answers / len(question_ids)) * 100
+    is_passed = percent >= quiz.pass_percent
+
+    result, _ = QuizResult.objects.update_or_create(
+        user=user,
+        quiz=quiz,
+        defaults={
+            'total_questions': len(question_ids),
+            'correct_answers': correct_answers,
+            'percent': percent,
+            'is_passed': is_passed,
+            'started_at': session.created_at,
+            'finished_at': now,
+        }
+    )
+
+    if is_passed:
+        section = quiz.section
+        set_section_completed(user, section)
+        unlock_next_section(section, now)
+    return result
+
+
+def _replay(user, quiz, answers):
+    """Oxirgi topshirilgan sessiya shu javoblar uchun bo'lsa uning natijasi"""
+    session = QuizSession.objects.filter(user=user, quiz=quiz, is_submitted=True).order_by('-submitted_at').first()
+    result = QuizResult.objects.filter(user=user, quiz=quiz).first()
+    if (
+        session is None or result is None or result.finished_at != session.submitted_at
+        or any(qid not in session.question_ids for qid in answers)
+    ):
+        raise QuizSubmitError("Quiz savollari topilmadi. Quizni qayta ochib kiring.")
+    return result
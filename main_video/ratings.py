@@ -0,0 +1,82 @@
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from main_video.models import Category, Course, Video, VideoRating
+
+
+def _apply_delta(video_id, sum_delta, count_delta):
+    """Video, uning kursi va kategoriyasidagi rating_sum / rating_count ni o'zgartirish"""
+    if not sum_delta and not count_delta:
+        return
+
+    course_id, category_id = Video.objects.filter(pk=video_id).values_list(
+        'section__course_id', 'section__course__category_id'
+    ).get()
+    changes = {
+        'rating_sum': F('rating_sum') + sum_delta,
+        'rating_count': F('rating_count') + count_delta,
+        # o'rtacha rating javobda chiqadi: ETag (main_video.conditional) o'zgarishi uchun
+        'updated_at': timezone.now(),
+    }
+    Video.objects.filter(pk=video_id).update(**changes)
+    Course.objects.filter(pk=course_id).update(**changes)
+    Category.objects.filter(pk=category_id).update(**changes)
+
+
+def rate_video(user, video, rating):
+    """
+    Userning video uchun ratingini yaratish yoki yangilash.
+
+    VideoRating va Video/Course/Category aggregate'lari bitta transaction
+    ichida yoziladi. (rating_obj, created) qaytaradi.
+    """
+    with transaction.atomic():
+        obj = VideoRating.objects.select_for_update().filter(user=user, video=video).first()
+        if obj is None:
+            obj = VideoRating.objects.create(user=user, video=video, rating=rating)
+            _apply_delta(video.pk, rating, 1)
+            return obj, True
+
+        old_rating = obj.rating
+        if old_rating != rating:
+            obj.rating = rating
+            obj.save(update_fields=['rating', 'updated_at'])
+            _apply_delta(video.pk, rating - old_rating, 0)
+        return obj, False
+
+
+@receiver(post_delete, sender=VideoRating)
+def subtract_rating(sender, instance, **kwargs):
+    """
+    Rating qanday o'chirilmasin (API, queryset.delete(), admin, user yoki
+    video bilan cascade) aggregate'lardan ayiriladi. Cascade'da ratinglar
+    videodan oldin o'chadi, shuning uchun video qatori hali mavjud.
+    """
+    _apply_delta(instance.video_id, -instance.rating, -1)
+
+
+def rebuild_rating_aggregates():
+    """Barcha aggregate'larni VideoRating jadvalidan qayta hisoblash. O'zgargan qatorlar soni qaytariladi"""
+    updated = 0
+    with transaction.atomic():
+        for model, lookup in (
+            (Video, 'video_id'),
+            (Course, 'video__section__course_id'),
+            (Category, 'video__section__course__category_id'),
+        ):
+            stats = {
+                row[lookup]: (row['total'], row['n'])
+                for row in VideoRating.objects.values(lookup).annotate(total=Sum('rating'), n=Count('id'))
+            }
+            changed = []
+            for obj in model.objects.only('id', 'rating_sum', 'rating_count'):
+                rating_sum, rating_count = stats.get(obj.pk, (0, 0))
+                if (obj.rating_sum, obj.rating_count) != (rating_sum, rating_count):
+                    obj.rating_sum, obj.rating_count = rating_sum, rating_count
+                    changed.append(obj)
+            model.objects.bulk_update(changed, ['rating_sum', 'rating_count'], batch_size=1000)
+            updated += len(changed)
+    return updated
@@ -0,0 +1,297 @@
+"""
+Kurs va sectionlar uchun to'liq matnli qidiruv indeksi.
+
+SQLite'da FTS5 virtual jadvali (bm25 bo'yicha tartib), PostgreSQL'da
+tsvector ustunli jadval + GIN indeks (ts_rank_cd). Har ikkalasida so'zlar
+prefiks bo'yicha qidiriladi (``huq`` -> ``huquq``). Indeks signal'lar
+orqali yangilanadi; bulk_create / loaddata dan keyin::
+
+    python manage.py rebuild_search_index
+
+Indeks jadvali bo'lmasa (FTS5'siz SQLite yoki boshqa DB) qidiruv oddiy
+``icontains`` SearchFilter'ga qaytadi.
+"""
+import re
+
+from django.apps import apps as global_apps
+from django.db import connection as default_connection, connections
+from django.db.models import Case, IntegerField, When
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+from main_video.models import Category, Course, Section, Users
+
+
+TABLES = {
+    'course': 'main_video_course_search',
+    'section': 'main_video_section_search',
+}
+SEARCH_LIMIT = 200  # eng mos natijalar soni
+MAX_TERMS = 8
+
+# o'zbekcha apostrof variantlari: "o'quv", "oʻquv", "o‘quv" -> "oquv"
+_APOSTROPHES = re.compile(r"['‘’ʻʼ`]")
+_WORD = re.compile(r'\w+')
+
+_available = set()
+
+
+def normalize(text):
+    return _APOSTROPHES.sub('', (text or '').lower())
+
+
+def terms(query):
+    return _WORD.findall(normalize(query))[:MAX_TERMS]
+
+
+# =========================
+# JADVALLAR
+# =========================
+def create_tables(connection):
+    with connection.cursor() as cursor:
+        for table in TABLES.values():
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+                    f"title, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+                )
+            elif connection.vendor == 'postgresql':
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} (object_id integer PRIMARY KEY, document tsvector NOT NULL)"
+                )
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS {table}_gin ON {table} USING GIN (document)")
+
+
+def drop_tables(connection):
+    with connection.cursor() as cursor:
+        for table in TABLES.values():
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    _available.discard(connection.alias)
+
+
+def is_available(connection):
+    """
+    Indeks jadvallari bormi. Faqat ijobiy natija process davomida eslab
+    qolinadi (gunicorn'da worker ishga tushganda tekshiriladi, gunicorn.conf.py):
+    worker migratsiyadan oldin ko'tarilgan bo'lsa ham jadvallar keyin ko'rinadi
+    va signal'lardagi index()/remove() yozishda davom etadi.
+    """
+    if connection.alias in _available:
+        return True
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return False
+    if set(TABLES.values()) <= set(connection.introspection.table_names()):
+        _available.add(connection.alias)
+        return True
+    return False
+
+
+# =========================
+# HUJJATLAR
+# =========================
+def course_documents(ids=None, apps=global_apps):
+    """(course_id, title, body): body - tavsif, muallif va teacherlar"""
+    Course = apps.get_model('main_video', 'Course')
+    courses = Course.objects.all() if ids is None else Course.objects.filter(pk__in=ids)
+    teachers = {}
+    through = Course.teacher.through.objects
+    if ids is not None:
+        through = through.filter(course_id__in=ids)
+    for course_id, *names in through.values_list(
+        'course_id', 'users__first_name', 'users__last_name', 'users__username', 'users__hemis_id'
+    ):
+        teachers.setdefault(course_id, []).extend(names)
+    return [
+        (pk, title, ' '.join(filter(None, [description, author, *teachers.get(pk, [])])))
+        for pk, title, description, author in courses.values_list('id', 'title', 'small_description', 'author')
+    ]
+
+
+def section_documents(ids=None, apps=global_apps):
+    """(section_id, title, body): body - tavsif, kurs va kategoriya nomi"""
+    Section = apps.get_model('main_video', 'Section')
+    sections = Section.objects.all() if ids is None else Section.objects.filter(pk__in=ids)
+    return [
+        (pk, title, ' '.join(filter(None, rest)))
+        for pk, title, *rest in sections.values_list(
+            'id', 'title', 'small_description', 'course__title', 'course__category__title'
+        )
+    ]
+
+
+BUILDERS = {
+    'course': course_documents,
+    'section': section_documents,
+}
+
+
+# =========================
+# YOZISH
+# =========================
+def _write(connection, kind, documents):
+    table = TABLES[kind]
+    rows = [(pk, normalize(title), normalize(body)) for pk, title, body in documents]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.executemany(f"DELETE FROM {table} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(f"INSERT INTO {table} (rowid, title, body) VALUES (%s, %s, %s)", rows)
+        else:
+            cursor.executemany(
+                f"INSERT INTO {table} (object_id, document) VALUES (%s, "
+                f"setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B')) "
+                f"ON CONFLICT (object_id) DO UPDATE SET document = EXCLUDED.document",
+                rows
+            )
+
+
+def index(kind, ids):
+    """Berilgan obyektlarni qayta indekslash (o'chirilganlari indeksdan ham o'chadi)"""
+    ids = list(ids)
+    if not ids or not is_available(default_connection):
+        return
+    documents = BUILDERS[kind](ids)
+    remove(kind, set(ids) - {pk for pk, _, _ in documents})
+    _write(default_connection, kind, documents)
+
+
+def remove(kind, ids):
+    ids = list(ids)
+    if not ids or not is_available(default_connection):
+        return
+    column = 'rowid' if default_connection.vendor == 'sqlite' else 'object_id'
+    with default_connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {TABLES[kind]} WHERE {column} = %s", [(pk,) for pk in ids])
+
+
+def rebuild(using='default', apps=global_apps, batch_size=1000):
+    """Indeksni noldan qurish. {kind: hujjatlar soni} qaytaradi"""
+    connection = connections[using]
+    create_tables(connection)
+    counts = {}
+    for kind, table in TABLES.items():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table}")
+        documents = BUILDERS[kind](apps=apps)
+        for start in range(0, len(documents), batch_size):
+            _write(connection, kind, documents[start:start + batch_size])
+        counts[kind] = len(documents)
+    return counts
+
+
+# =========================
+# QIDIRUV
+# =========================
+def search(kind, query, limit=SEARCH_LIMIT):
+    """
+    Mos obyekt id'lari relevance bo'yicha (eng mosi birinchi).
+    Indeks bo'lmasa None - chaqiruvchi icontains'ga qaytadi.
+    """
+    connection = default_connection
+    if not is_available(connection):
+        return None
+    words = terms(query)
+    if not words:
+        return []
+
+    table = TABLES[kind]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # har bir so'z qo'shtirnoq ichida (FTS5 operatorlari sifatida o'qilmaydi) + prefiks
+            cursor.execute(
+                f"SELECT rowid FROM {table} WHERE {table} MATCH %s ORDER BY bm25({table}, 10.0, 1.0) LIMIT %s",
+                [' '.join(f'"{word}"*' for word in words), limit]
+            )
+        else:
+            cursor.execute(
+                f"SELECT object_id FROM {table}, to_tsquery('simple', %s) query WHERE document @@ query "
+                f"ORDER BY ts_rank_cd(document, query) DESC, object_id LIMIT %s",
+                [' & '.join(f'{word}:*' for word in words), limit]
+            )
+        return [row[0] for row in cursor.fetchall()]
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    ``?search=`` - view.search_index ('course' / 'section') indeksi bo'yicha.
+
+    ``?ordering=`` berilmasa natija relevance bo'yicha tartiblanadi, shuning
+    uchun filter_backends ro'yxatida OrderingFilter'dan keyin turishi kerak.
+    Indeks yo'q bo'lsa view.search_fields bo'yicha oddiy icontains.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        kind = getattr(view, 'search_index', None)
+        if not query.strip() or kind is None:
+            return queryset
+
+        ids = search(kind, query)
+        if ids is None:
+            return super().filter_queryset(request, queryset, view)
+        if not ids:
+            return queryset.none()
+
+        queryset = queryset.filter(pk__in=ids)
+        if api_settings.ORDERING_PARAM not in request.query_params:
+            queryset = queryset.order_by(
+                Case(*[When(pk=pk, then=position) for position, pk in enumerate(ids)], output_field=IntegerField())
+            )
+        return queryset
+
+
+# =========================
+# SIGNAL'LAR
+# =========================
+@receiver(post_save, sender=Course)
+def index_course(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    index('course', [instance.pk])
+    # kurs nomi section hujjatlarida ham bor
+    index('section', Section.objects.filter(course=instance).values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Section)
+def index_section(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index('section', [instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def index_category_sections(sender, instance, raw=False, created=False, **kwargs):
+    if not (raw or created):
+        index('section', Section.objects.filter(course__category=instance).values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Course)
+def unindex_course(sender, instance, **kwargs):
+    remove('course', [instance.pk])
+
+
+@receiver(post_delete, sender=Section)
+def unindex_section(sender, instance, **kwargs):
+    remove('section', [instance.pk])
+
+
+@receiver(m2m_changed, sender=Course.teacher.through)
+def index_course_teachers(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            index('course', [instance.pk])
+    elif action == 'pre_clear':
+        # teacher'ning hamma kurslari olinadi: qaysilari ekanini oldindan eslab qolamiz
+        instance._search_courses = list(Course.objects.filter(teacher=instance).values_list('id', flat=True))
+    elif action == 'post_clear':
+        index('course', getattr(instance, '_search_courses', ()))
+    elif action in ('post_add', 'post_remove'):
+        index('course', pk_set or ())
+
+
+@receiver(post_save, sender=Users)
+def index_teacher_courses(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Teacher ismi/hemis_id si kurs hujjatida (login'dagi last_login hisobga olinmaydi)"""
+    if raw or instance.role != 'teacher' or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    index('course', Course.objects.filter(teacher=instance).values_list('id', flat=True))
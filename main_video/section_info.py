@@ -0,0 +1,64 @@
+from django.db.models import Prefetch
+
+from main_video.models import Missiya, QuizResult, SectionProgress, Video
+from main_video.serializers import MissiyaOneSerializer, SectionOneSerializer, VideosSerializer
+from main_video.snapshot import get_progress_snapshot
+
+
+def full_info_prefetch():
+    """SectionOneSerializer.videos va videos_with_access uchun bitta query"""
+    return Prefetch('video_set', queryset=Video.objects.order_by('id'))
+
+
+def section_full_info(section, context):
+    """
+    SectionOneViewSet.full_info javobi.
+
+    ``section`` quiz (select_related) va video_set (full_info_prefetch) bilan
+    olingan bo'lishi kerak. Videolar, userning progressi va ratinglari
+    (UserProgressSnapshot) bir marta yuklanadi va javobning hamma qismida
+    qayta ishlatiladi - query'lar soni sectiondagi videolar soniga bog'liq emas.
+    """
+    user = context['request'].user
+    data = SectionOneSerializer(section, context=context).data
+
+    videos = sorted(section.video_set.all(), key=lambda video: video.order)
+    data['videos_with_access'] = VideosSerializer(videos, many=True, context=context).data
+
+    quiz = getattr(section, 'quiz', None)
+    if quiz is not None:
+        data['has_quiz'] = True
+        data['quiz_id'] = quiz.id
+
+        # Quizga kirish huquqi: oxirgisidan oldingi hamma videolar ko'rilgan
+        access = get_progress_snapshot(context).access
+        data['quiz_accessible'] = all(access.is_completed(video.id) for video in videos[:-1])
+
+        # eng yuqori natija birinchi, qolganlari tartibini saqlab beradi
+        results = QuizResult.objects.filter(user=user, quiz=quiz).order_by('-percent', 'finished_at')
+        data['quiz_results'] = [
+            {
+                'id': r.id,
+                'total_questions': r.total_questions,
+                'correct_answers': r.correct_answers,
+                'percent': r.percent,
+                'is_passed': r.is_passed,
+                'started_at': r.started_at,
+                'finished_at': r.finished_at
+            }
+            for r in results
+        ]
+    else:
+        data['has_quiz'] = False
+        data['quiz_accessible'] = False
+        data['quiz_results'] = []
+
+    data['missiyalar'] = MissiyaOneSerializer(Missiya.objects.filter(section=section), many=True).data
+
+    section_progress = SectionProgress.objects.filter(user=user, section=section).first()
+    data['user_progress'] = {
+        'is_completed': section_progress.is_completed if section_progress else False,
+        'completed_at': section_progress.completed_at if section_progress else None,
+        'score_percent': section_progress.score_percent if section_progress else 0
+    }
+    return data
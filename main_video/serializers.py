@@ -3,6 +3,10 @@ from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from main_video.models import (
     Users, QuizResult, Question, Quiz, Certificate
 )
+from main_video.snapshot import get_progress_snapshot
+from main_video.sparse import SparseFieldsMixin
+from main_video.streaming import stream_url
+from main_video.transcoding import get_playlist_url
 
 
 # ----------------------------
@@ -28,6 +32,22 @@ class UserModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = Users
         fields = '__all__'
+        extra_kwargs = {'password': {'write_only': True}}
+
+
+class UserListSerializer(serializers.ModelSerializer):
+    """/api/users/ uchun yengil ko'rinish (parol hash'i va M2M'larsiz)"""
+    class Meta:
+        model = Users
+        fields = ['id', 'hemis_id', 'username', 'first_name', 'last_name', 'third_name', 'role', 'group', 'kurs',
+                  'is_active']
+
+
+class UserDetailSerializer(UserListSerializer):
+    """``?expand=detail``"""
+    class Meta(UserListSerializer.Meta):
+        fields = UserListSerializer.Meta.fields + ['email', 'imgage', 'avg_mark', 'is_staff', 'date_joined',
+                                                   'last_login']
 
 
 from rest_framework import serializers
@@ -44,7 +64,7 @@ class GroupSerializer(serializers.ModelSerializer):
 
 
 class UserSerializer(serializers.ModelSerializer):
-    group = GroupSerializer(read_only=True)
+    group = serializers.CharField(read_only=True)  # Users.group - HEMIS guruh nomi (FK emas)
 
     class Meta:
         model = Users
@@ -59,6 +79,7 @@ class UserSerializer(serializers.ModelSerializer):
 
 from rest_framework import serializers
 from main_video.models import Video, Comment, VideoRating, Users
+from main_video.ratings import rate_video
 
 class CommentSerializer(serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)  # userni hemid ko‘rsatadi
@@ -92,12 +113,12 @@ class VideoRatingSerializer(serializers.ModelSerializer):
         user = request.user
         video = validated_data['video']
 
-        # Agar user oldin rating bergan bo‘lsa, update qilamiz
-        obj, created = VideoRating.objects.update_or_create(
-            user=user,
-            video=video,
-            defaults={'rating': validated_data['rating']}
-        )
+        # Agar user oldin rating bergan bo‘lsa, update qilamiz (aggregate'lar ham yangilanadi)
+        obj, created = rate_video(user, video, validated_data['rating'])
+        return obj
+
+    def update(self, instance, validated_data):
+        obj, created = rate_video(instance.user, instance.video, validated_data.get('rating', instance.rating))
         return obj
 
 
@@ -107,7 +128,7 @@ class VideoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Video
         fields = [
-            'id', 'title', 'video_file', 'small_description',
+            'id', 'title', 'small_description',
             'is_blocked', 'order', 'created_at', 'updated_at'
         ]
 
@@ -196,25 +217,8 @@ class CategoryMainSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'img', 'created_at', 'updated_at', 'average_rating']  # 🆕 qo‘shildi
 
     def get_average_rating(self, obj):
-        courses = Course.objects.filter(category=obj)
-
-        if not courses.exists():
-            return 0
-
-        # Barcha kurslardagi barcha videolarning ratinglarini yig'ish
-        all_ratings = []
-        for course in courses:
-            videos = Video.objects.filter(  section__course=course)
-            for video in videos:
-                ratings = VideoRating.objects.filter(video=video).values_list('rating', flat=True)
-                all_ratings.extend(ratings)
-
-        if not all_ratings:
-            return 0
-
-        # O'rtacha hisoblash
-        average = sum(all_ratings) / len(all_ratings)
-        return round(average, 2)
+        # Barcha kurslardagi barcha videolar ratinglari o'rtachasi (Category.rating_sum / rating_count)
+        return obj.average_rating
 
 
 class CourseMainSerializer(serializers.ModelSerializer):
@@ -250,36 +254,19 @@ class CourseMainSerializer(serializers.ModelSerializer):
         ]
 
     def get_average_rating(self, obj):
-        videos = Video.objects.filter(section__course=obj)
-        if not videos.exists():
-            return 0
-
-        all_ratings = []
-        for video in videos:
-            ratings = VideoRating.objects.filter(
-                video=video
-            ).values_list('rating', flat=True)
-            all_ratings.extend(ratings)
-
-        if not all_ratings:
-            return 0
-
-        return round(sum(all_ratings) / len(all_ratings), 2)
+        return obj.average_rating
 
     def get_has_certificate(self, obj):
         request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
+        if not request or not request.user.is_authenticated or self.context.get('catalog_shared'):
             return False
 
-        return Certificate.objects.filter(
-            user=request.user,
-            course=obj
-        ).exists()
+        return get_progress_snapshot(self.context).has_certificate(obj.id)
 
 # -----------------------------zz
 # COURSE PROGRESS SERIALIZER
 # -----------------------------
-class CourseProgressSerializer(serializers.ModelSerializer):
+class CourseProgressSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     course = CourseSerializer(read_only=True)
 
@@ -292,7 +279,7 @@ class CourseProgressSerializer(serializers.ModelSerializer):
 # -----------------------------
 # SECTION PROGRESS SERIALIZER
 # -----------------------------
-class SectionProgressSerializer(serializers.ModelSerializer):
+class SectionProgressSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     section = SectionSerializer(read_only=True)
 
@@ -335,6 +322,8 @@ class VideosSerializer(serializers.ModelSerializer):
     user_progress = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()  # 🆕 yangi field
     user_rating = serializers.SerializerMethodField()  # ✅ QO‘SHILDI
+    hls_playlist = serializers.SerializerMethodField()  # transcode tayyor bo'lsa master.m3u8
+    stream_url = serializers.SerializerMethodField()  # /stream/?token= (Range bilan mp4)
 
     class Meta:
         model = Video
@@ -342,6 +331,8 @@ class VideosSerializer(serializers.ModelSerializer):
             'id',
             'title',
             'video_file',
+            'hls_playlist',
+            'stream_url',
             'section',
             'small_description',
             'order',
@@ -352,24 +343,28 @@ class VideosSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at'
         ]
+        # fayl faqat yuklash uchun: o'qishda /media URL'i access tekshiruvini chetlab o'tadi,
+        # ko'rish stream_url / hls_playlist orqali
+        extra_kwargs = {'video_file': {'write_only': True}}
 
     def get_user_rating(self, obj):
             request = self.context.get('request')
             if not request or not request.user.is_authenticated:
                 return None
 
-            rating = VideoRating.objects.filter(
-                video=obj,
-                user=request.user
-            ).first()
-
-            return rating.rating if rating else None
+            return get_progress_snapshot(self.context).video_user_rating(obj.id)
 
     def get_is_accessible(self, obj):
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
-        return obj.check_video_access(request.user)
+        return get_progress_snapshot(self.context).access.has_access(obj)
+
+    def get_hls_playlist(self, obj):
+        return get_playlist_url(obj, self.context)
+
+    def get_stream_url(self, obj):
+        return stream_url(self.context.get('request'), 'videos-stream', 'video', obj.pk)
 
     def get_user_progress(self, obj):
         request = self.context.get('request')
@@ -379,30 +374,14 @@ class VideosSerializer(serializers.ModelSerializer):
                 'completed_at': None
             }
 
-        progress = VideoProgress.objects.filter(
-            user=request.user,
-            video=obj
-        ).first()
-
-        if not progress:
-            return {
-                'is_completed': False,
-                'completed_at': None
-            }
-
-        return {
-            'is_completed': progress.is_completed,
-            'completed_at': progress.completed_at
-        }
+        return get_progress_snapshot(self.context).video_user_progress(obj.id)
 
     def get_average_rating(self, obj):
         """
         Video uchun barcha ratinglarning o'rtachasi
         """
-        avg = VideoRating.objects.filter(video=obj).aggregate(avg_rating=Avg('rating'))['avg_rating']
-        if avg is None:
-            return 0  # agar hali rating berilmagan bo'lsa
-        return round(avg, 2)  # 2 ta onlik raqam bilan
+        # agar hali rating berilmagan bo'lsa 0, aks holda 2 ta onlik raqam bilan
+        return obj.average_rating
 
 
 
@@ -429,7 +408,7 @@ class SectionWithAccessSerializer(serializers.ModelSerializer):
             serializer = VideosSerializer(
                 videos,
                 many=True,
-                context={'request': request}
+                context=self.context
             )
             return serializer.data
         return []
@@ -438,18 +417,13 @@ class SectionWithAccessSerializer(serializers.ModelSerializer):
     def get_accessible_videos_count(self, obj):
         """User uchun ochiq videolar soni"""
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            count = 0
-            videos = Video.objects.filter(section=obj)
-            for video in videos:
-                if video.check_video_access(request.user):
-                    count += 1
-            return count
+        if request and request.user.is_authenticated and not self.context.get('catalog_shared'):
+            return get_progress_snapshot(self.context).access.accessible_count(obj.id)
         return 0
 
     def get_total_videos_count(self, obj):
         """Jami videolar soni"""
-        return Video.objects.filter(section=obj).count()
+        return len(get_progress_snapshot(self.context).access.section_video_ids(obj.id))
 
 from django.db.models import Avg
 
@@ -472,13 +446,15 @@ class CourseWithProgressSerializer(serializers.ModelSerializer):
     def get_sections(self, obj):
         """Kursning bo'limlari"""
         request = self.context.get('request')
-        sections = Section.objects.filter(course=obj).order_by('order')
+        sections = obj.section_set.all()  # CategoryViewSet'da prefetch qilingan
 
         if request and request.user.is_authenticated:
+            # kursdagi barcha videolar access'i bir marta hisoblanadi (oldin yuklanmagan bo'lsa)
+            get_progress_snapshot(self.context).access.load_sections([section.id for section in sections])
             serializer = SectionWithAccessSerializer(
                 sections,
                 many=True,
-                context={'request': request}
+                context=self.context
             )
             return serializer.data
         return []
@@ -486,26 +462,30 @@ class CourseWithProgressSerializer(serializers.ModelSerializer):
     def get_total_progress(self, obj):
         """Kurs bo'yicha umumiy progress"""
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            try:
-                progress = CourseProgress.objects.get(
-                    user=request.user,
-                    course=obj
-                )
-                return progress.progress_percent
-            except CourseProgress.DoesNotExist:
-                return 0
+        if request and request.user.is_authenticated and not self.context.get('catalog_shared'):
+            return get_progress_snapshot(self.context).course_progress_percent(obj.id)
         return 0
 
     def get_average_video_rating(self, obj):
-        """Kursdagi barcha videolarning o'rtacha ratingini hisoblash"""
-        videos = Video.objects.filter(section__course=obj)
-        # related_name bo‘yicha to‘g‘riladik
-        avg = videos.aggregate(avg_rating=Avg('ratings__rating'))['avg_rating']
-        if avg is None:
-            return 0
-        return round(avg, 2)
+        """Kursdagi barcha videolarning o'rtacha ratingi"""
+        return obj.average_rating
+
+
+
+class CategoryListSerializer(serializers.ListSerializer):
+    """Hamma kategoriyalardagi sectionlar videolari access uchun bitta query bilan"""
 
+    def to_representation(self, data):
+        categories = list(data.all() if hasattr(data, 'all') else data)
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            get_progress_snapshot(self.context).access.load_sections([
+                section.id
+                for category in categories
+                for course in category.course_set.all()
+                for section in course.section_set.all()
+            ])
+        return super().to_representation(categories)
 
 
 class CategoryWithCoursesSerializer(serializers.ModelSerializer):
@@ -517,15 +497,15 @@ class CategoryWithCoursesSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'img', 'courses', 'created_at', 'updated_at'
         ]
+        list_serializer_class = CategoryListSerializer
 
     def get_courses(self, obj):
-        request = self.context.get('request')
-        courses = Course.objects.filter(category=obj)
+        courses = obj.course_set.all()
 
         serializer = CourseWithProgressSerializer(
             courses,
             many=True,
-            context={'request': request}
+            context=self.context
         )
         return serializer.data
 
@@ -551,9 +531,9 @@ class QuestionSerializer(serializers.ModelSerializer):
         ]
         return rep
 
-from django.db.models import Case, When, IntegerField
 from django.utils import timezone
 from main_video.models import QuizSession
+from main_video.quiz_submit import QuizSubmitError, submit_quiz
 
 class QuizSerializer(serializers.ModelSerializer):
     questions = serializers.SerializerMethodField()
@@ -581,25 +561,16 @@ class QuizSerializer(serializers.ModelSerializer):
         if not ids:
             return []
 
-        # ✅ random tartib saqlansin (ids tartibini DBda ham shunday order qilamiz)
-        order_case = Case(
-            *[When(id=pk, then=pos) for pos, pk in enumerate(ids)],
-            output_field=IntegerField()
-        )
-
-        qs = obj.questions.filter(id__in=ids).order_by(order_case)
-        return QuestionSerializer(qs, many=True).data
+        # ✅ random tartib saqlansin: oddiy id__in, tartib Python'da
+        questions = {q.id: q for q in obj.questions.filter(id__in=ids)}
+        return QuestionSerializer([questions[qid] for qid in ids if qid in questions], many=True).data
 
     def get_is_accessible(self, obj):
         user = self.context.get('request').user
         if not user.is_authenticated:
             return False
 
-        videos = obj.section.video_set.all()
-        for video in videos:
-            if not VideoProgress.objects.filter(user=user, video=video, is_completed=True).exists():
-                return False
-        return True
+        return get_progress_snapshot(self.context).section_videos_completed(obj.section_id)
 
     def get_user_result(self, obj):
         user = self.context.get('request').user
@@ -628,17 +599,10 @@ class QuizSubmitSerializer(serializers.Serializer):
         return attrs
 
     def save(self, quiz):
+        """Javoblarni tekshirib main_video.quiz_submit.submit_quiz ga beradi (QuizResult qaytadi)"""
         user = self.context.get('request').user
         answers = self.validated_data['answers']
 
-        # ✅ active sessionni olamiz (quizda userga yuborilgan random savollar)
-        session = QuizSession.objects.filter(user=user, quiz=quiz, is_submitted=False).order_by('-created_at').first()
-        if not session or not session.question_ids:
-            raise serializers.ValidationError("Quiz savollari topilmadi. Quizni qayta ochib kiring.")
-
-        question_ids = session.question_ids
-        total_questions = len(question_ids)
-
         # ✅ answers -> dict (question_id => answer)
         answers_map = {}
         for item in answers:
@@ -655,56 +619,11 @@ class QuizSubmitSerializer(serializers.Serializer):
 
             answers_map[qid] = str(item['answer'])
 
-        # ✅ Faqat sessiondagi savollar qabul qilinadi (cheat bo‘lmasin)
-        extra_ids = [qid for qid in answers_map.keys() if qid not in question_ids]
-        if extra_ids:
-            raise serializers.ValidationError("Yuborilgan javoblar orasida sessionga kirmaydigan savollar bor")
-
-        # ✅ Correct answerlarni bitta query bilan olamiz
-        qs = quiz.questions.filter(id__in=question_ids).values_list('id', 'correct_answer')
-        correct_map = {qid: str(ca) for qid, ca in qs}
-
-        correct_answers = 0
-        for qid in question_ids:
-            user_answer = answers_map.get(qid)  # javob bermagan bo‘lsa None -> noto‘g‘ri hisoblanadi
-            if user_answer is not None and correct_map.get(qid) == str(user_answer):
-                correct_answers += 1
-
-        percent = (correct_answers / total_questions) * 100 if total_questions else 0
-        is_passed = percent >= quiz.pass_percent
-        now = timezone.now()
-
-        result, created = QuizResult.objects.update_or_create(
-            user=user,
-            quiz=quiz,
-            defaults={
-                'total_questions': total_questions,
-                'correct_answers': correct_answers,
-                'percent': percent,
-                'is_passed': is_passed,
-                'started_at': session.created_at,
-                'finished_at': now,
-            }
-        )
-
-        # ✅ sessionni yopamiz (keyingi urinishda yangi random savollar beriladi)
-        session.is_submitted = True
-        session.submitted_at = now
-        session.save(update_fields=['is_submitted', 'submitted_at'])
-
-        # ✅ PASS bo‘lsa section ochish (sizdagi eski logika)
-        if is_passed:
-            section = quiz.section
-            section_progress, _ = SectionProgress.objects.get_or_create(user=user, section=section)
-            section_progress.is_completed = True
-            section_progress.completed_at = now
-            section_progress.save()
-
-            next_section = Section.objects.filter(course=section.course, order__gt=section.order).order_by('order').first()
-            if next_section:
-                next_section.is_blocked = False
-                next_section.save()
-
+        # sessiya yopish, natija, section ochish - bitta transaction'da, takroriy yuborish xavfsiz
+        try:
+            result, _ = submit_quiz(user, quiz, answers_map)
+        except QuizSubmitError as exc:
+            raise serializers.ValidationError(str(exc))
         return result
 
 
@@ -729,10 +648,9 @@ class SectionOneSerializer(serializers.ModelSerializer):
         ]
 
     def get_quiz(self, obj):
-        request = self.context.get('request')
         quiz = getattr(obj, 'quiz', None)  # OneToOneField orqali
         if quiz:
-            serializer = QuizSerializer(quiz, context={'request': request})
+            serializer = QuizSerializer(quiz, context=self.context)
             return serializer.data
         return None
 
@@ -744,6 +662,23 @@ class VazifaSerializer(serializers.ModelSerializer):
         fields = ['id', 'missiya', "user",'description', 'file', 'is_approved', 'score']
 
 
+class VazifaGradeSerializer(serializers.Serializer):
+    submission = serializers.IntegerField(min_value=1)
+    score = serializers.IntegerField(min_value=0, max_value=32767, default=0)
+    is_approved = serializers.BooleanField(default=True)
+
+
+class VazifaBulkGradeSerializer(serializers.Serializer):
+    """Bir nechta vazifani bitta so'rovda baholash"""
+    grades = VazifaGradeSerializer(many=True, allow_empty=False, max_length=1000)
+
+    def validate_grades(self, grades):
+        ids = [grade['submission'] for grade in grades]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Bitta vazifa 2 marta yuborilgan")
+        return grades
+
+
 # ----------------------------
 # CERTIFICATE SERIALIZERS
 # ----------------------------
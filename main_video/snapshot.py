@@ -0,0 +1,91 @@
+from django.utils.functional import cached_property
+
+from main_video.access import VideoAccessResolver
+from main_video.models import Certificate, CourseProgress, SectionProgress, VideoProgress, VideoRating
+
+
+class UserProgressSnapshot:
+    """
+    Bitta request uchun userning progress va rating ma'lumotlari.
+
+    Har bir jadval (VideoProgress, VideoRating, SectionProgress, CourseProgress)
+    birinchi kerak bo'lganda bitta query bilan yuklanadi, keyin
+    SerializerMethodField'lar faqat dict'lardan o'qiydi.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.is_authenticated = bool(user and user.is_authenticated)
+
+    # ---------- USER ROWS ----------
+    @cached_property
+    def video_progress(self):
+        if not self.is_authenticated:
+            return {}
+        rows = VideoProgress.objects.filter(user=self.user).values_list('video_id', 'is_completed', 'completed_at')
+        return {video_id: (is_completed, completed_at) for video_id, is_completed, completed_at in rows}
+
+    @cached_property
+    def video_ratings(self):
+        if not self.is_authenticated:
+            return {}
+        return dict(VideoRating.objects.filter(user=self.user).values_list('video_id', 'rating'))
+
+    @cached_property
+    def section_progress(self):
+        if not self.is_authenticated:
+            return {}
+        return {sp.section_id: sp for sp in SectionProgress.objects.filter(user=self.user)}
+
+    @cached_property
+    def course_progress(self):
+        if not self.is_authenticated:
+            return {}
+        return {cp.course_id: cp for cp in CourseProgress.objects.filter(user=self.user)}
+
+    @cached_property
+    def certificate_course_ids(self):
+        if not self.is_authenticated:
+            return set()
+        return set(Certificate.objects.filter(user=self.user).values_list('course_id', flat=True))
+
+    @cached_property
+    def access(self):
+        return VideoAccessResolver(self.user, progress=self.video_progress)
+
+    # ---------- VIDEO ----------
+    def video_user_progress(self, video_id):
+        return self.access.progress(video_id)
+
+    def video_user_rating(self, video_id):
+        return self.video_ratings.get(video_id)
+
+    # ---------- SECTION / COURSE ----------
+    def section_videos_completed(self, section_id):
+        return all(self.access.is_completed(video_id) for video_id in self.access.section_video_ids(section_id))
+
+    def course_progress_percent(self, course_id):
+        progress = self.course_progress.get(course_id)
+        return progress.progress_percent if progress else 0
+
+    def has_certificate(self, course_id):
+        return course_id in self.certificate_course_ids
+
+
+def get_progress_snapshot(context):
+    """
+    Serializer context'idagi snapshot (yo'q bo'lsa yaratiladi).
+
+    Snapshot request obyektida ham saqlanadi, shuning uchun bitta view ichida
+    alohida context bilan yaratilgan serializerlar ham uni qayta ishlatadi.
+    """
+    snapshot = context.get('progress_snapshot')
+    if snapshot is None:
+        request = context.get('request')
+        snapshot = getattr(request, '_progress_snapshot', None)
+        if snapshot is None:
+            snapshot = UserProgressSnapshot(getattr(request, 'user', None))
+            if request is not None:
+                request._progress_snapshot = snapshot
+        context['progress_snapshot'] = snapshot
+    return snapshot
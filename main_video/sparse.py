@@ -0,0 +1,151 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+class Shape:
+    """
+    ``?fields=`` / ``?expand=`` dan olingan daraxt.
+
+    ``fields=None`` - hamma maydonlar, ``expand`` - ochiladigan nested maydonlar.
+    """
+
+    def __init__(self):
+        self.fields = None
+        self.expand = set()
+        self.children = {}
+
+    def child(self, name):
+        return self.children.setdefault(name, Shape())
+
+    @classmethod
+    def parse(cls, fields, expand):
+        shape = cls()
+        for path in _paths(fields):
+            node = shape
+            for i, name in enumerate(path):
+                if node.fields is None:
+                    node.fields = set()
+                node.fields.add(name)
+                if i < len(path) - 1:
+                    # course.title -> course ham ochiladi
+                    node.expand.add(name)
+                    node = node.child(name)
+        for path in _paths(expand):
+            node = shape
+            for name in path:
+                node.expand.add(name)
+                node = node.child(name)
+        return shape
+
+
+def _paths(value):
+    return [tuple(part for part in item.strip().split('.') if part) for item in (value or '').split(',') if item.strip()]
+
+
+def _nested(field):
+    """Nested serializer (many=True bo'lsa child), aks holda None"""
+    if isinstance(field, serializers.ListSerializer):
+        field = field.child
+    return field if isinstance(field, serializers.BaseSerializer) else None
+
+
+def apply_shape(fields, shape):
+    """
+    Keraksiz maydonlarni olib tashlash. Ochilmagan nested obyekt -> id,
+    ochilmagan nested ro'yxat (many=True) umuman chiqmaydi.
+    """
+    for name in list(fields):
+        field = fields[name]
+        if shape.fields is not None and name not in shape.fields:
+            del fields[name]
+            continue
+        nested = _nested(field)
+        if nested is None:
+            continue
+        if name in shape.expand:
+            apply_shape(nested.fields, shape.children.get(name) or Shape())
+        elif nested is not field:
+            del fields[name]
+        else:
+            source = {} if field.source == name else {'source': field.source}
+            fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, **source)
+
+
+class SparseFieldsMixin:
+    """
+    Top-level serializer uchun::
+
+        ?fields=id,progress_percent,course.title
+        ?expand=course,course.sections
+
+    Parametrlar bo'lmasa javob avvalgidek (to'liq daraxt). Ulardan biri
+    berilsa nested obyektlar faqat ``expand`` (yoki ``fields`` dagi
+    ``course.title`` kabi yo'l) bilan ochiladi.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        shape = self.requested_shape()
+        if shape is not None:
+            apply_shape(fields, shape)
+        return fields
+
+    def requested_shape(self):
+        root = self.root
+        if root is not self and not (root is self.parent and isinstance(root, serializers.ListSerializer)):
+            return None
+        request = self.context.get('request')
+        if request is None:
+            return None
+        params = request.query_params
+        if 'fields' not in params and 'expand' not in params:
+            return None
+        return Shape.parse(params.get('fields'), params.get('expand'))
+
+
+def _relation(model, name):
+    """Forward maydon yoki reverse accessor (``section_set``) bo'yicha relation"""
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        for related in model._meta.related_objects:
+            if related.get_accessor_name() == name:
+                return related
+        return None
+    return field if field.is_relation else None
+
+
+def related_lookups(serializer, model, prefix='', many=False):
+    """Serializer daraxtiga mos (select_related, prefetch_related) yo'llari"""
+    select, prefetch = [], []
+    for field in serializer.fields.values():
+        nested = _nested(field)
+        if nested is None or field.source == '*':
+            continue
+        relation = _relation(model, field.source)
+        if relation is None:
+            continue
+
+        path = prefix + field.source
+        nested_many = many or relation.many_to_many or relation.one_to_many
+        (prefetch if nested_many else select).append(path)
+        nested_select, nested_prefetch = related_lookups(nested, relation.related_model, path + '__', nested_many)
+        select += nested_select
+        prefetch += nested_prefetch
+    return select, prefetch
+
+
+class SparseFieldsViewMixin:
+    """get_queryset'ga so'ralgan shaklga mos select_related/prefetch_related qo'shadi"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+        serializer = self.get_serializer()
+        select, prefetch = related_lookups(serializer, queryset.model)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
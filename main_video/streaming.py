@@ -0,0 +1,222 @@
+import mimetypes
+import os
+import re
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# mimetypes bularni har doim ham bilmaydi
+CONTENT_TYPES = {
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.ts': 'video/mp2t',
+}
+
+
+STREAM_TOKEN_SALT = 'main_video.stream'
+
+
+def stream_token(user, scope):
+    """
+    Bitta obyekt (``video:12``, ``course:3``) uchun imzolangan token.
+
+    <video src="..."> Authorization header yubora olmaydi, shuning uchun
+    stream URL'ida access JWT o'rniga shu token yuriladi: log yoki Referer'ga
+    tushsa ham faqat shu obyektni STREAM_TOKEN_MAX_AGE davomida ochadi.
+    """
+    return signing.dumps([user.pk, scope], salt=STREAM_TOKEN_SALT)
+
+
+def stream_token_window():
+    """
+    Joriy token oynasi boshi (unix vaqt). Token'li javoblarning ETag'i shu
+    bilan almashadi: 304 bilan qaytgan tokenda kamida STREAM_TOKEN_MAX_AGE / 2 qoladi.
+    """
+    step = max(settings.STREAM_TOKEN_MAX_AGE // 2, 1)
+    now = int(time.time())
+    return now - now % step
+
+
+def stream_url(request, viewname, scope, pk):
+    """``?token=`` bilan stream URL'i (anonim user uchun None)"""
+    if request is None or not request.user.is_authenticated:
+        return None
+    url = f"{reverse(viewname, kwargs={'pk': pk})}?token={stream_token(request.user, f'{scope}:{pk}')}"
+    return request.build_absolute_uri(url)
+
+
+class StreamTokenAuthentication(BaseAuthentication):
+    """
+    Stream endpointlarida ``?token=`` yoki URL yo'lidagi ``<token>`` (HLS)
+    - stream_token(). Token view.stream_scope va URL'dagi pk ga mos bo'lishi
+    kerak: boshqa video uchun ishlamaydi.
+    """
+
+    def authenticate(self, request):
+        context = request.parser_context or {}
+        kwargs = context.get('kwargs') or {}
+        raw_token = kwargs.get('token') or request.query_params.get('token')
+        if not raw_token:
+            return None
+
+        try:
+            user_id, scope = signing.loads(raw_token, salt=STREAM_TOKEN_SALT, max_age=settings.STREAM_TOKEN_MAX_AGE)
+        except (signing.BadSignature, TypeError, ValueError):
+            raise AuthenticationFailed("Stream token yaroqsiz yoki muddati o'tgan")
+        if scope != f"{context['view'].stream_scope}:{kwargs.get('pk')}":
+            raise AuthenticationFailed("Stream token bu obyekt uchun emas")
+
+        user = get_user_model().objects.filter(pk=user_id, is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed("User topilmadi")
+        return user, None
+
+
+class _RangeFile:
+    """
+    Faylning [start, start + length) qismi.
+
+    WSGI server sendfile qila olsa (gunicorn) ``fileno()`` va joriy offset
+    ishlatiladi, aks holda read() faqat shu oraliqni qaytaradi.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def _parse_range(header, size):
+    """
+    ``Range: bytes=...`` -> (start, end). Header yo'q, noto'g'ri yoki bir nechta
+    oraliq bo'lsa None (butun fayl). Qanoatlantirib bo'lmasa ValueError.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-500: oxirgi 500 bayt
+        suffix = int(last)
+        if not suffix or not size:
+            raise ValueError('unsatisfiable')
+        return max(size - suffix, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise ValueError('unsatisfiable')
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    """If-Range mos kelmasa Range e'tiborsiz qoldiriladi (butun fayl 200 bilan)"""
+    value = request.META.get('HTTP_IF_RANGE')
+    if not value:
+        return True
+    if value.startswith(('"', 'W/')):
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def stream_file(request, field_file, cache_max_age=3600):
+    """
+    FileField faylini Range/If-Range, ETag/Last-Modified bilan qaytarish.
+
+    Access oldin view'da tekshirilishi kerak. ``VIDEO_SENDFILE`` sozlamasi
+    berilsa fayl front proxy'ga (X-Accel-Redirect / X-Sendfile) topshiriladi.
+    """
+    if not field_file:
+        raise Http404('Fayl yo‘q')
+
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        # local bo'lmagan storage (S3 va h.k.) o'zi Range'ni qo'llab-quvvatlaydi
+        return HttpResponseRedirect(field_file.url)
+    return stream_path(request, path, field_file.name, cache_max_age)
+
+
+def stream_path(request, path, name, cache_max_age=3600):
+    """MEDIA_ROOT ichidagi fayl (``name`` - MEDIA_ROOT ga nisbatan yo'l)"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404('Fayl topilmadi')
+
+    size = stat.st_size
+    last_modified = int(stat.st_mtime)
+    etag = f'"{last_modified:x}-{size:x}"'
+    content_type = (
+        CONTENT_TYPES.get(os.path.splitext(path)[1].lower())
+        or mimetypes.guess_type(path)[0]
+        or 'application/octet-stream'
+    )
+
+    def finalize(response):
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, max_age=cache_max_age)
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return finalize(not_modified)
+
+    backend = getattr(settings, 'VIDEO_SENDFILE', '')
+    if backend == 'x-accel-redirect':
+        # nginx Range/If-Range'ni o'zi bajaradi
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.VIDEO_SENDFILE_PREFIX.rstrip('/') + '/' + name
+        return finalize(response)
+    if backend == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+        return finalize(response)
+
+    byte_range = None
+    if _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = _parse_range(request.META.get('HTTP_RANGE'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return finalize(response)
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    response = FileResponse(_RangeFile(open(path, 'rb'), start, length), content_type=content_type)
+    response['Content-Length'] = str(length)
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return finalize(response)
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from main_video import search
+from main_video.models import Video
+from main_video.ratings import rate_video
+from main_video.tests import make_catalog, make_quiz, make_user
+
+
+@override_settings(QUERY_BUDGET_STRICT=True, REQUEST_METRICS_HEADERS=True)
+class QueryBudgetTests(TransactionTestCase):
+    """
+    QUERY_BUDGETS dagi har bir endpoint strict rejimda: budget oshsa middleware
+    QueryBudgetExceeded ko'taradi. TransactionTestCase - on_commit'lar (progress_version)
+    request ichida bajariladi, xuddi production'dagidek.
+    """
+
+    def setUp(self):
+        make_catalog()
+        self.course, (self.section, _) = make_catalog()
+        make_quiz(self.section)
+        self.video, self.next_video = Video.objects.filter(section=self.section).order_by('order')[:2]
+        self.user = make_user('S0000001')
+        rate_video(self.user, self.video, 4)
+        # real JWT: autentifikatsiya query'si ham hisobga kiradi
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        search.is_available(connection)  # gunicorn post_worker_init
+
+    def requests(self):
+        section = f'/api/section_one/{self.section.pk}'
+        return [
+            ('get', '/api/category_main/'),
+            ('get', '/api/categories/'),
+            ('get', '/api/course_main/'),
+            ('get', '/api/course_main/?search=Jin'),
+            ('get', f'/api/courses/{self.course.pk}/'),
+            ('get', f'{section}/'),
+            ('get', f'{section}/full_info/'),
+            ('get', f'{section}/videos/'),
+            ('post', f'/api/videos/{self.video.pk}/mark_as_watched/'),
+            ('post', f'/api/videos/{self.next_video.pk}/mark_as_watched/'),
+            ('get', '/api/course-progress/'),
+            ('get', '/api/section-progress/'),
+            ('get', '/api/users/'),
+        ]
+
+    def test_endpoints_within_budget(self):
+        covered = set()
+        for method, url in self.requests():
+            with self.subTest(url=url):
+                response = getattr(self.client, method)(url)
+                self.assertEqual(response.status_code, 200, response.content[:200])
+                endpoint = response['X-Endpoint']
+                self.assertLessEqual(int(response['X-Query-Count']), settings.QUERY_BUDGETS[endpoint])
+                covered.add(endpoint)
+        self.assertEqual(covered, set(settings.QUERY_BUDGETS))
@@ -1,3 +1,836 @@
-from django.test import TestCase
+import errno
+import os
+import re
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import urljoin
+
+import requests
+
+from django.contrib import admin
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.db import sqlite_options
+from main_video import search
+from main_video.admin import SectionProgressAdmin
+from main_video.checks import check_catalog_cache
+from main_video.conditional import batched_progress_bumps, bump_progress_version
+from main_video.management.commands import hemis_stub_server, import_hemis_users
+from main_video.metrics import query_budget
+from main_video.models import (
+    Category, Certificate, ChunkedUpload, Comment, Course, CourseProgress, Missiya, Question, Quiz, QuizResult,
+    QuizSession, QuizSessionManager, Section, SectionProgress, Users, Vazifa_bajarish, Video, VideoProgress,
+    VideoRating, VideoTranscode,
+)
+from main_video.progress import recompute_vazifa_progress
+from main_video.quiz_pool import get_question_pool
+from main_video.quiz_submit import submit_quiz
+from main_video.ratings import rate_video
+from main_video.transcoding import claim_next, transcode
+from main_video.uploads import locked_part, part_path
+
+
+def make_catalog(sections=2, videos=3):
+    """Kategoriya -> kurs -> sectionlar -> videolar. (course, [section, ...]) qaytaradi"""
+    category = Category.objects.create(title='Huquq')
+    course = Course.objects.create(title='Jinoyat huquqi', category=category, author='a', small_description='kurs')
+    section_list = []
+    for i in range(sections):
+        section = Section.objects.create(
+            title=f'{i + 1}-mavzu', course=course, small_description='mavzu', order=i + 1, is_blocked=i > 0
+        )
+        for j in range(videos):
+            Video.objects.create(
+                title=f'{i + 1}.{j + 1}', video_file='videos/test.mp4', section=section, order=j + 1, is_blocked=False
+            )
+        section_list.append(section)
+    return course, section_list
+
+
+def make_user(hemis_id, role='student'):
+    return Users.objects.create(hemis_id=hemis_id, username=hemis_id, role=role)
+
+
+class RatingAggregateTests(TestCase):
+    def setUp(self):
+        self.course, (self.section, _) = make_catalog()
+        self.video = Video.objects.filter(section=self.section).first()
+        self.user = make_user('S0000001')
+
+    def assertAggregates(self, rating_sum, rating_count):
+        for obj in (self.video, self.course, self.course.category):
+            obj.refresh_from_db()
+            self.assertEqual((obj.rating_sum, obj.rating_count), (rating_sum, rating_count), type(obj).__name__)
+
+    def test_queryset_delete_subtracts(self):
+        rate_video(self.user, self.video, 5)
+        rate_video(make_user('S0000002'), self.video, 3)
+        self.assertAggregates(8, 2)
+
+        VideoRating.objects.filter(user=self.user).delete()
+        self.assertAggregates(3, 1)
+
+    def test_user_cascade_subtracts(self):
+        rate_video(self.user, self.video, 4)
+        self.user.delete()
+        self.assertAggregates(0, 0)
+
+    def test_video_cascade_subtracts_from_course(self):
+        other = Video.objects.filter(section=self.section).exclude(pk=self.video.pk).first()
+        rate_video(self.user, self.video, 4)
+        rate_video(self.user, other, 2)
+        self.video.delete()
+
+        for obj in (self.course, self.course.category):
+            obj.refresh_from_db()
+            self.assertEqual((obj.rating_sum, obj.rating_count), (2, 1))
+
+    def test_api_destroy_subtracts(self):
+        rating, _ = rate_video(self.user, self.video, 5)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.delete(f'/api/ratings/{rating.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertAggregates(0, 0)
+
+
+class SectionProgressWriteTests(TestCase):
+    """API va admin'dagi is_completed o'zgarishi kurs counteri va sertifikatni yangilaydi"""
+
+    def setUp(self):
+        self.course, (self.section,) = make_catalog(sections=1)
+        self.user = make_user('S0000001')
+        self.progress = SectionProgress.objects.create(user=self.user, section=self.section)
+
+    def assert_course_completed(self, completed):
+        course_progress = CourseProgress.objects.get(user=self.user, course=self.course)
+        self.assertEqual(course_progress.completed_sections, int(completed))
+        self.assertEqual(Certificate.objects.filter(user=self.user, course=self.course).exists(), completed)
+
+    def test_api_patch(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.patch(f'/api/section-progress/{self.progress.pk}/', {'is_completed': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['is_completed'])
+        self.assert_course_completed(True)
+
+    def test_admin_save(self):
+        model_admin = SectionProgressAdmin(SectionProgress, admin.site)
+        self.progress.is_completed = True
+        form = mock.Mock(changed_data=['is_completed'], initial={'is_completed': False})
+        model_admin.save_model(None, self.progress, form, change=True)
+        self.assertTrue(SectionProgress.objects.get(pk=self.progress.pk).is_completed)
+        self.assert_course_completed(True)
+
+
+class CatalogCacheCheckTests(SimpleTestCase):
+    LOCMEM = {'catalog': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    REDIS = {'catalog': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+
+    def ids(self, workers):
+        with mock.patch.dict(os.environ, {'WEB_CONCURRENCY': str(workers)}):
+            return [error.id for error in check_catalog_cache(None)]
+
+    def test_locmem_with_many_workers_fails(self):
+        with override_settings(CACHES=self.LOCMEM):
+            self.assertEqual(self.ids(1), [])
+            self.assertEqual(self.ids(5), ['main_video.E001'])
+
+    def test_shared_backend_passes(self):
+        with override_settings(CACHES=self.REDIS):
+            self.assertEqual(self.ids(5), [])
+
+
+class SqliteJournalModeTests(TestCase):
+    def test_wal_set_once_by_migration(self):
+        self.assertNotIn('journal_mode', sqlite_options()['init_command'])
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.assertEqual(cursor.fetchone()[0], 'wal')
+
+
+class HemisBulkImportTests(TestCase):
+    def setUp(self):
+        self.course, _ = make_catalog(sections=1, videos=1)
+        self.teacher = make_user('T000001', role='teacher')
+        self.course.teacher.add(self.teacher)
+        self.command = import_hemis_users.Command()
+        self.command.counts = {'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'errors': 0}
+        self.command.password_workers = 1
+
+    def import_teacher(self, first_name):
+        row = {'employee_id_number': 'T000001', 'department_name': 'kafedra', 'first_name': first_name,
+               'second_name': 'Karimov', 'third_name': ''}
+        records = self.command._parse_rows('teacher', [row], import_hemis_users._teacher_fields)
+        with mock.patch('builtins.print'):
+            self.command._import_page_bulk(
+                Users, 'teacher', records, reset_passwords=False, dry_run=False, pool=None
+            )
+
+    def test_teacher_rename_refreshes_course(self):
+        before = Course.objects.get(pk=self.course.pk).updated_at
+        self.import_teacher('Alisher')
+
+        self.assertEqual(Users.objects.get(pk=self.teacher.pk).first_name, 'Alisher')
+        self.assertGreater(Course.objects.get(pk=self.course.pk).updated_at, before)
+        self.assertEqual(search.search('course', 'alish'), [self.course.pk])
+
+        self.import_teacher('Bobur')
+        self.assertEqual(search.search('course', 'alish'), [])
+        self.assertEqual(search.search('course', 'bobur'), [self.course.pk])
+
+    def test_unchanged_teacher_does_not_touch_course(self):
+        self.import_teacher('Alisher')
+        before = Course.objects.get(pk=self.course.pk).updated_at
+        self.import_teacher('Alisher')
+        self.assertEqual(Course.objects.get(pk=self.course.pk).updated_at, before)
+
+
+class HemisDeltaTests(TestCase):
+    """--delta, --deactivate-missing va HEMIS'ga qaytgan student"""
+
+    def setUp(self):
+        self.command = import_hemis_users.Command()
+        self.command.counts = {'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'errors': 0}
+        self.command.password_workers = 1
+
+    def records(self, first_name='Ali'):
+        row = {'student_id_number': 'S0000001', 'group_name': '101', 'first_name': first_name,
+               'second_name': 'Valiyev', 'third_name': '', 'course': '1', 'avg_mark': '4.5'}
+        return self.command._parse_rows('student', [row], import_hemis_users._student_fields)
+
+    def run_delta(self, records, bulk=True):
+        """handle()'dagi bitta sahifa: delta filtri, keyin yozish"""
+        changed = self.command._changed_records(Users, records, reset_passwords=False)
+        with mock.patch('builtins.print'):
+            if bulk:
+                self.command._import_page_bulk(Users, 'student', changed, reset_passwords=False, dry_run=False, pool=None)
+            else:
+                for fields, fio in changed:
+                    self.command._import_record(Users, 'student', fields, fio, reset_passwords=False, dry_run=False)
+        return changed
+
+    def test_unchanged_record_skipped(self):
+        self.run_delta(self.records())
+        self.assertEqual(self.run_delta(self.records()), [])
+        self.assertEqual(self.command.counts['unchanged'], 1)
+        self.assertEqual(len(self.run_delta(self.records('Vali'))), 1)
+
+    def test_deactivate_clears_hash(self):
+        self.run_delta(self.records())
+        self.assertEqual(self.command._deactivate(Users, ['S0000001']), 1)
+        user = Users.objects.get(hemis_id='S0000001')
+        self.assertFalse(user.is_active)
+        self.assertEqual(user.hemis_hash, '')
+
+    def test_returning_student_reactivated(self):
+        for bulk in (True, False):
+            with self.subTest(bulk=bulk):
+                self.run_delta(self.records())
+                self.command._deactivate(Users, ['S0000001'])
+                self.assertEqual(len(self.run_delta(self.records(), bulk=bulk)), 1)
+                user = Users.objects.get(hemis_id='S0000001')
+                self.assertTrue(user.is_active)
+                self.assertNotEqual(user.hemis_hash, '')
+
+
+class HemisFetchTests(SimpleTestCase):
+    """_iter_pages / _get_json hemis_stub_server'ga qarshi (xatolar failures bilan kiritiladi)"""
+    STUDENTS = '/api/hemis/students'
+
+    def setUp(self):
+        # backoff kutilmaydi, qayta urinish xabarlari chiqmaydi
+        for patcher in (mock.patch.object(import_hemis_users, 'BACKOFF_BASE', 0), mock.patch('builtins.print')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def start_stub(self, **kwargs):
+        server = hemis_stub_server.make_server(port=0, **kwargs)
+        threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def make_command(self, server, concurrency=4, retries=3):
+        command = import_hemis_users.Command()
+        command.base_url = f'http://127.0.0.1:{server.server_address[1]}/api'
+        command.concurrency = concurrency
+        command.retries = retries
+        command.timeout = 5
+        command._local = threading.local()
+        return command
+
+    def fetch(self, command, page_size=100):
+        headers = {'Authorization': f'Bearer {command._api_login(command._session())}'}
+        url = f'{command.base_url}/hemis/students'
+        return list(command._iter_pages(command._session(), url, headers, page_size))
+
+    def pages(self, server, page):
+        return [status for path, number, status in server.requests if (path, number) == (self.STUDENTS, page)]
+
+    def test_pages_fetched_concurrently_and_yielded_in_order(self):
+        server = self.start_stub(students=1050, delay=0.05)
+        pages = self.fetch(self.make_command(server, concurrency=4))
+
+        self.assertEqual([len(rows) for rows in pages], [100] * 10 + [50])
+        ids = [row['student_id_number'] for rows in pages for row in rows]
+        self.assertEqual(ids, [f'S{i:07d}' for i in range(1050)])
+        self.assertGreater(server.max_active, 1)
+        self.assertLessEqual(server.max_active, 4)
+
+    def test_retries_429_and_5xx(self):
+        server = self.start_stub(students=300, failures={(self.STUDENTS, 2): [503, 429], (self.STUDENTS, 3): [500]})
+        pages = self.fetch(self.make_command(server, retries=3))
+
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(self.pages(server, 2), [503, 429, 200])
+        self.assertEqual(self.pages(server, 3), [500, 200])
+
+    def test_gives_up_after_retries(self):
+        server = self.start_stub(students=300, failures={(self.STUDENTS, 2): [503] * 5})
+        with self.assertRaises(requests.HTTPError):
+            self.fetch(self.make_command(server, retries=2))
+        self.assertEqual(self.pages(server, 2), [503, 503, 503])
+
+    def test_client_error_not_retried(self):
+        server = self.start_stub(students=300, failures={(self.STUDENTS, 1): [400]})
+        with self.assertRaises(requests.HTTPError):
+            self.fetch(self.make_command(server, retries=3))
+        self.assertEqual(self.pages(server, 1), [400])
+
+
+class StreamTestCase(TestCase):
+    """Vaqtinchalik MEDIA_ROOT'da video fayli, student va uning APIClient'i"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        settings_override = override_settings(MEDIA_ROOT=self.media, VIDEO_SENDFILE='')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        os.makedirs(os.path.join(self.media, 'videos'))
+        with open(os.path.join(self.media, 'videos', 'test.mp4'), 'wb') as f:
+            f.write(b'0123456789' * 100)
+
+        self.course, (self.section, _) = make_catalog()
+        self.video, self.other = Video.objects.filter(section=self.section).order_by('order')[:2]
+        self.user = make_user('S0000001')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class StreamTokenTests(StreamTestCase):
+    def stream_url(self, video):
+        url = self.client.get(f'/api/videos/{video.pk}/').json()['stream_url']
+        self.assertIn('?token=', url)
+        return url
+
+    def test_stream_url_plays_without_header(self):
+        url = self.stream_url(self.video)
+        response = APIClient().get(url, HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+
+    def test_token_is_scoped_to_video(self):
+        token = self.stream_url(self.video).split('?token=')[1]
+        response = APIClient().get(f'/api/videos/{self.other.pk}/stream/?token={token}')
+        self.assertEqual(response.status_code, 401)
+
+    def test_access_jwt_not_accepted_in_query(self):
+        response = APIClient().get(f'/api/videos/{self.video.pk}/stream/?token={AccessToken.for_user(self.user)}')
+        self.assertEqual(response.status_code, 401)
+
+    def test_expired_token_rejected(self):
+        url = self.stream_url(self.video)
+        with override_settings(STREAM_TOKEN_MAX_AGE=-1):
+            self.assertEqual(APIClient().get(url).status_code, 401)
+
+    def test_media_url_not_exposed(self):
+        self.assertNotIn('video_file', self.client.get(f'/api/videos/{self.video.pk}/').json())
+        first, second, _ = self.client.get(f'/api/section_one/{self.section.pk}/videos/').json()
+        self.assertNotIn('video_file', first)
+        self.assertEqual(APIClient().get(first['stream_url'], HTTP_RANGE='bytes=0-9').status_code, 206)
+        self.assertFalse(second['has_access'])
+        self.assertIsNone(second['stream_url'])
+
+    def test_course_stream_url(self):
+        Course.objects.filter(pk=self.course.pk).update(video='videos/test.mp4')
+        url = self.client.get(f'/api/courses/{self.course.pk}/stream_url/').json()['stream_url']
+        self.assertEqual(APIClient().get(url).status_code, 200)
+        self.assertEqual(APIClient().get(url.replace(f'/courses/{self.course.pk}/', '/courses/999/')).status_code, 401)
+
+
+class HlsPlaybackTests(StreamTestCase):
+    """Native HLS pleyer: master -> rendition -> segment, hech birida Authorization yo'q"""
+
+    def setUp(self):
+        super().setUp()
+        root = os.path.join(self.media, 'hls', str(self.video.pk))
+        os.makedirs(os.path.join(root, '360p'))
+        files = {
+            'master.m3u8': '#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=800000\n360p/index.m3u8\n',
+            '360p/index.m3u8': '#EXTM3U\n#EXTINF:6.0,\nseg_00000.ts\n#EXT-X-ENDLIST\n',
+            '360p/seg_00000.ts': 'segment',
+        }
+        for name, content in files.items():
+            with open(os.path.join(root, name), 'w') as f:
+                f.write(content)
+        VideoTranscode.objects.update_or_create(video=self.video, defaults={'status': 'ready'})
+
+    def fetch(self, url):
+        response = APIClient().get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return b''.join(response.streaming_content).decode()
+
+    def test_relative_uris_carry_token(self):
+        master = self.client.get(f'/api/videos/{self.video.pk}/').json()['hls_playlist']
+        rendition = urljoin(master, self.fetch(master).splitlines()[-1])
+        segment = urljoin(rendition, self.fetch(rendition).splitlines()[2])
+        self.assertEqual(self.fetch(segment), 'segment')
+
+    def test_token_of_other_video_rejected(self):
+        master = self.client.get(f'/api/videos/{self.video.pk}/').json()['hls_playlist']
+        url = master.replace(f'/videos/{self.video.pk}/', f'/videos/{self.other.pk}/')
+        self.assertEqual(APIClient().get(url).status_code, 401)
+
+
+@override_settings(FFMPEG_BINARY='ffmpeg-not-installed', TRANSCODE_LEASE_SECONDS=3600)
+class TranscodeQueueTests(TestCase):
+    def setUp(self):
+        make_catalog(sections=1, videos=2)
+        self.first, self.second = VideoTranscode.objects.order_by('id')
+
+    def test_expired_lease_reclaimed(self):
+        VideoTranscode.objects.filter(pk=self.first.pk).update(
+            status='processing', started_at=timezone.now() - timedelta(hours=2)
+        )
+        VideoTranscode.objects.filter(pk=self.second.pk).update(status='processing', started_at=timezone.now())
+        self.assertEqual(claim_next().pk, self.first.pk)
+        self.assertIsNone(claim_next())
+
+    def test_failure_keeps_requeued_row(self):
+        item = claim_next()
+        # transcode paytida yangi fayl yuklandi
+        VideoTranscode.objects.filter(pk=item.pk).update(status='pending', source_name='videos/new.mp4')
+        self.assertFalse(transcode(item))
+        self.assertEqual(VideoTranscode.objects.get(pk=item.pk).status, 'pending')
+
+    def test_failure_recorded(self):
+        item = claim_next()
+        self.assertFalse(transcode(item))
+        item.refresh_from_db()
+        self.assertEqual(item.status, 'failed')
+        self.assertIn('ffmpeg', item.error)
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        settings_override = override_settings(MEDIA_ROOT=self.media, CHUNKED_UPLOAD_DIR=os.path.join(self.media, 'tmp'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.course, (self.section, _) = make_catalog()
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('T0000001', role='teacher'))
+        response = self.client.post('/api/uploads/', {'target': 'video', 'filename': 'a.mp4', 'size': 6}, format='json')
+        self.upload = ChunkedUpload.objects.get(pk=response.json()['id'])
+
+    def patch(self, offset, body):
+        return self.client.generic('PATCH', f'/api/uploads/{self.upload.pk}/', body,
+                                   content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def read_part(self):
+        with open(part_path(self.upload), 'rb') as f:
+            return f.read()
+
+    def create_video(self):
+        return self.client.post('/api/videos/', {'upload_id': str(self.upload.pk), 'title': 'Yangi',
+                                                 'section': self.section.pk}, format='json')
+
+    def test_stale_offset_does_not_write(self):
+        self.assertEqual(self.patch(0, b'abc').status_code, 204)
+        response = self.patch(0, b'xyz')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '3')
+        self.assertEqual(self.read_part(), b'abc')
+
+    def test_busy_part_rejected_before_write(self):
+        with locked_part(self.upload):
+            self.assertEqual(self.patch(0, b'xyz').status_code, 409)
+        self.assertEqual(self.read_part(), b'')
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.offset, 0)
+
+    def test_file_moved_on_commit(self):
+        self.patch(0, b'abcdef')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.create_video()
+        self.assertEqual(response.status_code, 201)
+        video = Video.objects.get(title='Yangi')
+        with video.video_file.open('rb') as f:
+            self.assertEqual(f.read(), b'abcdef')
+        self.assertFalse(ChunkedUpload.objects.exists())
+        self.assertFalse(os.path.exists(part_path(self.upload)))
+
+    def test_file_copied_across_devices(self):
+        self.patch(0, b'abcdef')
+        with mock.patch('main_video.uploads.os.link', side_effect=OSError(errno.EXDEV, 'cross-device link')):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(self.create_video().status_code, 201)
+        with Video.objects.get(title='Yangi').video_file.open('rb') as f:
+            self.assertEqual(f.read(), b'abcdef')
+        self.assertFalse(os.path.exists(part_path(self.upload)))
+
+    def test_rollback_keeps_upload(self):
+        self.patch(0, b'abcdef')
+        with mock.patch.object(ChunkedUpload, 'delete', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.create_video()
+        self.assertFalse(Video.objects.filter(title='Yangi').exists())
+        self.assertEqual(os.listdir(os.path.join(self.media, 'videos')), [])
+        self.assertEqual(self.read_part(), b'abcdef')
+        self.assertTrue(ChunkedUpload.objects.filter(pk=self.upload.pk).exists())
+
+
+class QueryPlanTests(TestCase):
+    """Asosiy filterlar index bilan bajariladi: index olib tashlansa test yiqiladi"""
+
+    def hot_queries(self):
+        # views.py / serializers.py / access.py dagi filterlar (id'lar ahamiyatsiz)
+        return [
+            ("VideoProgress: access/progress", VideoProgress.objects.filter(user_id=1, video_id__in=[1, 2, 3]).values_list("video_id", "is_completed")),
+            ("VideoProgress: ko'rilganmi", VideoProgress.objects.filter(user_id=1, video_id=1, is_completed=True)),
+            ("Video: section tartibi", Video.objects.filter(section_id=1).order_by("order")),
+            ("Section: keyingi section", Section.objects.filter(course_id=1, order__gt=1).order_by("order")),
+            ("QuizResult: user + quiz", QuizResult.objects.filter(user_id=1, quiz_id=1)),
+            ("Comment: video bo'yicha yangilari", Comment.objects.filter(video_id=1).order_by("-created_at")),
+            ("Certificate: exists", Certificate.objects.filter(user_id=1, course_id=1)),
+            ("Vazifa: tasdiqlanganlar", Vazifa_bajarish.objects.filter(missiya__section_id=1, user_id=1, is_approved=True)),
+            ("CourseProgress: user + course", CourseProgress.objects.filter(user_id=1, course_id=1)),
+        ]
+
+    def plan_problems(self, plan):
+        """EXPLAIN natijasidagi to'liq jadval skanlari va index'siz ORDER BY saralashlari"""
+        if connection.vendor == "sqlite":
+            problems = [f"full scan {m.group(1)}" for m in re.finditer(r"\bSCAN (\w+)(?! USING)", plan)]
+            if "USE TEMP B-TREE FOR ORDER BY" in plan:
+                problems.append("ORDER BY uchun temp b-tree")
+            return problems
+        if connection.vendor == "postgresql":
+            return [f"full scan {table}" for table in re.findall(r"Seq Scan on (\w+)", plan)]
+        return []
+
+    def test_hot_queries_use_indexes(self):
+        if connection.vendor == "postgresql":
+            # kichik/bo'sh jadvallarda planner seq scan'ni afzal ko'radi
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        for name, queryset in self.hot_queries():
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertEqual(self.plan_problems(plan), [], plan)
+
+
+class FullInfoQueryCountTests(TestCase):
+    """full_info so'rovlari soni sectiondagi videolar soniga bog'liq emas"""
+
+    def full_info_queries(self, videos):
+        course, (section, _) = make_catalog(videos=videos)
+        user = make_user(f'S{videos:07d}')
+        for video in Video.objects.filter(section=section):
+            VideoProgress.objects.create(user=user, video=video, is_completed=True)
+            rate_video(user, video, 5)
+        client = APIClient()
+        client.force_authenticate(user)
+        with query_budget('SectionOneViewSet.full_info') as metrics:
+            response = client.get(f'/api/section_one/{section.pk}/full_info/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['videos']), videos)
+        return metrics.queries
+
+    def test_query_count_is_flat(self):
+        self.assertEqual(self.full_info_queries(4), self.full_info_queries(8))
+
+
+def make_quiz(section, questions=3):
+    """Har bir savolning to'g'ri javobi '1'"""
+    quiz = Quiz.objects.create(section=section, is_blocked=False, questions_count=questions)
+    for i in range(questions):
+        Question.objects.create(quiz=quiz, question=f'{i + 1}-savol', option1='a', option2='b', option3='c',
+                                option4='d', correct_answer='1')
+    return quiz
+
+
+class QuizGradeTests(TestCase):
+    def setUp(self):
+        self.course, (self.section, _) = make_catalog()
+        self.quiz = make_quiz(self.section)
+        self.user = make_user('S0000001')
+
+    def test_deleted_questions_not_counted(self):
+        # boshqa worker'ning eskirgan pool'idan olingan sessiya: oxirgi savol o'chirilgan
+        ids = list(self.quiz.questions.order_by('id').values_list('id', flat=True))
+        QuizSession.objects.create(user=self.user, quiz=self.quiz, question_ids=ids)
+        Question.objects.filter(pk=ids[-1]).delete()
+
+        result, created = submit_quiz(self.user, self.quiz, {qid: '1' for qid in ids[:-1]})
+        self.assertTrue(created)
+        self.assertEqual((result.total_questions, result.correct_answers, result.percent), (2, 2, 100))
+        self.assertTrue(result.is_passed)
+
+
+class SparseFieldsTests(TestCase):
+    URL = '/api/course-progress/'
+
+    def setUp(self):
+        self.course, _ = make_catalog()
+        self.user = make_user('S0000001')
+        CourseProgress.objects.create(user=self.user, course=self.course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_fields(self):
+        response = self.client.get(self.URL, {'fields': 'id,course.title'})
+        progress = CourseProgress.objects.get()
+        self.assertEqual(response.json(), [{'id': progress.pk, 'course': {'title': 'Jinoyat huquqi'}}])
+
+    def test_expand_collapses_other_nested(self):
+        row, = self.client.get(self.URL, {'expand': 'course'}).json()
+        self.assertEqual(row['user'], self.user.pk)
+        self.assertEqual(row['course']['title'], 'Jinoyat huquqi')
+        self.assertNotIn('sections', row['course'])
+
+    def test_no_params_full_shape(self):
+        row, = self.client.get(self.URL).json()
+        self.assertEqual(set(row), {'id', 'user', 'course', 'progress_percent', 'is_completed', 'completed_at'})
+        self.assertEqual(row['user']['hemis_id'], 'S0000001')
+        self.assertEqual(len(row['course']['sections']), 2)
+
+    def test_query_count_flat(self):
+        def count():
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(self.URL).status_code, 200)
+            return len(queries)
+
+        single = count()
+        for i in range(5):
+            CourseProgress.objects.create(user=make_user(f'S000010{i}'), course=make_catalog()[0])
+        self.assertEqual(count(), single)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'catalog': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'quiz-pool-tests'},
+})
+class QuizPoolTests(TestCase):
+    def test_invalidated_on_commit(self):
+        course, (section, other_section) = make_catalog()
+        quiz, other_quiz = make_quiz(section), make_quiz(other_section)
+        pool, other_pool = get_question_pool(quiz.pk), get_question_pool(other_quiz.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            question = Question.objects.get(pk=pool[-1])
+            question.quiz = other_quiz
+            question.save()
+            # commit'gacha cache tegilmaydi
+            self.assertEqual(get_question_pool(quiz.pk), pool)
+
+        self.assertEqual(get_question_pool(quiz.pk), pool[:-1])
+        self.assertEqual(get_question_pool(other_quiz.pk), sorted(other_pool + [question.pk]))
+
+
+class ProgressVersionTests(TestCase):
+    def setUp(self):
+        self.course, (self.section, _) = make_catalog()
+        self.user = make_user('S0000001')
+        # real JWT: har request'da user (progress_version) bazadan o'qiladi
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.video = Video.objects.filter(section=self.section).order_by('order').first()
+
+    def mark_as_watched(self):
+        response = self.client.post(f'/api/videos/{self.video.pk}/mark_as_watched/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_bumped_once_per_transaction(self):
+        # VideoProgress, SectionProgress, CourseProgress yoziladi - users UPDATE bitta, transaction ichida
+        with CaptureQueriesContext(connection) as queries:
+            self.mark_as_watched()
+        sql = [query['sql'] for query in queries.captured_queries]
+        bumps = [i for i, statement in enumerate(sql) if statement.startswith('UPDATE "main_video_users"')]
+        self.assertEqual(len(bumps), 1)
+        self.assertTrue(any(statement.startswith('RELEASE SAVEPOINT') for statement in sql[bumps[0]:]))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.progress_version, 1)
+
+    def test_rolled_back_bump_not_carried(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic(), batched_progress_bumps():
+                bump_progress_version(self.user.pk)
+                raise RuntimeError
+        bump_progress_version()  # boshqa request
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.progress_version, 0)
+
+    def test_progress_change_invalidates_etag(self):
+        url = f'/api/section_one/{self.section.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.mark_as_watched()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class ConcurrentQuizSubmitTests(TransactionTestCase):
+    """Bitta sessiya uchun ikki parallel submit: bitta natija, ikkinchisi replay"""
+
+    def test_parallel_submits_grade_once(self):
+        course, (section, _) = make_catalog()
+        quiz = make_quiz(section)
+        user = make_user('S0000001')
+        session = QuizSession.objects.get_or_create_active(user, quiz)
+        answers = {qid: '1' for qid in session.question_ids}
+
+        # ikkala request ham sessiyani ochiq ko'rib bo'lgach claim qiladi
+        barrier = threading.Barrier(2, timeout=10)
+        get_active = QuizSessionManager.get_active
+
+        def get_active_then_wait(manager, *args):
+            found = get_active(manager, *args)
+            barrier.wait()
+            return found
+
+        outcomes, errors = [], []
+
+        def submit():
+            try:
+                result, created = submit_quiz(user, quiz, answers)
+                outcomes.append((result.pk, created))
+            except Exception as e:  # noqa: BLE001 - assert'da ko'rsatiladi
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        with mock.patch.object(QuizSessionManager, 'get_active', get_active_then_wait):
+            threads = [threading.Thread(target=submit) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(QuizResult.objects.filter(user=user, quiz=quiz).count(), 1)
+        result = QuizResult.objects.get(user=user, quiz=quiz)
+        self.assertEqual(sorted(outcomes, key=lambda o: o[1]), [(result.pk, False), (result.pk, True)])
+        self.assertEqual((result.total_questions, result.correct_answers), (3, 3))
+
+
+class CourseSearchTests(TestCase):
+    def test_search_within_budget(self):
+        make_catalog()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(make_user("S0000001"))}')
+        search.is_available(connection)  # gunicorn post_worker_init
+        with query_budget('CourseMainViewSet.list'):
+            response = client.get('/api/course_main/?search=Jin')
+        self.assertEqual([course['title'] for course in response.json()], ['Jinoyat huquqi'])
+
+    def test_missing_index_not_remembered(self):
+        """Jadval yo'qligi eslab qolinmaydi: keyin migrate qilinsa indeks ishlay boshlaydi"""
+        course, _ = make_catalog()
+        with mock.patch.object(search, '_available', set()):
+            with mock.patch.object(connection.introspection, 'table_names', return_value=[]):
+                self.assertIsNone(search.search('course', 'Jin'))
+            self.assertEqual(search.search('course', 'Jin'), [course.pk])
+            with mock.patch.object(connection.introspection, 'table_names') as table_names:
+                search.search('course', 'Jin')
+            table_names.assert_not_called()
+
+
+class BulkGradeTests(TestCase):
+    URL = '/api/admin-vazifalar/bulk_grade/'
+
+    def setUp(self):
+        self.teacher = make_user('T0000001', role='teacher')
+        self.students = [make_user('S0000001'), make_user('S0000002')]
+        self.submissions = self.make_course(sections=2)
+
+    def make_course(self, sections):
+        """Birinchi sectionda 5 ta missiya, har bir student hammasiga javob yuborgan"""
+        self.course, section_list = make_catalog(sections=sections)
+        self.course.teacher.add(self.teacher)
+        self.section = section_list[0]
+        self.next_section = section_list[1] if sections > 1 else None
+        missiyas = [Missiya.objects.create(section=self.section) for _ in range(5)]
+        return {
+            student.pk: [Vazifa_bajarish.objects.create(missiya=missiya, user=student) for missiya in missiyas]
+            for student in self.students
+        }
+
+    def grade(self, user, submissions, **grade):
+        client = APIClient()
+        client.force_authenticate(user)
+        grades = [{'submission': submission.pk, 'score': 5, **grade} for submission in submissions]
+        return client.post(self.URL, {'grades': grades}, format='json')
+
+    def own(self, count, student=0):
+        return self.submissions[self.students[student].pk][:count]
+
+    def test_student_forbidden(self):
+        self.assertEqual(self.grade(self.students[0], self.own(1)).status_code, 403)
+
+    def test_teacher_limited_to_own_courses(self):
+        own = self.own(1)
+        other = self.make_course(sections=1)[self.students[0].pk][:2]
+        self.course.teacher.remove(self.teacher)  # yangi kurs - teacher unda dars bermaydi
+        response = self.grade(self.teacher, other + own)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['submissions'], sorted(submission.pk for submission in other))
+        self.assertFalse(Vazifa_bajarish.objects.filter(is_approved=True).exists())
+
+    def test_duplicate_submission_rejected(self):
+        response = self.grade(self.teacher, self.own(1) * 2)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('grades', response.json())
+
+    def test_recompute_once_per_pair(self):
+        submissions = self.own(3, student=0) + self.own(2, student=1)
+        with mock.patch('main_video.views.recompute_vazifa_progress', wraps=recompute_vazifa_progress) as recompute:
+            response = self.grade(self.teacher, submissions)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 5)
+        recompute.assert_called_once_with({(student.pk, self.section.pk) for student in self.students})
+        self.assertEqual([row['score_percent'] for row in response.json()['progress']], [60, 40])
+
+    def test_crossing_pass_percent_unlocks_next_section(self):
+        self.grade(self.teacher, self.own(3))
+        self.assertTrue(Section.objects.get(pk=self.next_section.pk).is_blocked)
+
+        response = self.grade(self.teacher, self.own(4))
+        self.assertEqual(response.json()['progress'][0]['is_completed'], True)
+        self.assertTrue(SectionProgress.objects.get(user=self.students[0], section=self.section).is_completed)
+        self.assertFalse(Section.objects.get(pk=self.next_section.pk).is_blocked)
+        self.assertEqual(CourseProgress.objects.get(user=self.students[0], course=self.course).completed_sections, 1)
+
+    def test_crossing_pass_percent_issues_certificate(self):
+        self.submissions = self.make_course(sections=1)
+        self.grade(self.teacher, self.own(3))
+        self.assertFalse(Certificate.objects.filter(user=self.students[0], course=self.course).exists())
+        self.grade(self.teacher, self.own(4))
+        self.assertTrue(Certificate.objects.filter(user=self.students[0], course=self.course).exists())
 
-# Create your tests here.
@@ -0,0 +1,255 @@
+import json
+import logging
+import os
+import shutil
+import subprocess
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils import timezone
+
+from main_video.models import Video, VideoTranscode
+from main_video.streaming import stream_token
+
+
+logger = logging.getLogger(__name__)
+
+HLS_DIR = 'hls'  # MEDIA_ROOT ichida
+MASTER_PLAYLIST = 'master.m3u8'
+SEGMENT_SECONDS = 6
+AUDIO_BITRATE = '128k'
+
+# (nomi, balandlik, video bitrate)
+DEFAULT_RENDITIONS = [
+    ('360p', 360, '800k'),
+    ('480p', 480, '1400k'),
+    ('720p', 720, '2800k'),
+    ('1080p', 1080, '5000k'),
+]
+
+
+class TranscodeError(Exception):
+    pass
+
+
+def _renditions():
+    return getattr(settings, 'HLS_RENDITIONS', DEFAULT_RENDITIONS)
+
+
+def _ffmpeg():
+    return getattr(settings, 'FFMPEG_BINARY', 'ffmpeg')
+
+
+def _ffprobe():
+    return getattr(settings, 'FFPROBE_BINARY', 'ffprobe')
+
+
+def output_dir(video_id):
+    return os.path.join(settings.MEDIA_ROOT, HLS_DIR, str(video_id))
+
+
+# =========================
+# QUEUE
+# =========================
+@receiver(post_save, sender=Video)
+def enqueue_transcode(sender, instance, **kwargs):
+    """Yangi yoki almashtirilgan video_file -> pending (transcode_videos buyrug'i oladi)"""
+    if kwargs.get('raw'):  # loaddata
+        return
+    name = instance.video_file.name or ''
+    transcode = VideoTranscode.objects.filter(video=instance).first()
+    if transcode is None:
+        if name:
+            VideoTranscode.objects.create(video=instance, source_name=name)
+        return
+    if transcode.source_name != name:
+        VideoTranscode.objects.filter(pk=transcode.pk).update(
+            status='pending', source_name=name, error='', updated_at=timezone.now()
+        )
+
+
+@receiver(post_delete, sender=Video)
+def remove_renditions(sender, instance, **kwargs):
+    shutil.rmtree(output_dir(instance.pk), ignore_errors=True)
+
+
+def _lease_seconds():
+    return getattr(settings, 'TRANSCODE_LEASE_SECONDS', 3 * 3600)
+
+
+def _claimed(transcode_obj):
+    """Yozuv hali shu worker'niki: processing va started_at (lease) o'zgarmagan"""
+    return VideoTranscode.objects.filter(
+        pk=transcode_obj.pk, status='processing', started_at=transcode_obj.started_at
+    )
+
+
+def claim_next():
+    """
+    Navbatdagi pending transcode'ni olish (bir nechta worker bir xil videoni olmaydi).
+    Lease muddati o'tgan processing yozuvlar (worker o'lgan) ham qayta olinadi.
+    """
+    expired = timezone.now() - timedelta(seconds=_lease_seconds())
+    candidates = VideoTranscode.objects.filter(Q(status='pending') | Q(status='processing', started_at__lt=expired))
+    for transcode in candidates.order_by('id')[:10]:
+        # status + started_at bo'yicha: ikki worker bitta yozuvni olmaydi
+        claimed = VideoTranscode.objects.filter(
+            pk=transcode.pk, status=transcode.status, started_at=transcode.started_at
+        ).update(status='processing', started_at=timezone.now(), updated_at=timezone.now())
+        if claimed:
+            transcode.refresh_from_db()
+            return transcode
+    return None
+
+
+# =========================
+# FFMPEG
+# =========================
+def probe(path):
+    """Manba video: (balandlik, davomiylik, audio bormi)"""
+    result = subprocess.run(
+        [_ffprobe(), '-v', 'error', '-show_streams', '-show_format', '-of', 'json', path],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise TranscodeError(f'ffprobe: {result.stderr.strip()[-500:]}')
+
+    info = json.loads(result.stdout)
+    streams = info.get('streams', [])
+    video_streams = [s for s in streams if s.get('codec_type') == 'video']
+    if not video_streams:
+        raise TranscodeError('Faylda video oqimi yo‘q')
+    height = int(video_streams[0].get('height') or 0)
+    duration = float(info.get('format', {}).get('duration') or 0) or None
+    has_audio = any(s.get('codec_type') == 'audio' for s in streams)
+    return height, duration, has_audio
+
+
+def pick_renditions(source_height):
+    """Manbadan balandroq renditionlar yasalmaydi (eng kichigi har doim qoladi)"""
+    renditions = sorted(_renditions(), key=lambda r: r[1])
+    picked = [r for r in renditions if r[1] <= source_height]
+    return picked or renditions[:1]
+
+
+def build_command(source, workdir, renditions, has_audio):
+    """Bitta ffmpeg jarayoni: split -> har bir rendition uchun scale + x264, umumiy master playlist"""
+    n = len(renditions)
+    split = f"[0:v]split={n}" + ''.join(f'[v{i}]' for i in range(n))
+    scales = [f'[v{i}]scale=-2:{height}[v{i}out]' for i, (_, height, _) in enumerate(renditions)]
+
+    command = [
+        _ffmpeg(), '-y', '-hide_banner', '-loglevel', 'error', '-i', source,
+        '-filter_complex', ';'.join([split] + scales),
+    ]
+    stream_map = []
+    for i, (name, _, bitrate) in enumerate(renditions):
+        command += [
+            '-map', f'[v{i}out]',
+            f'-c:v:{i}', 'libx264', f'-b:v:{i}', bitrate,
+            f'-maxrate:v:{i}', bitrate, f'-bufsize:v:{i}', bitrate,
+        ]
+        if has_audio:
+            command += ['-map', '0:a:0', f'-c:a:{i}', 'aac', f'-b:a:{i}', AUDIO_BITRATE]
+            stream_map.append(f'v:{i},a:{i},name:{name}')
+        else:
+            stream_map.append(f'v:{i},name:{name}')
+
+    command += [
+        '-preset', 'veryfast',
+        # segmentlar barcha renditionlarda bir xil joyda kesilishi uchun
+        '-force_key_frames', f'expr:gte(t,n_forced*{SEGMENT_SECONDS})',
+        '-f', 'hls',
+        '-hls_time', str(SEGMENT_SECONDS),
+        '-hls_playlist_type', 'vod',
+        '-hls_segment_filename', os.path.join(workdir, '%v', 'seg_%05d.ts'),
+        '-master_pl_name', MASTER_PLAYLIST,
+        '-var_stream_map', ' '.join(stream_map),
+        os.path.join(workdir, '%v', 'index.m3u8'),
+    ]
+    return command
+
+
+def transcode(transcode_obj):
+    """
+    Videoni HLS'ga o'girish. Natija avval vaqtinchalik papkaga yoziladi,
+    tayyor bo'lgach eski renditionlar o'rniga qo'yiladi.
+    """
+    video = transcode_obj.video
+    source_name = video.video_file.name
+    target = output_dir(video.pk)
+    workdir = f'{target}.tmp-{os.getpid()}'
+
+    try:
+        if shutil.which(_ffmpeg()) is None:
+            raise TranscodeError(f'ffmpeg topilmadi: {_ffmpeg()}')
+
+        height, duration, has_audio = probe(video.video_file.path)
+        renditions = pick_renditions(height)
+
+        shutil.rmtree(workdir, ignore_errors=True)
+        for name, _, _ in renditions:
+            os.makedirs(os.path.join(workdir, name))
+
+        result = subprocess.run(build_command(video.video_file.path, workdir, renditions, has_audio),
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            raise TranscodeError(f'ffmpeg: {result.stderr.strip()[-2000:]}')
+
+        shutil.rmtree(target, ignore_errors=True)
+        os.rename(workdir, target)
+    except Exception as e:
+        shutil.rmtree(workdir, ignore_errors=True)
+        logger.warning("Transcode xatosi: video=%s %s", video.pk, e)
+        # yangi fayl yuklangan (pending) yoki lease boshqa worker'ga o'tgan bo'lsa tegilmaydi
+        _claimed(transcode_obj).update(
+            status='failed', error=str(e), finished_at=timezone.now(), updated_at=timezone.now()
+        )
+        return False
+
+    prefix = f'{HLS_DIR}/{video.pk}'
+    # transcode paytida yangi fayl yuklangan bo'lsa status pending bo'lib qoladi
+    updated = _claimed(transcode_obj).filter(source_name=source_name).update(
+        status='ready',
+        playlist=f'{prefix}/{MASTER_PLAYLIST}',
+        renditions=[
+            {'name': name, 'height': height, 'bitrate': bitrate, 'playlist': f'{prefix}/{name}/index.m3u8'}
+            for name, height, bitrate in renditions
+        ],
+        duration=duration,
+        error='',
+        finished_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+    logger.info("Transcode tayyor: video=%s renditions=%s", video.pk, [r[0] for r in renditions])
+    return bool(updated)
+
+
+# =========================
+# SERIALIZER
+# =========================
+def get_playlist_url(video, context):
+    """
+    Tayyor HLS master playlist URL'i (yo'q bo'lsa yoki user anonim bo'lsa None).
+    URL yo'lida stream token bor: pleyer segmentlarni header'siz oladi.
+    Section bo'yicha bitta query: context'da section_id -> {video_id} saqlanadi.
+    """
+    request = context.get('request')
+    if request is None or not request.user.is_authenticated:
+        return None
+    ready = context.setdefault('hls_ready', {})
+    if video.section_id not in ready:
+        ready[video.section_id] = set(
+            VideoTranscode.objects.filter(video__section_id=video.section_id, status='ready')
+            .values_list('video_id', flat=True)
+        )
+    if video.pk not in ready[video.section_id]:
+        return None
+
+    token = stream_token(request.user, f'video:{video.pk}')
+    url = reverse('videos-hls', kwargs={'pk': video.pk, 'token': token, 'name': MASTER_PLAYLIST})
+    return request.build_absolute_uri(url)
@@ -0,0 +1,268 @@
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows (dev)
+    fcntl = None
+    import msvcrt
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import mixins, serializers, status, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from main_video.models import ChunkedUpload
+
+
+READ_BLOCK = 64 * 1024
+
+
+def _upload_dir():
+    return settings.CHUNKED_UPLOAD_DIR
+
+
+def part_path(upload):
+    return os.path.join(_upload_dir(), f'{upload.pk}.part')
+
+
+class UploadBusy(Exception):
+    """.part faylga boshqa PATCH yozayapti"""
+
+
+@contextmanager
+def locked_part(upload):
+    """
+    .part faylni exclusive lock bilan ochish (band bo'lsa UploadBusy). Lock
+    fayl descriptor'iga bog'langan: process o'lsa ham o'zi bo'shaydi.
+    """
+    with open(part_path(upload), 'r+b') as f:
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            raise UploadBusy
+        yield f
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def discard(upload):
+    """Upload yozuvi va vaqtinchalik faylni o'chirish"""
+    _remove(part_path(upload))
+    upload.delete()
+
+
+def place_part(source, target):
+    """
+    .part faylni ``target`` o'rniga qo'yish, source o'z joyida qoladi. Bir xil
+    diskda hard link (nusxa olinmaydi), CHUNKED_UPLOAD_DIR boshqa volume'da
+    bo'lsa (EXDEV) yoki FS link'ni bilmasa - nusxa.
+    """
+    link = f'{target}.link'
+    try:
+        os.link(source, link)
+    except OSError:
+        shutil.copyfile(source, target)
+    else:
+        os.replace(link, target)
+
+
+def cleanup_stale_uploads(hours=24):
+    """``hours`` soatdan beri yangilanmagan tugallanmagan uploadlarni o'chirish"""
+    stale = ChunkedUpload.objects.filter(updated_at__lt=timezone.now() - timedelta(hours=hours))
+    count = 0
+    for upload in stale:
+        discard(upload)
+        count += 1
+    return count
+
+
+class AssembledFile(UploadedFile):
+    """
+    Yig'ilgan .part fayl. ``temporary_file_path`` borligi uchun
+    FileSystemStorage uni nusxalamasdan joyiga ko'chiradi (rename).
+    """
+
+    def __init__(self, upload):
+        self.path = part_path(upload)
+        super().__init__(open(self.path, 'rb'), name=upload.filename, size=upload.size)
+
+    def temporary_file_path(self):
+        return self.path
+
+
+# =========================
+# API
+# =========================
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChunkedUpload
+        fields = ['id', 'target', 'filename', 'size', 'offset', 'created_at']
+        read_only_fields = ['id', 'offset', 'created_at']
+
+    def validate_size(self, value):
+        if value > settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Fayl hajmi {settings.CHUNKED_UPLOAD_MAX_SIZE} baytdan oshmasligi kerak")
+        return value
+
+    def validate_filename(self, value):
+        return os.path.basename(value)
+
+
+class ChunkedUploadViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    tus'ga o'xshash protokol:
+
+    1. ``POST /api/uploads/`` ``{target, filename, size}`` -> ``id``
+    2. ``PATCH /api/uploads/<id>/`` ``Upload-Offset: <n>`` header, body - xom baytlar.
+       Uzilsa ``HEAD/GET /api/uploads/<id>/`` dan ``Upload-Offset`` olinib davom ettiriladi.
+    3. Hammasi yuklangach odatdagi create'ga fayl o'rniga ``upload_id`` yuboriladi
+       (``POST /api/videos/``, ``POST /api/vazifas/``).
+    """
+    serializer_class = ChunkedUploadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return ChunkedUpload.objects.filter(user=self.request.user)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        upload = getattr(self, 'upload', None)
+        if upload is not None:
+            response['Upload-Offset'] = str(upload.offset)
+            response['Upload-Length'] = str(upload.size)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        os.makedirs(_upload_dir(), exist_ok=True)
+        self.upload = serializer.save(user=self.request.user)
+        open(part_path(self.upload), 'wb').close()
+
+    def retrieve(self, request, *args, **kwargs):
+        self.upload = self.get_object()
+        return Response(self.get_serializer(self.upload).data)
+
+    def partial_update(self, request, *args, **kwargs):
+        """Chunk'ni ``Upload-Offset`` joyiga yozish (body xotiraga to'liq o'qilmaydi)"""
+        upload = self.upload = self.get_object()
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            return Response({'error': 'Upload-Offset header kerak'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with locked_part(upload) as f:
+                # oraliq lock ichida egallanadi: oldingi PATCH shu orada tugagan bo'lishi mumkin
+                upload.refresh_from_db(fields=['offset'])
+                if offset != upload.offset:
+                    return self.offset_conflict(upload)
+                written = self.write_chunk(request, upload, f, offset)
+                if written is None:
+                    return Response({'error': 'Fayl e’lon qilingan hajmdan katta'}, status=status.HTTP_400_BAD_REQUEST)
+                ChunkedUpload.objects.filter(pk=upload.pk).update(offset=offset + written, updated_at=timezone.now())
+        except UploadBusy:
+            return Response({'error': 'Bu upload\'ga boshqa chunk yozilmoqda'}, status=status.HTTP_409_CONFLICT)
+        upload.offset = offset + written
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def offset_conflict(self, upload):
+        return Response({'error': 'Upload-Offset mos emas', 'offset': upload.offset}, status=status.HTTP_409_CONFLICT)
+
+    def write_chunk(self, request, upload, f, offset):
+        """Body'ni offset'dan yozish. Yozilgan baytlar soni, hajmdan oshsa None"""
+        # request.data emas: DRF parserlari body'ni to'liq o'qib oladi
+        stream = request.stream
+        written = 0
+        f.seek(offset)
+        while stream is not None:
+            block = stream.read(READ_BLOCK)
+            if not block:
+                break
+            written += len(block)
+            if offset + written > upload.size:
+                f.truncate(offset)
+                return None
+            f.write(block)
+        f.truncate()
+        return written
+
+    def perform_destroy(self, instance):
+        discard(instance)
+
+
+# =========================
+# CREATE FLOW
+# =========================
+class ChunkedUploadCreateMixin:
+    """
+    create() ``upload_id`` qabul qiladi: tugallangan upload fayli
+    ``upload_field`` ga qo'yiladi va odatdagi serializer validatsiyasi davom etadi.
+    """
+    upload_target = None
+    upload_field = None
+
+    def get_create_data(self, request):
+        data = request.data.copy()
+        self.chunked_upload = None
+        upload_id = data.get('upload_id')
+        if not upload_id:
+            return data
+
+        try:
+            upload = ChunkedUpload.objects.filter(pk=upload_id, user=request.user, target=self.upload_target).first()
+        except DjangoValidationError:  # UUID emas
+            upload = None
+        if upload is None:
+            raise ValidationError({'upload_id': 'Upload topilmadi'})
+        if not upload.is_complete:
+            raise ValidationError({'upload_id': f'Upload tugallanmagan ({upload.offset}/{upload.size})'})
+
+        del data['upload_id']
+        data[self.upload_field] = AssembledFile(upload)
+        self.chunked_upload = upload
+        return data
+
+    def save_with_upload(self, serializer, **kwargs):
+        """
+        Storage'da bo'sh fayl bilan nom band qilinadi, .part shu joyga
+        transaction ichida qo'yiladi (place_part), keyin yozuv saqlanadi va
+        upload yozuvi o'chiriladi. .part faylning o'zi commit'dan keyin
+        o'chiriladi. Rollback bo'lsa target o'chiriladi, upload yozuvi va .part
+        fayl esa qoladi - create'ni qayta yuborish mumkin.
+        """
+        upload = self.chunked_upload
+        if upload is None:
+            return serializer.save(**kwargs)
+
+        serializer.validated_data[self.upload_field].close()
+        field = serializer.Meta.model._meta.get_field(self.upload_field)
+        source = part_path(upload)
+        name = field.storage.save(field.generate_filename(None, upload.filename), ContentFile(b''))
+        try:
+            with transaction.atomic():
+                place_part(source, field.storage.path(name))
+                instance = serializer.save(**kwargs, **{self.upload_field: name})
+                upload.delete()
+                transaction.on_commit(lambda: _remove(source))
+        except BaseException:
+            field.storage.delete(name)
+            raise
+        return instance
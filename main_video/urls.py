@@ -1,5 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from main_video.streaming import StreamTokenAuthentication
+from main_video.uploads import ChunkedUploadViewSet
 
 from main_video.views import (
     MyTokenObtainPairView,
@@ -44,11 +48,19 @@ router.register(r'ratings', VideoRatingViewSet, basename='rating')
 router.register(r'quiz', QuizViewSet, basename='quiz'),
 router.register(r'quiz-results', QuizResultViewSet, basename='quiz-results')
 router.register(r'certificates', CertificateViewSet, basename='certificate')
+router.register(r'uploads', ChunkedUploadViewSet, basename='uploads')
 
 router.register(r'certificates', CertificateViewSet, basename='certificates')
 
+video_hls = VideoViewSet.as_view(
+    {'get': 'hls'},
+    authentication_classes=[JWTAuthentication, StreamTokenAuthentication]
+)
+
 urlpatterns = [
     path('api/token/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    # token yo'lda: playlistdagi nisbiy URI'lar (360p/index.m3u8, seg_*.ts) ham uni olib yuradi
+    path('api/videos/<int:pk>/hls/<str:token>/<path:name>', video_hls, name='videos-hls'),
 
     path('api/', include(router.urls)),
 ]
@@ -1,12 +1,10 @@
 
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.parsers import FormParser, MultiPartParser
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.views import TokenObtainPairView
 
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 
@@ -16,14 +14,20 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import filters
 from django_filters.rest_framework import DjangoFilterBackend
-
-import math
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import Http404
+from django.utils._os import safe_join
 
 from main_video.models import *
 from main_video.serializers import (
     CertificateSerializer,
     MyTokenObtainPairSerializer,
     UserModelSerializer,
+    UserListSerializer,
+    UserDetailSerializer,
     CourseWithProgressSerializer,
     CategoryWithCoursesSerializer,
     SectionWithAccessSerializer,
@@ -31,21 +35,57 @@ from main_video.serializers import (
     SectionOneSerializer,
     SectionVazifaSerializer,
     VazifaSerializer,
+    VazifaBulkGradeSerializer,
     VideoProgressSerializer,
     CommentSerializer,
     MissiyaOneSerializer
 )
 
 from .serializers import VideosSerializer, VideoAccessSerializer, CourseMainSerializer
+from .access import VideoAccessResolver
+from .progress import mark_video_watched, mark_video_unwatched, recompute_vazifa_progress, set_section_completed
+from .section_info import full_info_prefetch, section_full_info
+from .sparse import SparseFieldsViewMixin
+from .quiz_submit import unwatched_videos
+from .ratings import rate_video
+from .search import FullTextSearchFilter
+from .catalog_cache import CatalogCacheMixin
+from .conditional import ConditionalGetMixin, course_tree, section_tree
+from .streaming import StreamTokenAuthentication, stream_file, stream_path, stream_url
+from .transcoding import HLS_DIR, output_dir
+from .uploads import ChunkedUploadCreateMixin
 
 class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
 
 
+class UserCursorPagination(CursorPagination):
+    """Keyset pagination: hemis_id (unique index) bo'yicha, jadval o'sgani bilan sekinlashmaydi"""
+    ordering = ('hemis_id', 'id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
 class UserViewSet(ModelViewSet):
     queryset = Users.objects.all()
     serializer_class = UserModelSerializer
     parser_classes = (FormParser, MultiPartParser)
+    pagination_class = UserCursorPagination
+
+    def get_serializer_class(self):
+        # o'qishda yengil ko'rinish, ?expand=detail bilan qo'shimcha maydonlar
+        if self.action in ('list', 'retrieve'):
+            if self.request.query_params.get('expand') == 'detail':
+                return UserDetailSerializer
+            return UserListSerializer
+        return UserModelSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.only(*self.get_serializer_class().Meta.fields)
+        return queryset
 
 
 
@@ -81,7 +121,7 @@ class GroupViewSet(viewsets.ModelViewSet):
 
 
 
-class CourseProgressViewSet(viewsets.ModelViewSet):
+class CourseProgressViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     queryset = CourseProgress.objects.all()
     serializer_class = CourseProgressSerializer
     # permission_classes = [permissions.IsAuthenticated]
@@ -92,18 +132,28 @@ class MissiyaViewSet(viewsets.ModelViewSet):
     serializer_class = MissiyaSerializer
     # permission_classes = [permissions.IsAuthenticated]
 
-class SectionProgressViewSet(viewsets.ModelViewSet):
+class SectionProgressViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     queryset = SectionProgress.objects.all()
     serializer_class = SectionProgressSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def perform_update(self, serializer):
+        # is_completed: kurs counteri va sertifikat set_section_completed orqali
+        completed = serializer.validated_data.pop('is_completed', None)
+        with transaction.atomic():
+            instance = serializer.save()
+            if completed is not None:
+                set_section_completed(instance.user, instance.section, completed)
+                instance.refresh_from_db()
+
 
 from rest_framework import viewsets
 
 
-class CategoryMainViewSet(viewsets.ModelViewSet):
+class CategoryMainViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class =CategoryMainSerializer
+    catalog_cache_name = 'category_main'
 
 
 
@@ -126,17 +176,20 @@ class CourseFilter(django_filters.FilterSet):
         ).distinct()
 
 
-class CourseMainViewSet(viewsets.ModelViewSet):
-    queryset = Course.objects.all()
+class CourseMainViewSet(ConditionalGetMixin, CatalogCacheMixin, viewsets.ModelViewSet):
+    queryset = Course.objects.prefetch_related('teacher')
     serializer_class = CourseMainSerializer
+    catalog_cache_name = 'course_main'
 
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
         filters.OrderingFilter,
+        FullTextSearchFilter,
     ]
 
     filterset_class = CourseFilter
+    search_index = 'course'
+    # indeks bo'lmasa (FullTextSearchFilter -> icontains)
     search_fields = [
         'title',
         'small_description',
@@ -150,10 +203,31 @@ class CourseMainViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'title']
     ordering = ['-created_at']
 
+    def get_conditional_querysets(self):
+        return [Course.objects.all()]
 
-class CategoryViewSet(viewsets.ModelViewSet):
+    def merge_user_fields(self, data, request):
+        snapshot = self.get_snapshot(request)
+        for course in data:
+            course['has_certificate'] = snapshot.has_certificate(course['id'])
+        return data
+
+
+class CategoryViewSet(ConditionalGetMixin, CatalogCacheMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategoryWithCoursesSerializer
+    catalog_cache_name = 'categories'
+
+    def get_conditional_querysets(self):
+        if self.action == 'retrieve':
+            return [Category.objects.filter(pk=self.kwargs['pk'])] + course_tree()
+        return [Category.objects.all()] + course_tree()
+
+    def get_queryset(self):
+        # kurslar, teacherlar va sectionlar kategoriyalar soniga bog'liq bo'lmagan query'lar bilan
+        return super().get_queryset().prefetch_related(
+            Prefetch('course_set', queryset=Course.objects.prefetch_related('teacher', 'section_set'))
+        )
 
     def get_serializer_context(self):
         """Request contextini serializer'ga o'tkazish"""
@@ -161,20 +235,38 @@ class CategoryViewSet(viewsets.ModelViewSet):
         context['request'] = self.request
         return context
 
-
-from django.db import transaction
+    def merge_user_fields(self, data, request):
+        """total_progress va accessible_videos_count userga tegishli"""
+        snapshot = self.get_snapshot(request)
+        courses = [course for category in data for course in category['courses']]
+        snapshot.access.load_sections([section['id'] for course in courses for section in course['sections']])
+        for course in courses:
+            course['total_progress'] = snapshot.course_progress_percent(course['id'])
+            for section in course['sections']:
+                section['accessible_videos_count'] = snapshot.access.accessible_count(section['id'])
+        return data
 
 
-class VideoViewSet(viewsets.ModelViewSet):
+class VideoViewSet(ChunkedUploadCreateMixin, viewsets.ModelViewSet):
     queryset = Video.objects.all()
     serializer_class = VideosSerializer
     permission_classes = [permissions.IsAuthenticated]
+    stream_scope = 'video'  # StreamTokenAuthentication
+    upload_target = 'video'
+    upload_field = 'video_file'
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
         return context
 
+    def create(self, request, *args, **kwargs):
+        """video_file multipart bilan yoki tugallangan chunked upload'ning upload_id si bilan"""
+        serializer = self.get_serializer(data=self.get_create_data(request))
+        serializer.is_valid(raise_exception=True)
+        self.save_with_upload(serializer)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
     @action(detail=True, methods=['post'])
     def mark_as_watched(self, request, pk=None):
@@ -184,64 +276,17 @@ class VideoViewSet(viewsets.ModelViewSet):
             user = request.user
 
             # Video'ga kirish huquqini tekshirish
-            if not video.check_video_access(user):
+            access = VideoAccessResolver(user).load_sections([video.section_id])
+            if not access.has_access(video):
                 return Response({
                     'success': False,
                     'error': 'Bu videoni ko‘rish huquqingiz yo‘q. Avval oldingi videoni ko‘rib bo‘lishingiz kerak.'
                 }, status=status.HTTP_403_FORBIDDEN)
 
-            # Transaction bilan birga saqlash
-            with transaction.atomic():
-                # VideoProgressni yangilash yoki yaratish
-                video_progress, created = VideoProgress.objects.update_or_create(
-                    user=user,
-                    video=video,
-                    defaults={
-                        'is_completed': True,
-                        'completed_at': timezone.now()
-                    }
-                )
-
-                # Section progressni yangilash
-                section = video.section
-                videos_in_section = Video.objects.filter(section=section)
-                completed_videos = VideoProgress.objects.filter(
-                    user=user,
-                    video__in=videos_in_section,
-                    is_completed=True
-                ).count()
-
-                progress_percent = (
-                                               completed_videos / videos_in_section.count()) * 100 if videos_in_section.count() > 0 else 0
-
-                section_progress, _ = SectionProgress.objects.update_or_create(
-                    user=user,
-                    section=section
-                )
-                section_progress.score_percent = progress_percent
-                section_progress.save()
-
-                # Course progressni yangilash
-                course = section.course
-                sections_in_course = Section.objects.filter(course=course)
-                completed_sections = SectionProgress.objects.filter(
-                    user=user,
-                    section__in=sections_in_course,
-                    is_completed=True
-                ).count()
-
-                course_progress_percent = (
-                                                      completed_sections / sections_in_course.count()) * 100 if sections_in_course.count() > 0 else 0
-
-                course_progress, _ = CourseProgress.objects.update_or_create(
-                    user=user,
-                    course=course,
-                    defaults={
-                        'progress_percent': course_progress_percent,
-                        'is_completed': course_progress_percent >= 100
-                    }
-                )
+            # VideoProgress + section/course counterlari bitta transaction ichida
+            section_progress, course_progress = mark_video_watched(user, video)
 
+            access.mark_completed(video)
             next_video = video.get_next_video()
 
             return Response({
@@ -252,12 +297,12 @@ class VideoViewSet(viewsets.ModelViewSet):
                     'video_title': video.title,
                     'is_completed': True,
                     'completed_at': timezone.now().isoformat(),
-                    'section_progress': progress_percent,
-                    'course_progress': course_progress_percent,
+                    'section_progress': section_progress.score_percent,
+                    'course_progress': course_progress.progress_percent,
                     'next_video': {
                         'id': next_video.id if next_video else None,
                         'title': next_video.title if next_video else None,
-                        'has_access': next_video.check_video_access(user) if next_video else False
+                        'has_access': access.has_access(next_video) if next_video else False
                     } if next_video else None
                 }
             })
@@ -268,6 +313,37 @@ class VideoViewSet(viewsets.ModelViewSet):
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=True, methods=['get'], authentication_classes=[JWTAuthentication, StreamTokenAuthentication])
+    def stream(self, request, pk=None):
+        """Video faylini Range (206) bilan stream qilish, access tekshirilgandan keyin"""
+        video = self.get_object()
+        if not video.check_video_access(request.user):
+            return Response({
+                'success': False,
+                'error': 'Bu videoni ko‘rish huquqingiz yo‘q. Avval oldingi videoni ko‘rib bo‘lishingiz kerak.'
+            }, status=status.HTTP_403_FORBIDDEN)
+        return stream_file(request, video.video_file)
+
+    def hls(self, request, pk=None, token=None, name=None):
+        """
+        HLS master/rendition playlistlari va segmentlari.
+        Playlistdagi nisbiy yo'llar ishlashi uchun urls.py da trailing slash'siz,
+        stream token esa yo'lning bir qismi sifatida ulangan.
+        """
+        video = self.get_object()
+        if not video.check_video_access(request.user):
+            return Response({
+                'success': False,
+                'error': 'Bu videoni ko‘rish huquqingiz yo‘q. Avval oldingi videoni ko‘rib bo‘lishingiz kerak.'
+            }, status=status.HTTP_403_FORBIDDEN)
+        if not VideoTranscode.objects.filter(video=video, status='ready').exists():
+            raise Http404('HLS hali tayyor emas')
+        try:
+            path = safe_join(output_dir(video.pk), name)
+        except SuspiciousFileOperation:
+            raise Http404
+        return stream_path(request, path, f'{HLS_DIR}/{video.pk}/{name}')
+
     @action(detail=True, methods=['post'])
     def mark_as_unwatched(self, request, pk=None):
         """Videoni ko'rilmagan deb belgilash"""
@@ -275,13 +351,8 @@ class VideoViewSet(viewsets.ModelViewSet):
             video = self.get_object()
             user = request.user
 
-            # VideoProgress ni o'chirish
-            VideoProgress.objects.filter(user=user, video=video).delete()
-
-            # Progresslarni yangilash
-            section = video.section
-            self._update_section_progress(user, section)
-            self._update_course_progress(user, section.course)
+            # VideoProgress ni o'chirish va progresslarni yangilash
+            mark_video_unwatched(user, video)
 
             return Response({
                 'success': True,
@@ -294,58 +365,7 @@ class VideoViewSet(viewsets.ModelViewSet):
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    def _update_section_progress(self, user, section):
-        videos = Video.objects.filter(section=section)
-        total_videos = videos.count()
-
-        if total_videos == 0:
-            return
-
-        completed_videos = VideoProgress.objects.filter(
-            user=user,
-            video__in=videos,
-            is_completed=True
-        ).count()
-
-        progress_percent = math.floor((completed_videos / total_videos) * 100) if total_videos > 0 else 0
-
-        section_progress, _ = SectionProgress.objects.get_or_create(
-            user=user,
-            section=section
-        )
-
-        section_progress.score_percent = progress_percent
-        section_progress.save()
-
-
-    def _update_course_progress(self, user, course):
-        sections = Section.objects.filter(course=course)
-        total_sections = sections.count()
-
-        if total_sections == 0:
-            return
 
-        completed_sections = 0
-        for section in sections:
-            try:
-                section_progress = SectionProgress.objects.get(user=user, section=section)
-                if section_progress.score_percent >= 100:  # 100% progress bo'lsa
-                    completed_sections += 1
-            except SectionProgress.DoesNotExist:
-                pass
-
-        progress_percent = math.floor((completed_sections / total_sections) * 100) if total_sections > 0 else 0
-        is_completed = progress_percent >= 100
-
-        course_progress, _ = CourseProgress.objects.update_or_create(
-            user=user,
-            course=course,
-            defaults={
-                'progress_percent': progress_percent,
-                'is_completed': is_completed,
-                'completed_at': timezone.now() if is_completed else None
-            }
-        )
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
@@ -358,22 +378,16 @@ class SectionViewSet(viewsets.ModelViewSet):
     def videos_with_access(self, request, pk=None):
         section = self.get_object()
         videos = Video.objects.filter(section=section).order_by('order')  # order bo'yicha
+        access = VideoAccessResolver(request.user).load_sections([section.id])
 
         result = []
         for video in videos:
-            has_access = video.check_video_access(request.user)
-            progress = VideoProgress.objects.filter(user=request.user, video=video).first()
-            user_progress = {
-                'is_completed': progress.is_completed if progress else False,
-                'completed_at': progress.completed_at if progress else None
-            }
-
             result.append({
                 'id': video.id,
                 'title': video.title,
                 'order': video.order,
                 'has_access': has_access,
-                'user_progress': user_progress,
+                'user_progress': access.progress(video.id),
                 'is_blocked': video.is_blocked,
                 'small_description': video.small_description
             })
@@ -382,14 +396,41 @@ class SectionViewSet(viewsets.ModelViewSet):
 
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseWithProgressSerializer
+    stream_scope = 'course'  # StreamTokenAuthentication
+
+    def get_conditional_querysets(self):
+        return course_tree(self.kwargs.get('pk'))
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
         return context
 
+    @action(detail=True, methods=['get'], authentication_classes=[JWTAuthentication, StreamTokenAuthentication])
+    def stream(self, request, pk=None):
+        """Kurs tanishtiruv videosini Range (206) bilan stream qilish"""
+        course = self.get_object()
+        if course.is_blocked and request.user.role not in ['admin', 'teacher']:
+            return Response({'error': 'Kurs bloklangan'}, status=status.HTTP_403_FORBIDDEN)
+        return stream_file(request, course.video)
+
+    @action(detail=True, methods=['get'])
+    def stream_url(self, request, pk=None):
+        """
+        Tanishtiruv videosi uchun ``?token=`` li stream URL'i. Kurs javoblari
+        userlar orasida cache'lanadi, shuning uchun token alohida olinadi.
+        """
+        course = self.get_object()
+        if not course.video:
+            raise Http404('Fayl yo‘q')
+        return Response({
+            'stream_url': stream_url(request, 'courses-stream', 'course', course.pk),
+            'expires_in': settings.STREAM_TOKEN_MAX_AGE,
+        })
+
     @action(detail=True, methods=['get'])
     def user_progress(self, request, pk=None):
         course = self.get_object()
@@ -411,15 +452,17 @@ class CourseViewSet(viewsets.ModelViewSet):
 
 
 
-class SectionOneViewSet(viewsets.ModelViewSet):
+class SectionOneViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Section.objects.select_related('course', 'course__category')
     serializer_class = SectionOneSerializer
+    stream_tokens = True  # videolarda stream_url / hls_playlist
 
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = {
         'course': ['exact'],
         'course__category': ['exact'],
     }
+    search_index = 'section'
     search_fields = ['title', 'small_description', 'course__title', 'course__category__title']
     ordering_fields = ['order', 'created_at']
     ordering = ['order']
@@ -459,46 +502,20 @@ class SectionOneViewSet(viewsets.ModelViewSet):
             if not quiz:
                 return Response({"detail": "Quiz mavjud emas"}, status=status.HTTP_404_NOT_FOUND)
 
-        # Video progresslarni tekshirish
-        videos = Video.objects.filter(section=section).order_by('order')
-        for idx, video in enumerate(videos):
-            if idx == 0:
-                continue
-            previous_video = videos[idx - 1]
-            if not VideoProgress.objects.filter(user=request.user, video=previous_video, is_completed=True).exists():
-                return Response({
-                    "detail": "Avvalgi videolarni ko'rmaganingiz sababli testga kirish mumkin emas",
-                    "required_video_id": previous_video.id,
-                    "required_video_title": previous_video.title
-                }, status=status.HTTP_403_FORBIDDEN)
+        # Video progresslarni tekshirish: oxirgisidan oldingi hamma videolar ko'rilgan bo'lishi kerak
+        missing = unwatched_videos(request.user, section, include_last=False)
+        if missing:
+            return Response({
+                "detail": "Avvalgi videolarni ko'rmaganingiz sababli testga kirish mumkin emas",
+                "required_video_id": missing[0].id,
+                "required_video_title": missing[0].title
+            }, status=status.HTTP_403_FORBIDDEN)
 
+        # natija, section progress va keyingi sectionni ochish - QuizSubmitSerializer.save ichida
         serializer = QuizSubmitSerializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         result = serializer.save(quiz)
 
-        if result.percent >= quiz.pass_percent:
-            section_progress, _ = SectionProgress.objects.get_or_create(
-                user=request.user,
-                section=section
-            )
-            section_progress.is_completed = True
-            section_progress.completed_at = timezone.now()
-            section_progress.save()
-
-            next_section = Section.objects.filter(
-                course=section.course,
-                order__gt=section.order
-            ).order_by('order').first()
-
-            if next_section:
-                next_section.is_blocked = False
-                next_section.save()
-
-                first_video = Video.objects.filter(section=next_section).order_by('order').first()
-                if first_video:
-                    first_video.is_blocked = False
-                    first_video.save()
-
         return Response({
             "total_questions": result.total_questions,
             "correct_answers": result.correct_answers,
@@ -518,22 +535,12 @@ class SectionOneViewSet(viewsets.ModelViewSet):
         try:
             quiz = section.quiz
 
-            # Video progresslarini tekshirish
-            videos = Video.objects.filter(section=section).order_by('order')
-            required_videos = []
-            all_watched = True
-
-            for idx, video in enumerate(videos):
-                if idx == 0:
-                    continue
-                previous_video = videos[idx - 1]
-                if not VideoProgress.objects.filter(user=request.user, video=previous_video, is_completed=True).exists():
-                    all_watched = False
-                    required_videos.append({
-                        "id": previous_video.id,
-                        "title": previous_video.title,
-                        "order": previous_video.order
-                    })
+            # Video progresslarini tekshirish (oxirgisidan oldingi videolar)
+            required_videos = [
+                {"id": video.id, "title": video.title, "order": video.order}
+                for video in unwatched_videos(request.user, section, include_last=False)
+            ]
+            all_watched = not required_videos
 
             # Oldingi natijani tekshirish
             try:
@@ -570,22 +577,24 @@ class SectionOneViewSet(viewsets.ModelViewSet):
         """Sectiondagi videolarni access bilan olish"""
         section = self.get_object()
         videos = Video.objects.filter(section=section).order_by('order')
+        access = VideoAccessResolver(request.user).load_sections([section.id])
 
         video_data = []
         for video in videos:
-            has_access = video.check_video_access(request.user)
-            progress = VideoProgress.objects.filter(user=request.user, video=video).first()
+            progress = access.progress(video.id)
+            has_access = access.has_access(video)
 
             video_data.append({
                 'id': video.id,
                 'title': video.title,
                 'order': video.order,
                 'has_access': has_access,
-                'is_completed': progress.is_completed if progress else False,
-                'completed_at': progress.completed_at if progress else None,
+                'is_completed': progress['is_completed'],
+                'completed_at': progress['completed_at'],
                 'is_blocked': video.is_blocked,
                 'small_description': video.small_description,
-                'video_file': video.video_file.url if video.video_file else None
+                # /media URL emas: token bilan, stream access'ni qayta tekshiradi
+                'stream_url': stream_url(request, 'videos-stream', 'video', video.pk) if has_access else None
             })
 
         return Response(video_data)
@@ -621,78 +630,19 @@ class SectionOneViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def full_info(self, request, pk=None):
-        """Section to'liq ma'lumotlari"""
-        section = self.get_object()
-
-        # Asosiy ma'lumotlar
-        section_serializer = self.get_serializer(section)
-        data = section_serializer.data
-
-        # Videolar
-        videos = Video.objects.filter(section=section).order_by('order')
-        video_serializer = VideosSerializer(videos, many=True, context={'request': request})
-        data['videos_with_access'] = video_serializer.data
-
-        # Quiz holati
-        try:
-            quiz = section.quiz
-            data['has_quiz'] = True
-            data['quiz_id'] = quiz.id
-
-            # Quizga kirish huquqi
-            all_watched = True
-            for idx, video in enumerate(videos):
-                if idx == 0:
-                    continue
-                previous_video = videos[idx - 1]
-                if not VideoProgress.objects.filter(user=request.user, video=previous_video,
-                                                    is_completed=True).exists():
-                    all_watched = False
-                    break
-            data['quiz_accessible'] = all_watched
-
-            # ✅ Barcha urinishlarni olish
-            all_results = QuizResult.objects.filter(user=request.user, quiz=quiz).order_by('-percent', 'finished_at')
-            # eng yuqori natija birinchi, qolganlari tartibini saqlab beradi
-            data['quiz_results'] = [
-                {
-                    'id': r.id,
-                    'total_questions': r.total_questions,
-                    'correct_answers': r.correct_answers,
-                    'percent': r.percent,
-                    'is_passed': r.is_passed,
-                    'started_at': getattr(r, 'started_at', None),
-                    'finished_at': r.finished_at
-                }
-                for r in all_results
-            ]
-
-        except AttributeError:
-            data['has_quiz'] = False
-            data['quiz_accessible'] = False
-            data['quiz_results'] = []
+        """Section to'liq ma'lumotlari (query'lar soni videolar soniga bog'liq emas)"""
+        return self.conditional_response(
+            request, lambda: Response(section_full_info(self.get_object(), self.get_serializer_context()))
+        )
 
-        # Missiyalar
-        missiyalar = Missiya.objects.filter(section=section)
-        missiya_serializer = MissiyaOneSerializer(missiyalar, many=True)
-        data['missiyalar'] = missiya_serializer.data
+    def get_conditional_querysets(self):
+        return section_tree(self.kwargs.get('pk'))
 
-        # Progress
-        try:
-            section_progress = SectionProgress.objects.get(user=request.user, section=section)
-            data['user_progress'] = {
-                'is_completed': section_progress.is_completed,
-                'completed_at': section_progress.completed_at,
-                'score_percent': section_progress.score_percent
-            }
-        except SectionProgress.DoesNotExist:
-            data['user_progress'] = {
-                'is_completed': False,
-                'completed_at': None,
-                'score_percent': 0
-            }
-
-        return Response(data)
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'full_info':
+            queryset = queryset.select_related('quiz').prefetch_related(full_info_prefetch())
+        return queryset
 
 
 def can_start_vazifalar(user, section):
@@ -703,34 +653,6 @@ def can_start_vazifalar(user, section):
     return VideoProgress.objects.filter(user=user, video=last_video, is_completed=True).exists()
 
 
-def update_section_progress(user, section):
-    vazifalar = Vazifa_bajarish.objects.filter(missiya__section=section)
-    total_vazifalar = vazifalar.values('missiya').distinct().count()
-
-    if total_vazifalar == 0:
-        return
-
-    approved_scores = vazifalar.filter(user=user, is_approved=True).count()
-    percent = (approved_scores / total_vazifalar) * 100
-
-    section_progress, _ = SectionProgress.objects.get_or_create(user=user, section=section)
-    section_progress.score_percent = percent
-    section_progress.is_completed = percent >= 80
-    if section_progress.is_completed and not section_progress.completed_at:
-        section_progress.completed_at = timezone.now()
-    section_progress.save()
-
-    # keyingi sectionni ochish
-    if section_progress.is_completed:
-        next_section = Section.objects.filter(course=section.course, order__gt=section.order).order_by('order').first()
-        if next_section:
-            next_section.is_blocked = False
-            next_section.save()
-
-
-
-
-
 class SectionVazifasViewSet(viewsets.ModelViewSet):
     queryset = Section.objects.all()
     serializer_class = SectionVazifaSerializer
@@ -749,21 +671,22 @@ class SectionVazifasViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class VazifaBajarishViewSet(viewsets.ModelViewSet):
+class VazifaBajarishViewSet(ChunkedUploadCreateMixin, viewsets.ModelViewSet):
     queryset = Vazifa_bajarish.objects.all()
     serializer_class = VazifaBajarishSerializer
     permission_classes = [IsAuthenticated]
+    upload_target = 'vazifa'
+    upload_field = 'file'
 
     def create(self, request, *args, **kwargs):
-        """User vazifa javobini yuboradi"""
-        data = request.data.copy()
+        """User vazifa javobini yuboradi (file yoki chunked upload'ning upload_id si)"""
+        data = self.get_create_data(request)
         data['user'] = request.user.id
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        self.save_with_upload(serializer)
         # section progressni yangilash
-        section = serializer.instance.missiya.section
-        update_section_progress(request.user, section)
+        recompute_vazifa_progress([(request.user.id, serializer.instance.missiya.section_id)])
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['post'])
@@ -781,8 +704,7 @@ class VazifaBajarishViewSet(viewsets.ModelViewSet):
         vazifa.save()
 
         # section progressni yangilash
-        section = vazifa.missiya.section
-        update_section_progress(vazifa.user, section)
+        recompute_vazifa_progress([(vazifa.user_id, vazifa.missiya.section_id)])
 
         return Response({"success": True, "score": vazifa.score, "is_approved": vazifa.is_approved})
 
@@ -802,20 +724,65 @@ class AdminVazifaApproveViewSet(viewsets.ModelViewSet):
         submission.score = score
         submission.save()
 
-        # Section progressni tekshirish
-        section = submission.missiya.section
-        total = section.missiya_set.count() * 1  # har bir missiya uchun 1 ball (yoki foiz)
-        approved = Vazifa_bajarish.objects.filter(
-            missiya__section=section,
-            user=submission.user,
-            is_approved=True
-        ).count()
+        # Section progressni qayta hisoblash (keyingi section ham shu yerda ochiladi)
+        pair = (submission.user_id, submission.missiya.section_id)
+        progress = recompute_vazifa_progress([pair]).get(pair)
+
+        return Response({'success': True, 'percent_completed': progress.score_percent if progress else 0})
+
+    @action(detail=False, methods=['post'])
+    def bulk_grade(self, request):
+        """
+        Ko'p vazifani bitta so'rovda baholash::
+
+            {"grades": [{"submission": 1, "score": 5, "is_approved": true}, ...]}
 
-        percent = (approved / total) * 100
-        if percent >= 80:
-            section.unlock_next_section()
+        Vazifalar bitta bulk_update bilan yoziladi, SectionProgress har bir
+        (user, section) uchun bir marta qayta hisoblanadi.
+        """
+        if request.user.role not in ['admin', 'teacher']:
+            return Response({"error": "Faqat admin yoki teacher baholashi mumkin"}, status=status.HTTP_403_FORBIDDEN)
 
-        return Response({'success': True, 'percent_completed': percent})
+        serializer = VazifaBulkGradeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        grades = {grade['submission']: grade for grade in serializer.validated_data['grades']}
+
+        submissions = Vazifa_bajarish.objects.filter(pk__in=grades).select_related('missiya')
+        if request.user.role == 'teacher':
+            # teacher faqat o'z kurslaridagi vazifalarni baholaydi
+            submissions = submissions.filter(missiya__section__course__teacher=request.user)
+        submissions = list(submissions)
+
+        missing = sorted(set(grades) - {submission.pk for submission in submissions})
+        if missing:
+            return Response({"error": "Vazifalar topilmadi yoki sizga tegishli emas", "submissions": missing},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        for submission in submissions:
+            grade = grades[submission.pk]
+            submission.score = grade['score']
+            submission.is_approved = grade['is_approved']
+            submission.updated_at = now
+
+        with transaction.atomic():
+            Vazifa_bajarish.objects.bulk_update(submissions, ['score', 'is_approved', 'updated_at'])
+            progress = recompute_vazifa_progress(
+                {(submission.user_id, submission.missiya.section_id) for submission in submissions}
+            )
+
+        return Response({
+            "updated": len(submissions),
+            "progress": [
+                {
+                    "user": user_id,
+                    "section": section_id,
+                    "score_percent": section_progress.score_percent,
+                    "is_completed": section_progress.is_completed,
+                }
+                for (user_id, section_id), section_progress in sorted(progress.items())
+            ],
+        })
 
 class VideoProgresViews(viewsets.ModelViewSet):
     queryset = VideoProgress.objects.all()
@@ -883,12 +850,18 @@ class VideoRatingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Mavjud ratingni tekshirish
-        rating, created = VideoRating.objects.update_or_create(
-            user=request.user,
-            video=video,
-            defaults={'rating': request.data.get('rating')}
-        )
+        try:
+            value = int(request.data.get('rating'))
+        except (TypeError, ValueError):
+            value = None
+        if value is None or not (1 <= value <= 5):
+            return Response(
+                {"detail": "Rating 1 dan 5 gacha bo‘lishi kerak"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Mavjud ratingni tekshirish (Video/Course/Category aggregate'lari ham yangilanadi)
+        rating, created = rate_video(request.user, video, value)
 
         serializer = self.get_serializer(rating)
 
@@ -940,38 +913,15 @@ class QuizViewSet(viewsets.ViewSet):
             return Response({"detail": "Quiz topilmadi"}, status=status.HTTP_404_NOT_FOUND)
 
         # Video progresslarni tekshirish: barcha section videolari ko‘rilgan bo‘lishi kerak
-        videos = quiz.section.video_set.all()
-        for video in videos:
-            if not VideoProgress.objects.filter(user=request.user, video=video, is_completed=True).exists():
-                return Response({"detail": "Barcha videolarni ko‘rmaganingiz sababli testga kirish mumkin emas"},
-                                status=status.HTTP_403_FORBIDDEN)
+        if unwatched_videos(request.user, quiz.section):
+            return Response({"detail": "Barcha videolarni ko‘rmaganingiz sababli testga kirish mumkin emas"},
+                            status=status.HTTP_403_FORBIDDEN)
 
-        # Javoblarni serializer orqali tekshirish
+        # Javoblarni serializer orqali tekshirish va saqlash (section ochish ham shu yerda)
         serializer = QuizSubmitSerializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         result = serializer.save(quiz)
 
-        # Agar quiz pass bo‘lsa (60% yoki quiz.pass_percent)
-        if result.percent >= quiz.pass_percent:
-            # SectionProgress update
-            section = quiz.section
-            section_progress, _ = SectionProgress.objects.get_or_create(user=request.user, section=section)
-            section_progress.is_completed = True
-            section_progress.completed_at = timezone.now()
-            section_progress.save()
-
-            # Keyingi sectionni ochish
-            next_section = Section.objects.filter(course=section.course, order__gt=section.order).order_by('order').first()
-            if next_section:
-                next_section.is_blocked = False
-                next_section.save()
-
-                # Keyingi sectiondagi birinchi video ham ochilsin
-                first_video = next_section.video_set.order_by('order').first()
-                if first_video:
-                    first_video.is_accessible = True
-                    first_video.save()
-
         return Response({
             "quiz_id": quiz.id,
             "section_id": quiz.section.id,
@@ -1032,33 +982,6 @@ class QuizResultViewSet(viewsets.ViewSet):
 
 
 
-@receiver(post_save, sender=SectionProgress)
-def create_certificate_on_course_completion(sender, instance, created, **kwargs):
-
-    user = instance.user
-    course = instance.section.course
-
-    # Kursdagi barcha sectionlar soni
-    total_sections = course.section_set.count()
-
-    # User tomonidan tugatilgan sectionlar soni
-    completed_sections = SectionProgress.objects.filter(
-        user=user,
-        section__course=course,
-        is_completed=True
-    ).count()
-
-    # Agar barcha sectionlar tugatilgan bo‘lsa va sertifikat hali yo‘q bo‘lsa
-    if total_sections > 0 and completed_sections == total_sections:
-        if not Certificate.objects.filter(user=user, course=course).exists():
-            Certificate.objects.create(
-                user=user,
-                course=course,
-                category=course.category,
-                completed_at=timezone.now()
-            )
-            print(f"Sertifikat avtomatik yaratildi: {user.hemis_id} - {course.title}")
-
 class CertificateFilter(django_filters.FilterSet):
     category = django_filters.NumberFilter(field_name='category_id')
     course = django_filters.NumberFilter(field_name='course__id')